@@ -2,3 +2,4 @@ import os
 
 base_dir = os.path.dirname(os.path.realpath(__file__))
 resource_dir = os.path.join(base_dir, 'resources')
+cache_dir = os.path.join(base_dir, 'cache')
@@ -1,17 +1,60 @@
+import argparse
 import os
 import tkinter as tk
 from src import resource_dir
-from src.main import MainView
+from src.estimators import add_estimator_arguments
+from src.metrics import metrics
+from src.startup import timer
+
+with timer.phase("app imports"):
+    from src.main import MainView
 
 
 if __name__ == "__main__":
-    root = tk.Tk()
-    main = MainView(root)
-    main.pack(side="top", fill="both", expand=True)
+    # Command-line options
+    parser = argparse.ArgumentParser(description="MediHealth Platform  -  heart disease prediction")
+    parser.add_argument("--retrain", action="store_true",
+                        help="ignore the stored model & retrain the classifier from the dataset")
+    add_estimator_arguments(parser)
+    parser.add_argument("--startup-report", nargs="?", const="text", choices=["text", "json"],
+                        help="print the time (& imported modules) of every startup phase once the model is ready")
+    parser.add_argument("--metrics", metavar="FILE",
+                        help="record per-stage pipeline metrics & write them to FILE on exit "
+                             "(Prometheus text, or JSON if FILE ends with '.json')")
+    parser.add_argument("--drift-report", action="store_true",
+                        help="print the drift of the patients predicted against the training data on exit")
+    parser.add_argument("--profile", metavar="DIR",
+                        help="profile the session (cProfile & tracemalloc) & write the results into DIR on exit")
+    args = parser.parse_args()
+
+    metrics.enabled = args.metrics is not None
+    if args.profile:
+        metrics.start_profiling()
+
+    with timer.phase("window"):
+        root = tk.Tk()
+        main = MainView(root, retrain=args.retrain, estimator=args.estimator, params=args.params,
+                        monitor_drift=args.drift_report)
+        main.pack(side="top", fill="both", expand=True)
 
-    root.title("MediHealth Platform")
-    root.iconbitmap(os.path.join(resource_dir, "icon.ico"))
-    root.wm_geometry("720x480")
-    root.resizable(False, False)
+        root.title("MediHealth Platform")
+        root.iconbitmap(os.path.join(resource_dir, "icon.ico"))
+        root.wm_geometry("720x480")
+        root.resizable(False, False)
+
+    # Record when the landing page is first drawn (the first idle callback of the event loop)
+    root.after_idle(timer.mark, "first frame")
+
+    if args.startup_report:
+        main.bind("<<ModelReady>>", lambda event: print(timer.report_json() if args.startup_report == "json"
+                                                        else timer.report()))
 
     root.mainloop()
+
+    if args.drift_report and main.predictor is not None:
+        from src.drift import format_report
+        print(format_report(main.predictor.drift_report()))
+    if args.metrics:
+        metrics.write(args.metrics)
+    if args.profile:
+        print("PROFILE: %s, %s" % metrics.stop_profiling(args.profile))
@@ -0,0 +1,40 @@
+# Import libraries
+import hashlib
+import os
+from src import cache_dir, resource_dir
+
+
+################################################
+
+# RASTERIZED ASSET CACHE
+#   SVG resources are rasterized to PNG once, & the PNG is kept on disk (keyed by the SVG content hash & target size).
+#   cairosvg is ONLY imported when an asset isn't in the cache yet.
+
+ASSET_CACHE_DIR = os.path.join(cache_dir, "assets")
+
+
+################################################
+
+
+# Method to get the path of the cached PNG for an SVG resource (rasterizing it first, on a cache miss)
+#   (width/height of None keep the SVG's own size)
+def rasterize(name, width=None, height=None, directory=ASSET_CACHE_DIR):
+    with open(os.path.join(resource_dir, name), "rb") as f:
+        svg_data = f.read()
+
+    # Cache key  -  SVG content hash + target size
+    key = hashlib.sha256(svg_data + ("|%s|%s" % (width, height)).encode("ascii")).hexdigest()[:16]
+    png_file = os.path.join(directory, "%s-%s.png" % (os.path.splitext(name)[0], key))
+
+    if not os.path.exists(png_file):
+        # Imported here, so cairo is only loaded when an asset has to be rasterized
+        import cairosvg
+
+        os.makedirs(directory, exist_ok=True)
+
+        # Write to a temporary file first, then swap it in (never leaves a partially written PNG behind)
+        tmp_file = png_file + ".tmp"
+        cairosvg.svg2png(bytestring=svg_data, write_to=tmp_file, output_width=width, output_height=height)
+        os.replace(tmp_file, png_file)
+
+    return png_file
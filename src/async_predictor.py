@@ -0,0 +1,176 @@
+# Import libraries
+import asyncio
+from collections.abc import Mapping
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from src.encoding import check_features, encode_record
+from src.predictor import DEFAULT_DATA_FILE, HeartDiseasePredictor
+
+
+################################################
+
+# ASYNC PREDICTION API
+#   Embeds the predictor in asyncio services without ever blocking their event loop:
+#     * requests wait in a BOUNDED queue  -  once 'max_pending' requests are queued, 'predict' waits for room
+#       (backpressure), instead of letting an overloaded service buffer requests without limit
+#     * the queued requests are collected into micro-batches, each scored by ONE vectorized 'predict_with_proba' call
+#       on an executor thread (so thousands of in-flight requests cost a handful of executor calls, not thousands)
+#     * 'predict_stream' keeps at most 'max_concurrency' records of a stream in flight
+#
+# USAGE:
+#   async with await AsyncPredictor.load() as predictor:
+#       result = await predictor.predict(record)
+#       async for result in predictor.predict_stream(records):
+#           ...
+
+DEFAULT_MAX_PENDING = 4096
+DEFAULT_MAX_BATCH_SIZE = 256
+DEFAULT_MAX_CONCURRENCY = 1024
+
+
+################################################
+
+
+class AsyncPredictor:
+    def __init__(self, predictor, max_pending=DEFAULT_MAX_PENDING, max_batch_size=DEFAULT_MAX_BATCH_SIZE,
+                 max_concurrency=DEFAULT_MAX_CONCURRENCY, executor=None):
+        self.predictor = predictor
+        self.max_pending = max_pending
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_concurrency = max(1, max_concurrency)
+
+        # Executor running the (CPU-bound) scoring  -  a single thread keeps the batches large
+        self.executor = executor or ThreadPoolExecutor(max_workers=1, thread_name_prefix="AsyncPredictor")
+        self.owns_executor = executor is None
+
+        # Created on first use, on the running event loop (see '_start')
+        self.queue = None
+        self.task = None
+        # The batch being scored (its requests are no longer queued)  -  None between batches
+        self.batch = None
+
+    """ Method to load (or train) the model without blocking the event loop  -  returns an AsyncPredictor """
+    @classmethod
+    async def load(cls, data_file=DEFAULT_DATA_FILE, retrain=False, **kwargs):
+        predictor = HeartDiseasePredictor(data_file)
+        await asyncio.get_running_loop().run_in_executor(None, predictor.load, retrain)
+        return cls(predictor, **kwargs)
+
+    def _start(self):
+        if self.task is None:
+            self.queue = asyncio.Queue(self.max_pending)
+            self.task = asyncio.get_running_loop().create_task(self._run())
+
+    """ Method to predict a single record  -  a dict (feature name -> value, see 'encode_record') or a feature list
+        -  returns its prediction & class probabilities (raises a ValueError if the record isn't a valid feature vector,
+        without failing the other requests of its batch) """
+    async def predict(self, record):
+        self._start()
+        features = encode_record(record) if isinstance(record, Mapping) else record
+        check_features(features)
+
+        future = asyncio.get_running_loop().create_future()
+        # Waits while the queue is full (backpressure)
+        await self.queue.put((features, future))
+        return await future
+
+    """ Method to predict a stream of records (an iterable or async iterable)  -  yields the results in order,
+        with at most 'max_concurrency' records in flight """
+    async def predict_stream(self, records):
+        in_flight = asyncio.Queue(self.max_concurrency)
+
+        async def produce():
+            try:
+                if hasattr(records, "__aiter__"):
+                    async for record in records:
+                        await in_flight.put(asyncio.ensure_future(self.predict(record)))
+                else:
+                    for record in records:
+                        await in_flight.put(asyncio.ensure_future(self.predict(record)))
+            finally:
+                await in_flight.put(None)
+
+        producer = asyncio.ensure_future(produce())
+        try:
+            while True:
+                pending = await in_flight.get()
+                if pending is None:
+                    break
+                yield await pending
+            await producer
+        finally:
+            # The consumer stopped early (or failed)  -  drop the records still in flight
+            producer.cancel()
+            while not in_flight.empty():
+                pending = in_flight.get_nowait()
+                if pending is not None:
+                    pending.cancel()
+
+    """ Method to stop the batching task & the executor (requests still queued or being scored are cancelled) """
+    async def close(self):
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+
+            self._cancel_batch()
+            while not self.queue.empty():
+                _, future = self.queue.get_nowait()
+                future.cancel()
+
+        if self.owns_executor:
+            self.executor.shutdown(wait=False)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    # Method to cancel the requests of the batch being scored (if any)  -  e.g. when the batching task is stopped
+    def _cancel_batch(self):
+        batch, self.batch = self.batch, None
+        for _, future in batch or ():
+            if not future.done():
+                future.cancel()
+
+    async def _run(self):
+        try:
+            await self._run_batches()
+        finally:
+            # Stopped (or failed) while a batch was being scored  -  its requests would otherwise wait forever
+            self._cancel_batch()
+
+    async def _run_batches(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            # Wait for a request, then take every other request already queued (up to a full batch)
+            batch = [await self.queue.get()]
+            while len(batch) < self.max_batch_size and not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+
+            # Requests cancelled while queued aren't scored
+            batch = [(features, future) for features, future in batch if not future.cancelled()]
+            if not batch:
+                continue
+
+            self.batch = batch
+            try:
+                # !!! ONE vectorized prediction for the whole batch, off the event loop !!!
+                X = np.array([features for features, _ in batch], dtype=np.float64)
+                predictions, probabilities = await loop.run_in_executor(self.executor,
+                                                                        self.predictor.predict_with_proba, X)
+            except Exception as error:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(error)
+                self.batch = None
+                continue
+
+            for (_, future), prediction, proba in zip(batch, predictions.tolist(), probabilities.tolist()):
+                if not future.done():
+                    future.set_result({"prediction": prediction, "probability": proba})
+            self.batch = None
@@ -0,0 +1,117 @@
+# Import libraries
+import argparse
+import sys
+import time
+import pandas as pd
+from src.encoding import DEFAULT_INVALID_VALUES, read_raw
+from src.estimators import add_estimator_arguments
+from src.predictor import DEFAULT_DATA_FILE, HeartDiseasePredictor
+from src.spreadsheet import WorkbookWriter, is_spreadsheet, iter_workbook_chunks, peak_memory
+
+
+################################################
+
+# HEADLESS BATCH PREDICTION
+#   Scores whole patient files (in the 'heart_ORIGINAL.csv' schema) without the GUI, chunk by chunk
+#   (only one chunk is ever held in memory, no matter how large the input file is)
+#
+# USAGE:
+#   python -m src.batch patients.csv -o predictions.csv
+#   python -m src.batch patients.xlsx -o predictions.csv --chunksize 100000
+#   python -m src.batch patients.xlsx -o predictions.xlsx              (streamed back into a workbook)
+#   python -m src.batch patients.csv -o predictions.csv --explain      (adds each prediction's confidence & path)
+
+DEFAULT_CHUNKSIZE = 50000
+PREDICTION_COLUMN = 'Prediction'
+CONFIDENCE_COLUMN = 'Confidence'
+EXPLANATION_COLUMN = 'Explanation'
+
+
+################################################
+
+
+# Method to stream the rows of a patient file as DataFrame chunks (CSV or Excel)
+def iter_chunks(path, chunksize=DEFAULT_CHUNKSIZE):
+    if is_spreadsheet(path):
+        return iter_workbook_chunks(path, chunksize)
+    return read_raw(path, chunksize)
+
+
+# Method to score a single chunk  -  returns the chunk with the prediction column added
+#   (rows that couldn't be encoded, e.g. unknown categories or missing values  -  or have any of the 'invalid_values',
+#    feature -> values, e.g. a 'Cholesterol' of 0  -  get an empty prediction)
+#   With 'explain', the confidence (probability of the predicted class) & decision path of each prediction are added
+def score_chunk(predictor, chunk, invalid_values=None, explain=False):
+    X, valid = predictor.encode_frame(chunk, invalid_values)
+
+    predictions = pd.Series(pd.NA, index=chunk.index, dtype="Int8")
+    if explain:
+        confidence = pd.Series(float("nan"), index=chunk.index)
+        explanation = pd.Series(None, index=chunk.index, dtype=object)
+
+    if valid.any():
+        if explain:
+            predictions[valid], confidence[valid], explanation[valid] = predictor.summarize(X[valid])
+        else:
+            predictions[valid] = predictor.predict(X[valid])
+
+    chunk[PREDICTION_COLUMN] = predictions
+    if explain:
+        chunk[CONFIDENCE_COLUMN] = confidence
+        chunk[EXPLANATION_COLUMN] = explanation
+    return chunk
+
+
+# Method to score a whole patient file, writing the results to 'output' (a path or a file object) as CSV  -  or as
+# a workbook, if 'output' is a spreadsheet path (returns the number of rows scored & the number which couldn't be)
+def score_file(predictor, path, output, chunksize=DEFAULT_CHUNKSIZE, invalid_values=None, explain=False):
+    rows = skipped = 0
+
+    writer = WorkbookWriter(output) if is_spreadsheet(output) else None
+    for i, chunk in enumerate(iter_chunks(path, chunksize)):
+        chunk = score_chunk(predictor, chunk, invalid_values, explain)
+        if writer is not None:
+            writer.write(chunk)
+        else:
+            chunk.to_csv(output, mode="w" if i == 0 else "a", header=(i == 0), index=False)
+
+        rows += len(chunk)
+        skipped += int(chunk[PREDICTION_COLUMN].isna().sum())
+
+    if writer is not None:
+        writer.close()
+    return rows, skipped
+
+
+def main(argv=None):
+    # Command-line options
+    parser = argparse.ArgumentParser(description="Score a patient file (heart_ORIGINAL.csv schema) in batches")
+    parser.add_argument("input", help="CSV or Excel (.xlsx) patient file")
+    parser.add_argument("-o", "--output", help="output CSV or Excel (.xlsx) file (default: stdout, as CSV)")
+    parser.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE, help="rows scored per batch")
+    parser.add_argument("--data", default=DEFAULT_DATA_FILE,
+                        help="training dataset (encoded 'heart.csv' schema)")
+    parser.add_argument("--skip-invalid", action="store_true",
+                        help="don't score rows with invalid data values (e.g. a 'Cholesterol' of 0)")
+    parser.add_argument("--explain", action="store_true",
+                        help="add the confidence & decision path of every prediction")
+    add_estimator_arguments(parser)
+    args = parser.parse_args(argv)
+
+    predictor = HeartDiseasePredictor(args.data, estimator=args.estimator, params=args.params).load()
+
+    start = time.perf_counter()
+    rows, skipped = score_file(predictor, args.input, args.output or sys.stdout, args.chunksize,
+                               DEFAULT_INVALID_VALUES if args.skip_invalid else None, args.explain)
+    elapsed = time.perf_counter() - start
+
+    print("MODEL: %s in %.1f ms" % ("loaded from cache" if predictor.model_cached else "trained",
+                                    predictor.model_load_time * 1000), file=sys.stderr)
+    peak = peak_memory()
+    print("SCORED: %d rows (%d skipped) in %.2f s  [%.0f rows/s%s]"
+          % (rows, skipped, elapsed, rows / elapsed if elapsed else 0.0,
+             "" if peak is None else ", peak RSS %.1f MiB" % peak), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
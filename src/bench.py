@@ -0,0 +1,241 @@
+# Import libraries
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+from datetime import datetime, timezone
+import numpy as np
+import pandas as pd
+import sklearn
+from src import resource_dir
+from src.encoding import GUI_LABELS, encode_frame, read_raw
+from src.estimators import make_estimator
+from src.form_schema import validate_form
+from src.model_store import FEATURE_COLUMNS, LABEL_COLUMN
+from src.predictor import HeartDiseasePredictor
+
+
+################################################
+
+# BENCHMARK SUITE
+#   Reproducible (seeded) benchmarks of the prediction pipeline  -  results are emitted as JSON, so runs can be
+#   compared & performance regressions caught before they ship.
+#
+# USAGE:
+#   python -m src.bench -o baseline.json
+#   python -m src.bench --compare baseline.json --threshold 0.25      (exits with status 1 on a regression)
+#   python -m src.bench --sizes 1000 100000 --only batch
+
+DEFAULT_SIZES = [1000, 100000, 1000000]
+DEFAULT_SEED = 0
+
+ENCODED_DATA_FILE = os.path.join(resource_dir, "heart.csv")
+ORIGINAL_DATA_FILE = os.path.join(resource_dir, "heart_ORIGINAL.csv")
+
+
+################################################
+
+
+# Method to time 'func' over 'repeat' runs  -  returns the timing statistics (in seconds)
+def measure(func, repeat, number=1):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        times.append((time.perf_counter() - start) / number)
+
+    times = np.array(times)
+    return {
+        "repeat": repeat,
+        "number": number,
+        "min_s": float(times.min()),
+        "median_s": float(np.median(times)),
+        "mean_s": float(times.mean()),
+    }
+
+
+# Method to time single calls of 'func'  -  returns the latency percentiles (in microseconds)
+def measure_latency(func, iterations):
+    latencies = np.empty(iterations)
+    for i in range(iterations):
+        start = time.perf_counter()
+        func()
+        latencies[i] = time.perf_counter() - start
+
+    p50, p99 = np.percentile(latencies, [50, 99]) * 1e6
+    return {
+        "iterations": iterations,
+        "p50_us": float(p50),
+        "p99_us": float(p99),
+        "mean_us": float(latencies.mean() * 1e6),
+        # Compared across runs (see 'compare')
+        "median_s": float(np.median(latencies)),
+    }
+
+
+# Method to draw synthetic feature rows from the dataset's distribution (every feature sampled from its own values)
+def synthetic_features(df, n_rows, rng):
+    X = np.empty((n_rows, len(FEATURE_COLUMNS)), dtype=np.float64)
+    for i, column in enumerate(FEATURE_COLUMNS):
+        X[:, i] = rng.choice(df[column].to_numpy(dtype=np.float64), size=n_rows)
+    return X
+
+
+# Method to convert an encoded dataset row back into the text values of the input form
+def form_values(row):
+    values = {}
+    for column in FEATURE_COLUMNS:
+        if column in GUI_LABELS:
+            values[column] = GUI_LABELS[column][int(row[column])]
+        elif column == 'Oldpeak':
+            values[column] = str(float(row[column]))
+        else:
+            values[column] = str(int(row[column]))
+    return values
+
+
+################################################
+
+
+def bench_parse(repeat):
+    return {
+        "parse_heart_csv": measure(lambda: pd.read_csv(ENCODED_DATA_FILE), repeat),
+        "parse_heart_original_csv": measure(lambda: pd.read_csv(ORIGINAL_DATA_FILE), repeat),
+        "encode_heart_original_csv": measure(lambda: encode_frame(read_raw(ORIGINAL_DATA_FILE)), repeat),
+    }
+
+
+def bench_fit(repeat):
+    predictor = HeartDiseasePredictor(ENCODED_DATA_FILE, records_file=None)
+    X = predictor.dataset[FEATURE_COLUMNS].to_numpy(dtype=np.float64)
+    y = predictor.dataset[LABEL_COLUMN].to_numpy()
+    return {
+        # The classifier alone
+        "fit_decision_tree": measure(lambda: make_estimator("decision_tree").fit(X, y), repeat),
+        # The whole retraining pipeline (data assembly, training, compiling & publishing the model)
+        "fit_pipeline": measure(predictor.fit, repeat),
+    }
+
+
+def bench_single(predictor, iterations, seed):
+    values = form_values(predictor.dataset.iloc[0])
+
+    # A DIFFERENT (synthetic) patient per prediction, through the same model without a prediction cache  -  every
+    # prediction is a real inference, not a cache hit
+    rng = np.random.default_rng(seed)
+    X = pd.DataFrame(synthetic_features(predictor.dataset, iterations, rng), columns=FEATURE_COLUMNS)
+    patients = iter([form_values(row) for _, row in X.iterrows()])
+    uncached = HeartDiseasePredictor(ENCODED_DATA_FILE, cache_size=0, records_file=None)
+    uncached.publish(predictor.clf, predictor.engine)
+
+    # The same patient every time  -  served by the prediction cache after the first call
+    predictor.cache.clear()
+    cached = measure_latency(lambda: predictor.predict_one(predictor.encode_form(values)), iterations)
+    cached["cache"] = predictor.cache.stats()
+
+    return {
+        # Submit handling  -  generic validation pass over the form text values, then their encoding
+        "form_validate_encode": measure_latency(lambda: validate_form(values) or predictor.encode_form(values),
+                                                iterations),
+        # Full GUI path  -  form text values -> 'convert_values' encoding -> single-row prediction
+        "single_row_predict": measure_latency(lambda: uncached.predict_one(uncached.encode_form(next(patients))),
+                                              iterations),
+        "single_row_predict_cached": cached,
+    }
+
+
+def bench_batch(predictor, sizes, repeat, seed):
+    rng = np.random.default_rng(seed)
+    results = {}
+    for n_rows in sizes:
+        X = synthetic_features(predictor.dataset, n_rows, rng)
+        result = measure(lambda: predictor.predict(X), repeat)
+        result["rows"] = n_rows
+        result["rows_per_s"] = n_rows / result["median_s"]
+        results["batch_predict_%d" % n_rows] = result
+    return results
+
+
+# Method to compare a run against a baseline run  -  returns the benchmarks which got slower than 'threshold' allows
+def compare(results, baseline, threshold):
+    regressions = {}
+    for name, result in results["results"].items():
+        before = baseline["results"].get(name)
+        if before is None:
+            continue
+
+        ratio = result["median_s"] / before["median_s"]
+        if ratio > 1 + threshold:
+            regressions[name] = {"baseline_s": before["median_s"], "current_s": result["median_s"], "ratio": ratio}
+    return regressions
+
+
+def run(only=None, sizes=DEFAULT_SIZES, repeat=5, iterations=2000, seed=DEFAULT_SEED):
+    only = set(only or ["parse", "fit", "single", "batch"])
+    results = {}
+
+    if "parse" in only:
+        results.update(bench_parse(repeat))
+    if "fit" in only:
+        results.update(bench_fit(repeat))
+    if only & {"single", "batch"}:
+        # (trained on the dataset alone  -  not on records stored for online retraining, so runs stay comparable)
+        predictor = HeartDiseasePredictor(ENCODED_DATA_FILE, records_file=None).fit()
+        if "single" in only:
+            results.update(bench_single(predictor, iterations, seed))
+        if "batch" in only:
+            results.update(bench_batch(predictor, sizes, repeat, seed))
+
+    return {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "sklearn": sklearn.__version__,
+            "seed": seed,
+        },
+        "results": results,
+    }
+
+
+def main(argv=None):
+    # Command-line options
+    parser = argparse.ArgumentParser(description="Benchmark training, single-row & batch inference")
+    parser.add_argument("-o", "--output", help="write the results (JSON) to this file (default: stdout)")
+    parser.add_argument("--only", nargs="+", choices=["parse", "fit", "single", "batch"],
+                        help="run only these benchmark groups")
+    parser.add_argument("--sizes", nargs="+", type=int, default=DEFAULT_SIZES, help="batch sizes (rows)")
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per benchmark")
+    parser.add_argument("--iterations", type=int, default=2000, help="single-row predictions timed")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED, help="seed of the synthetic batch data")
+    parser.add_argument("--compare", metavar="BASELINE", help="baseline results (JSON) to compare against")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="allowed slowdown against the baseline (0.25 = 25%%)")
+    args = parser.parse_args(argv)
+
+    results = run(args.only, args.sizes, args.repeat, args.iterations, args.seed)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    else:
+        print(json.dumps(results, indent=2))
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.threshold)
+
+        for name, regression in regressions.items():
+            print("REGRESSION: %s  %.3g s -> %.3g s  (x%.2f)"
+                  % (name, regression["baseline_s"], regression["current_s"], regression["ratio"]), file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
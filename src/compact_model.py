@@ -0,0 +1,254 @@
+# Import libraries
+#   (the LOADER only needs the standard library  -  numpy & sklearn are imported by the exporter & the report alone)
+import argparse
+import math
+import mmap
+import os
+import struct
+import subprocess
+import sys
+from src import cache_dir
+from src.model_store import FEATURE_COLUMNS
+
+
+################################################
+
+# COMPACT MODEL FORMAT
+#   The trained tree quantized to the features' actual domains & packed into ONE contiguous buffer, for terminals that
+#   can't afford sklearn/numpy/pandas just to serve predictions. The file is memory-mapped & scored in place by a
+#   standard-library-only loader  -  predictions are IDENTICAL to the sklearn model's:
+#     * integer features (categorical & bounded columns): sklearn's thresholds are midpoints (e.g. 54.5), so for
+#       integer inputs 'x <= t' is exactly 'x <= floor(t)'  -  stored as int16
+#     * float features ('Oldpeak'): sklearn compares float32(x) against the threshold, so the threshold is stored as
+#       the largest float32 <= it  -  inputs are rounded to float32 before comparing, giving the same result
+#
+# LAYOUT (little-endian):
+#   header         magic, version, node count, feature count, class count, float threshold count   (16 bytes)
+#   feature kinds  one byte per feature  -  0 = integer, 1 = float32                               (padded to 4)
+#   classes        one int32 per class
+#   nodes          8 bytes per node  -  feature (int8, -1 = leaf), predicted class index (uint8),
+#                  threshold (int16  -  the value itself, or an index into the float thresholds), left & right (uint16)
+#   float thresholds   float32
+#   probabilities  float32 per node & class
+#
+# USAGE:
+#   python -m src.compact_model export -o model.hdt      (reports size, load time & memory against the pickle)
+
+MAGIC = b"HDTC"
+FORMAT_VERSION = 1
+
+HEADER = struct.Struct("<4sHIBBH2x")
+NODE = struct.Struct("<bBhHH")
+FLOAT32 = struct.Struct("<f")
+
+INTEGER, FLOAT = 0, 1
+
+DEFAULT_COMPACT_FILE = os.path.join(cache_dir, "models", "model.hdt")
+
+
+################################################
+
+
+# Method to round a number to float32 (to nearest, ties to even  -  as numpy & sklearn do)
+def to_float32(value, _pack=FLOAT32.pack, _unpack=FLOAT32.unpack):
+    return _unpack(_pack(value))[0]
+
+
+################################################
+# EXPORT (requires numpy)
+
+
+# Method to pack a compiled tree (see 'CompiledTree') into the compact format  -  returns the bytes
+#   'float_features' are the features kept as float32 (every other feature must only ever take integer values)
+def pack(engine, float_features=('Oldpeak',), features=FEATURE_COLUMNS):
+    import numpy as np
+
+    if not hasattr(engine, "node_class"):
+        raise ValueError("Only a single decision tree can be packed into the compact format")
+
+    kinds = [FLOAT if name in float_features else INTEGER for name in features]
+    n_nodes = engine.node_count
+    if n_nodes > 0xFFFF or len(engine.classes) > 0xFF:
+        raise ValueError("Tree too large for the compact format (%d nodes)" % n_nodes)
+
+    float_thresholds = []
+    nodes = bytearray()
+    for node in range(n_nodes):
+        class_index = int(engine.value[node].argmax())
+        left, right = int(engine.left[node]), int(engine.right[node])
+        if engine.is_leaf[node]:
+            nodes += NODE.pack(-1, class_index, 0, left, right)
+            continue
+
+        feature = int(engine.feature[node])
+        threshold = float(engine.threshold[node])
+        if kinds[feature] == FLOAT:
+            # Largest float32 <= the threshold
+            below = np.float32(threshold)
+            if float(below) > threshold:
+                below = np.nextafter(below, np.float32(-np.inf))
+            stored = len(float_thresholds)
+            float_thresholds.append(float(below))
+        else:
+            stored = math.floor(threshold)
+            if not -0x8000 <= stored <= 0x7FFF:
+                raise ValueError("Threshold of %r out of the int16 range: %r" % (features[feature], threshold))
+        nodes += NODE.pack(feature, class_index, stored, left, right)
+
+    kind_bytes = bytes(kinds) + bytes(-len(kinds) % 4)
+    return b"".join([
+        HEADER.pack(MAGIC, FORMAT_VERSION, n_nodes, len(features), len(engine.classes), len(float_thresholds)),
+        kind_bytes,
+        np.asarray(engine.classes, dtype="<i4").tobytes(),
+        bytes(nodes),
+        np.asarray(float_thresholds, dtype="<f4").tobytes(),
+        np.asarray(engine.value, dtype="<f4").tobytes(),
+    ])
+
+
+# Method to export a compiled tree to a compact model file (written atomically)  -  returns its size (in bytes)
+def export(engine, path=DEFAULT_COMPACT_FILE, **kwargs):
+    data = pack(engine, **kwargs)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path + ".tmp", "wb") as f:
+        f.write(data)
+    os.replace(path + ".tmp", path)
+    return len(data)
+
+
+################################################
+# LOADER (standard library only)
+
+
+class CompactTree:
+    def __init__(self, buffer):
+        self.buffer = buffer
+
+        magic, version, n_nodes, n_features, n_classes, n_floats = HEADER.unpack_from(buffer, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError("Not a compact model file (version %d)" % FORMAT_VERSION)
+        self.node_count = n_nodes
+
+        offset = HEADER.size
+        self.float_feature = [kind == FLOAT for kind in bytes(buffer[offset:offset + n_features])]
+        offset += n_features + (-n_features % 4)
+
+        self.classes = struct.unpack_from("<%di" % n_classes, buffer, offset)
+        offset += 4 * n_classes
+
+        # Nodes are read in place (from the mapped buffer)  -  only the small lookup tables are unpacked
+        self.nodes_offset = offset
+        offset += NODE.size * n_nodes
+
+        self.float_thresholds = struct.unpack_from("<%df" % n_floats, buffer, offset)
+        offset += 4 * n_floats
+
+        self.proba_offset = offset
+        self.proba_format = struct.Struct("<%df" % n_classes)
+
+    """ Method to memory-map a compact model file """
+    @classmethod
+    def load(cls, path=DEFAULT_COMPACT_FILE):
+        with open(path, "rb") as f:
+            return cls(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+    """ Method to get the leaf reached by a single feature vector (a sequence of numbers) """
+    def apply_one(self, features):
+        unpack, buffer, base, size = NODE.unpack_from, self.buffer, self.nodes_offset, NODE.size
+        float_feature, float_thresholds = self.float_feature, self.float_thresholds
+
+        node = 0
+        while True:
+            feature, _, threshold, left, right = unpack(buffer, base + node * size)
+            if feature < 0:
+                return node
+            if float_feature[feature]:
+                go_left = to_float32(features[feature]) <= float_thresholds[threshold]
+            else:
+                go_left = features[feature] <= threshold
+            node = left if go_left else right
+
+    """ Method to predict the label of a single feature vector """
+    def predict_one(self, features):
+        leaf = self.apply_one(features)
+        return self.classes[NODE.unpack_from(self.buffer, self.nodes_offset + leaf * NODE.size)[1]]
+
+    """ Method to predict the class probabilities of a single feature vector """
+    def predict_proba_one(self, features):
+        leaf = self.apply_one(features)
+        return self.proba_format.unpack_from(self.buffer, self.proba_offset + leaf * self.proba_format.size)
+
+    """ Method to predict the labels of many feature vectors """
+    def predict(self, X):
+        return [self.predict_one(features) for features in X]
+
+
+################################################
+# REPORT
+
+
+# Method to measure, in a fresh interpreter, the time & memory taken to load a model (& score one row with it)
+#   -  returns (seconds, peak resident memory in MiB)
+def measure_load(code, path):
+    # Peak RSS from /proc (Linux)  -  'ru_maxrss' would include the memory of the parent process before the exec
+    script = ("import sys, time\nstart = time.perf_counter()\n%s\nelapsed = time.perf_counter() - start\n"
+              "peak = [l.split()[1] for l in open('/proc/self/status') if l.startswith('VmHWM')]\n"
+              "print(elapsed, int(peak[0]) / 1024 if peak else 'nan')" % code)
+    output = subprocess.run([sys.executable, "-c", script, path], capture_output=True, text=True, check=True,
+                            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    seconds, memory = output.stdout.split()
+    return float(seconds), float(memory)
+
+
+def main(argv=None):
+    # Command-line options
+    parser = argparse.ArgumentParser(description="Export the trained tree to the compact (quantized) model format")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    export_cmd = commands.add_parser("export", help="export the trained model & compare it against the pickle")
+    export_cmd.add_argument("-o", "--output", default=DEFAULT_COMPACT_FILE, help="compact model file")
+    export_cmd.add_argument("--verify-rows", type=int, default=200000,
+                            help="synthetic rows whose predictions are checked against sklearn")
+    args = parser.parse_args(argv)
+
+    import numpy as np
+    from src.bench import synthetic_features
+    from src.predictor import HeartDiseasePredictor
+
+    predictor = HeartDiseasePredictor().load()
+    size = export(predictor.engine, args.output)
+
+    # Predictions must be IDENTICAL to the sklearn model's (dataset + synthetic rows)
+    X = np.concatenate([predictor.dataset[FEATURE_COLUMNS].to_numpy(dtype=np.float64),
+                        synthetic_features(predictor.dataset, args.verify_rows, np.random.default_rng(0))])
+    compact = CompactTree.load(args.output)
+    mismatches = int((np.asarray(compact.predict(X.tolist())) != predictor.clf.predict(X)).sum())
+
+    # The pickled sklearn model, as it would be deployed
+    import pickle
+    import tempfile
+    with tempfile.NamedTemporaryFile(suffix=".pkl", delete=False) as f:
+        pickle.dump(predictor.clf, f, protocol=pickle.HIGHEST_PROTOCOL)
+        pickle_file = f.name
+    try:
+        pickle_size = os.path.getsize(pickle_file)
+        pickle_time, pickle_memory = measure_load(
+            "import pickle\nmodel = pickle.load(open(sys.argv[1], 'rb'))\nmodel.predict([[0] * %d])"
+            % len(FEATURE_COLUMNS), pickle_file)
+    finally:
+        os.remove(pickle_file)
+    compact_time, compact_memory = measure_load(
+        "from src.compact_model import CompactTree\nCompactTree.load(sys.argv[1]).predict_one([0] * %d)"
+        % len(FEATURE_COLUMNS), args.output)
+
+    print("EXPORTED: %s  (%d nodes)" % (args.output, compact.node_count))
+    print("%-8s %12s %14s %16s" % ("FORMAT", "SIZE(bytes)", "LOAD(ms)", "PEAK RSS(MiB)"))
+    print("%-8s %12d %14.1f %16.1f" % ("pickle", pickle_size, pickle_time * 1000, pickle_memory))
+    print("%-8s %12d %14.1f %16.1f" % ("compact", size, compact_time * 1000, compact_memory))
+    print("VERIFIED: %d rows, %d mismatches" % (len(X), mismatches))
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
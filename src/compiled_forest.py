@@ -0,0 +1,246 @@
+# Import libraries
+import numpy as np
+from src.compiled_tree import float32_split_thresholds, tree_depth
+
+
+################################################
+
+# COMPILED TREE ENSEMBLE
+#   Every tree of a fitted ensemble stacked into ONE set of flat node arrays (each tree's nodes offset by the trees
+#   before it), so a batch is traversed through ALL trees at once  -  one vectorized step per level, over a
+#   (rows x trees) matrix of current nodes  -  instead of tree by tree. Two kinds of ensembles:
+#     * 'average'   - bagged trees, random forests & extra-trees: the trees' class probabilities are averaged
+#     * 'boosting'  - gradient-boosted trees: the (learning-rate scaled) leaf values are summed onto the initial raw
+#                     prediction, & turned into probabilities by the sigmoid (binary) or softmax (multi-class)
+#   Trees are accumulated in the same order as sklearn does, so predictions match sklearn's EXACTLY (see
+#   'CompiledTree' for the thresholds).
+
+# Most (rows x trees) nodes traversed at once in batch mode (small enough for the temporaries to stay in cache)
+BATCH_CHUNK_CELLS = 1 << 16
+
+# Levels between two compactions of the batch traversal (dropping the pairs that already reached a leaf)
+COMPACT_EVERY = 3
+
+AVERAGE, BOOSTING = "average", "boosting"
+
+
+################################################
+
+
+class CompiledForest:
+    def __init__(self, feature, threshold, left, right, value, roots, classes, kind=AVERAGE, init=None):
+        # Stacked node arrays (indices are global  -  leaves point to THEMSELVES)
+        self.feature = np.asarray(feature, dtype=np.int32)
+        self.threshold = np.asarray(threshold, dtype=np.float64)
+        self.left = np.asarray(left, dtype=np.int32)
+        self.right = np.asarray(right, dtype=np.int32)
+        # Root node of every tree
+        self.roots = np.asarray(roots, dtype=np.int32)
+
+        # Per node  -  class probabilities ('average') or scaled raw values ('boosting', one column per raw output)
+        self.value = np.asarray(value, dtype=np.float64)
+        self.classes = np.asarray(classes)
+        self.kind = str(kind)
+        # Initial raw prediction ('boosting' only)
+        self.init = np.zeros(self.value.shape[1]) if init is None else np.asarray(init, dtype=np.float64)
+
+        # Derived data
+        self.split_threshold = float32_split_thresholds(self.threshold)
+        self.is_leaf = self.left == np.arange(len(self.left))
+        self.max_depth = tree_depth(self.is_leaf, self.left, self.right, self.roots)
+        self.children = np.stack([self.right, self.left], axis=1)
+
+        # Plain Python copies for single-row traversal
+        self._feature = self.feature.tolist()
+        self._threshold = self.split_threshold.tolist()
+        self._left = self.left.tolist()
+        self._right = self.right.tolist()
+        self._is_leaf = self.is_leaf.tolist()
+        self._roots = self.roots.tolist()
+
+    """ Method to compile a fitted sklearn ensemble (bagging, random forest, extra-trees or gradient boosting) """
+    @classmethod
+    def from_sklearn(cls, model):
+        if hasattr(model, "init_"):
+            # Gradient boosting  -  one regression tree per stage & raw output (n_stages x outputs)
+            stages = np.asarray(model.estimators_)
+            trees = [(tree, None) for tree in stages.ravel()]
+            outputs = stages.shape[1]
+            kind = BOOSTING
+            init = model._raw_predict_init(np.zeros((1, model.n_features_in_)))[0]
+        else:
+            # Bagging may train every tree on a subset of the features  -  mapped back to the full feature vector
+            subsets = getattr(model, "estimators_features_", [None] * len(model.estimators_))
+            trees = list(zip(model.estimators_, subsets))
+            outputs = len(model.classes_)
+            kind = AVERAGE
+            init = None
+
+        arrays = {name: [] for name in ("feature", "threshold", "left", "right", "value")}
+        roots = []
+        offset = 0
+        for index, (tree, subset) in enumerate(trees):
+            tree_ = tree.tree_
+            nodes = np.arange(tree_.node_count)
+            leaf = tree_.children_left == -1
+
+            feature = np.where(leaf, 0, tree_.feature)
+            if subset is not None:
+                feature = np.asarray(subset)[feature]
+
+            if kind == BOOSTING:
+                # Stage s, output k  ->  column k, scaled by the learning rate (as sklearn adds it)
+                value = np.zeros((tree_.node_count, outputs))
+                value[:, index % outputs] = model.learning_rate * tree_.value[:, 0, 0]
+            else:
+                value = tree_.value[:, 0, :] / tree_.value[:, 0, :].sum(axis=1, keepdims=True)
+
+            arrays["feature"].append(feature)
+            arrays["threshold"].append(np.where(leaf, 0.0, tree_.threshold))
+            arrays["left"].append(np.where(leaf, nodes, tree_.children_left) + offset)
+            arrays["right"].append(np.where(leaf, nodes, tree_.children_right) + offset)
+            arrays["value"].append(value)
+            roots.append(offset)
+            offset += tree_.node_count
+
+        return cls(**{name: np.concatenate(parts) for name, parts in arrays.items()},
+                   roots=roots, classes=model.classes_, kind=kind, init=init)
+
+    """ Method to get the node arrays (e.g. to store them with numpy.savez) """
+    def to_arrays(self):
+        return {
+            "feature": self.feature,
+            "threshold": self.threshold,
+            "left": self.left,
+            "right": self.right,
+            "value": self.value,
+            "roots": self.roots,
+            "classes": self.classes,
+            "kind": np.array(self.kind),
+            "init": self.init,
+        }
+
+    """ Method to rebuild a compiled ensemble from its node arrays (see 'to_arrays') """
+    @classmethod
+    def from_arrays(cls, arrays):
+        return cls(*(arrays[name] for name in ("feature", "threshold", "left", "right", "value", "roots", "classes")),
+                   kind=str(arrays["kind"]), init=arrays["init"])
+
+    @property
+    def node_count(self):
+        return len(self.left)
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    # Method to turn the accumulated leaf values (rows x outputs) into class probabilities
+    def _probabilities(self, total):
+        if self.kind == AVERAGE:
+            return total / self.n_trees
+        if total.shape[1] == 1:
+            positive = 1.0 / (1.0 + np.exp(-total[:, 0]))
+            return np.column_stack([1.0 - positive, positive])
+        exp = np.exp(total - total.max(axis=1, keepdims=True))
+        return exp / exp.sum(axis=1, keepdims=True)
+
+    # Method to turn the accumulated leaf values (rows x outputs) into class labels
+    def _labels(self, total):
+        if self.kind == BOOSTING and total.shape[1] == 1:
+            return self.classes[(total[:, 0] >= 0).astype(np.intp)]
+        return self.classes[total.argmax(axis=1)]
+
+    ################################
+    # SINGLE-ROW (Python) TRAVERSAL #
+    ################################
+
+    """ Method to get the leaf reached in every tree by a single feature vector """
+    def apply_one(self, features):
+        row = features.tolist() if isinstance(features, np.ndarray) else features
+
+        feature, threshold, left, right, is_leaf = self._feature, self._threshold, self._left, self._right, self._is_leaf
+        leaves = []
+        for node in self._roots:
+            while not is_leaf[node]:
+                node = left[node] if row[feature[node]] <= threshold[node] else right[node]
+            leaves.append(node)
+        return leaves
+
+    def _total_one(self, features):
+        total = self.init.copy() if self.kind == BOOSTING else np.zeros(self.value.shape[1])
+        for leaf in self.apply_one(features):
+            total += self.value[leaf]
+        return total[np.newaxis]
+
+    """ Method to predict the label of a single feature vector """
+    def predict_one(self, features):
+        return self._labels(self._total_one(features))[0].item()
+
+    """ Method to predict the class probabilities of a single feature vector """
+    def predict_proba_one(self, features):
+        return self._probabilities(self._total_one(features))[0]
+
+    """ Method to predict the label & the class probabilities of a single feature vector (one traversal) """
+    def predict_with_proba_one(self, features):
+        total = self._total_one(features)
+        return self._labels(total)[0].item(), self._probabilities(total)[0]
+
+    ##############################################################
+    # BATCH (vectorized, all trees at once, level-by-level) TRAVERSAL #
+    ##############################################################
+
+    """ Method to get the leaves reached by a batch of feature vectors  -  a (rows x trees) array """
+    def apply(self, X):
+        X = np.ascontiguousarray(X, dtype=np.float64)
+        if X.ndim != 2:
+            raise ValueError("Expected a 2D array of feature vectors")
+
+        n_features, n_trees = X.shape[1], self.n_trees
+        chunk_rows = max(1, BATCH_CHUNK_CELLS // n_trees)
+        leaves = np.empty(len(X) * n_trees, dtype=np.int32)
+        for start in range(0, len(X), chunk_rows):
+            chunk = X[start:start + chunk_rows].ravel()
+            n_rows = len(chunk) // n_features
+
+            # One entry per (row, tree) pair  -  its current node, row offset into 'chunk' & position in 'leaves'
+            nodes = np.tile(self.roots, n_rows)
+            row_offsets = np.repeat(np.arange(0, len(chunk), n_features, dtype=np.int32), n_trees)
+            positions = np.arange(start * n_trees, (start + n_rows) * n_trees)
+
+            for level in range(1, self.max_depth + 1):
+                go_left = chunk[row_offsets + self.feature[nodes]] <= self.split_threshold[nodes]
+                nodes = self.children[nodes, go_left.view(np.int8)]
+
+                # Trees are unbalanced  -  pairs at a leaf are stored & dropped, instead of stepped to the max depth
+                if level % COMPACT_EVERY == 0:
+                    done = self.is_leaf[nodes]
+                    leaves[positions[done]] = nodes[done]
+                    active = ~done
+                    nodes, row_offsets, positions = nodes[active], row_offsets[active], positions[active]
+                    if not len(nodes):
+                        break
+
+            leaves[positions] = nodes
+        return leaves.reshape(len(X), n_trees)
+
+    def _total(self, X):
+        leaves = self.apply(X)
+        total = np.empty((len(leaves), self.value.shape[1]))
+        total[:] = self.init if self.kind == BOOSTING else 0.0
+        # Tree by tree (sklearn's summation order)
+        for tree in range(self.n_trees):
+            total += self.value[leaves[:, tree]]
+        return total
+
+    """ Method to predict the labels of a batch of feature vectors """
+    def predict(self, X):
+        return self._labels(self._total(X))
+
+    """ Method to predict the class probabilities of a batch of feature vectors """
+    def predict_proba(self, X):
+        return self._probabilities(self._total(X))
+
+    """ Method to predict the labels & the class probabilities of a batch of feature vectors (one traversal) """
+    def predict_with_proba(self, X):
+        total = self._total(X)
+        return self._labels(total), self._probabilities(total)
@@ -0,0 +1,173 @@
+# Import libraries
+import numpy as np
+
+
+################################################
+
+# COMPILED DECISION TREE
+#   The fitted tree exported into flat arrays (feature, threshold, left, right, value), with a lightweight inference
+#   engine that only needs numpy  -  predictions match sklearn's EXACTLY:
+#     * sklearn rounds inputs to float32 before comparing them against the (float64) thresholds. Instead of rounding
+#       every input, each threshold is moved to the largest float64 value whose float32 rounding is still <= the
+#       threshold, so comparing the UNROUNDED inputs gives the same result
+#     * leaves point to THEMSELVES (left = right = node), so every row can be advanced one level at a time without
+#       checking which rows have already reached a leaf
+
+# Number of rows traversed at once in batch mode (bounds the temporary arrays)
+BATCH_CHUNK_ROWS = 1 << 16
+
+
+################################################
+
+
+# Method to convert sklearn's float64 thresholds into thresholds for UNROUNDED (float64) inputs
+#   (x <= result  <=>  float32(x) <= threshold, for every float64 x within the float32 range)
+def float32_split_thresholds(threshold):
+    threshold = np.asarray(threshold, dtype=np.float64)
+
+    # Largest float32 value <= the threshold, & the next float32 value above it
+    below = threshold.astype(np.float32)
+    below = np.where(below.astype(np.float64) > threshold, np.nextafter(below, np.float32(-np.inf)), below)
+    above = np.nextafter(below, np.float32(np.inf))
+
+    # Inputs below the midpoint round down to 'below'  -  inputs exactly AT the midpoint round to the even neighbour
+    midpoint = (below.astype(np.float64) + above.astype(np.float64)) / 2
+    rounds_down = (below.view(np.uint32) & 1) == 0
+    return np.where(rounds_down, midpoint, np.nextafter(midpoint, -np.inf))
+
+
+# Method to get the depth of the deepest leaf below the given root node(s)
+def tree_depth(is_leaf, left, right, roots=(0,)):
+    depth = 0
+    nodes = np.asarray(roots)
+    while not is_leaf[nodes].all():
+        nodes = np.unique(np.concatenate([left[nodes], right[nodes]]))
+        depth += 1
+    return depth
+
+
+class CompiledTree:
+    def __init__(self, feature, threshold, left, right, value, classes):
+        # Node arrays
+        self.feature = np.asarray(feature, dtype=np.int32)
+        self.threshold = np.asarray(threshold, dtype=np.float64)
+        self.left = np.asarray(left, dtype=np.int32)
+        self.right = np.asarray(right, dtype=np.int32)
+
+        # Class probabilities of every node (n_nodes x n_classes) & the class labels
+        value = np.asarray(value, dtype=np.float64)
+        self.value = value / value.sum(axis=1, keepdims=True)
+        self.classes = np.asarray(classes)
+
+        # Derived data
+        self.split_threshold = float32_split_thresholds(self.threshold)
+        self.is_leaf = self.left == np.arange(len(self.left))
+        self.max_depth = tree_depth(self.is_leaf, self.left, self.right)
+        self.node_class = self.classes[self.value.argmax(axis=1)]
+
+        # Plain Python copies for single-row traversal (list indexing is much cheaper than numpy scalar indexing)
+        self._feature = self.feature.tolist()
+        self._threshold = self.split_threshold.tolist()
+        self._left = self.left.tolist()
+        self._right = self.right.tolist()
+        self._is_leaf = self.is_leaf.tolist()
+        self._node_class = self.node_class.tolist()
+
+        # Every node's children as one (n_nodes x 2) array  -  column 0 = right, column 1 = left
+        self.children = np.stack([self.right, self.left], axis=1)
+
+    """ Method to compile a fitted sklearn DecisionTreeClassifier """
+    @classmethod
+    def from_sklearn(cls, clf):
+        tree_ = clf.tree_
+        nodes = np.arange(tree_.node_count)
+        leaf = tree_.children_left == -1
+
+        return cls(
+            feature=np.where(leaf, 0, tree_.feature),
+            threshold=np.where(leaf, 0.0, tree_.threshold),
+            left=np.where(leaf, nodes, tree_.children_left),
+            right=np.where(leaf, nodes, tree_.children_right),
+            value=tree_.value[:, 0, :],
+            classes=clf.classes_,
+        )
+
+    """ Method to get the node arrays (e.g. to store them with numpy.savez) """
+    def to_arrays(self):
+        return {
+            "feature": self.feature,
+            "threshold": self.threshold,
+            "left": self.left,
+            "right": self.right,
+            "value": self.value,
+            "classes": self.classes,
+        }
+
+    """ Method to rebuild a compiled tree from its node arrays (see 'to_arrays') """
+    @classmethod
+    def from_arrays(cls, arrays):
+        return cls(*(arrays[name] for name in ("feature", "threshold", "left", "right", "value", "classes")))
+
+    @property
+    def node_count(self):
+        return len(self.left)
+
+    ################################
+    # SINGLE-ROW (Python) TRAVERSAL #
+    ################################
+
+    """ Method to get the leaf reached by a single feature vector """
+    def apply_one(self, features):
+        row = features.tolist() if isinstance(features, np.ndarray) else features
+
+        feature, threshold, left, right, is_leaf = self._feature, self._threshold, self._left, self._right, self._is_leaf
+        node = 0
+        while not is_leaf[node]:
+            node = left[node] if row[feature[node]] <= threshold[node] else right[node]
+        return node
+
+    """ Method to predict the label of a single feature vector """
+    def predict_one(self, features):
+        return self._node_class[self.apply_one(features)]
+
+    """ Method to predict the class probabilities of a single feature vector """
+    def predict_proba_one(self, features):
+        return self.value[self.apply_one(features)]
+
+    ###############################################
+    # BATCH (vectorized, level-by-level) TRAVERSAL #
+    ###############################################
+
+    """ Method to get the leaves reached by a batch of feature vectors """
+    def apply(self, X):
+        X = np.ascontiguousarray(X, dtype=np.float64)
+        if X.ndim != 2:
+            raise ValueError("Expected a 2D array of feature vectors")
+
+        n_features = X.shape[1]
+        leaves = np.empty(len(X), dtype=np.int32)
+        for start in range(0, len(X), BATCH_CHUNK_ROWS):
+            chunk = X[start:start + BATCH_CHUNK_ROWS].ravel()
+            row_offsets = np.arange(0, len(chunk), n_features)
+            nodes = np.zeros(len(row_offsets), dtype=np.int32)
+
+            # Advance every row one level per step  -  rows already at a leaf stay where they are
+            for _ in range(self.max_depth):
+                go_left = chunk[row_offsets + self.feature[nodes]] <= self.split_threshold[nodes]
+                nodes = self.children[nodes, go_left.view(np.int8)]
+
+            leaves[start:start + len(row_offsets)] = nodes
+        return leaves
+
+    """ Method to predict the labels of a batch of feature vectors """
+    def predict(self, X):
+        return self.node_class[self.apply(X)]
+
+    """ Method to predict the class probabilities of a batch of feature vectors """
+    def predict_proba(self, X):
+        return self.value[self.apply(X)]
+
+    """ Method to predict the labels & the class probabilities of a batch of feature vectors (one traversal) """
+    def predict_with_proba(self, X):
+        leaves = self.apply(X)
+        return self.node_class[leaves], self.value[leaves]
@@ -0,0 +1,186 @@
+# Import libraries
+import argparse
+import os
+import time
+import numpy as np
+import pandas as pd
+from src.model_store import FEATURE_COLUMNS, LABEL_COLUMN
+
+
+################################################
+
+# DATA LOADER
+#   Reads the (encoded) patient datasets with an explicit, compact schema  -  every column fits in int8/int16/float32,
+#   instead of pandas' default int64/float64  -  optionally in chunks, & converts them to a columnar binary format:
+#     * 'npy'      - one NumPy .npy file per column, memory-mapped on load (near-instant, nothing is read up front)
+#     * 'parquet'  - a single Parquet file (requires pyarrow)
+#
+# USAGE:
+#   python -m src.data_loader convert registry.csv registry_npy/ --format npy
+#   python -m src.data_loader info registry_npy/
+
+SCHEMA = {
+    'Age':            np.int8,
+    'Sex':            np.int8,      # categorical (0-1)
+    'ChestPainType':  np.int8,      # categorical (0-3)
+    'RestingBP':      np.int16,
+    'Cholesterol':    np.int16,
+    'FastingBS':      np.int8,      # categorical (0-1)
+    'RestingECG':     np.int8,      # categorical (0-2)
+    'MaxHR':          np.int16,
+    'ExerciseAngina': np.int8,      # categorical (0-1)
+    'Oldpeak':        np.float32,
+    'ST_Slope':       np.int8,      # categorical (0-2)
+    'HeartDisease':   np.int8,      # label (0-1)
+}
+COLUMNS = FEATURE_COLUMNS + [LABEL_COLUMN]
+
+# Types the CSV columns are parsed as, before they are checked & narrowed to the compact schema
+WIDE_SCHEMA = {c: np.float64 if np.issubdtype(t, np.floating) else np.int64 for c, t in SCHEMA.items()}
+
+DEFAULT_CHUNKSIZE = 1000000
+
+
+################################################
+
+
+# Method to cast a DataFrame to the compact schema  -  raises a ValueError if a value does not fit its column's type
+#   (a plain cast would silently wrap around, e.g. an Age of 200 would become -56 in int8)
+def to_schema(df, columns=COLUMNS):
+    for c in columns:
+        if np.issubdtype(SCHEMA[c], np.integer) and len(df):
+            bounds = np.iinfo(SCHEMA[c])
+            low, high = df[c].min(), df[c].max()
+            if low < bounds.min or high > bounds.max:
+                raise ValueError("Column %r has values outside the range of %s [%d, %d]: %s - %s"
+                                 % (c, np.dtype(SCHEMA[c]).name, bounds.min, bounds.max, low, high))
+    return df.astype({c: SCHEMA[c] for c in columns})
+
+
+# Method to read a CSV dataset chunk by chunk (DataFrames with the compact schema)
+#   (parsed as int64/float64, then checked & narrowed chunk by chunk  -  see 'to_schema')
+def iter_chunks(path, chunksize=DEFAULT_CHUNKSIZE, columns=COLUMNS):
+    for chunk in pd.read_csv(path, usecols=columns, dtype=WIDE_SCHEMA, chunksize=chunksize):
+        yield to_schema(chunk[columns], columns)
+
+
+# Method to read the columns of a converted .npy dataset (a directory)  -  memory-mapped (nothing is read up front)
+def load_columns(directory, columns=COLUMNS, mmap=True):
+    return {c: np.load(os.path.join(directory, c + ".npy"), mmap_mode="r" if mmap else None) for c in columns}
+
+
+# Method to read a dataset into a DataFrame with the compact schema
+#   (a CSV file, a Parquet file, or a directory of .npy columns  -  see 'convert')
+def read_dataset(path, columns=COLUMNS, chunksize=None):
+    if os.path.isdir(path):
+        return pd.DataFrame(load_columns(path, columns), copy=False)
+    if os.path.splitext(path)[1].lower() == ".parquet":
+        return to_schema(pd.read_parquet(path, columns=columns), columns)
+    if chunksize:
+        return pd.concat(iter_chunks(path, chunksize, columns), ignore_index=True)
+    return to_schema(pd.read_csv(path, usecols=columns, dtype=WIDE_SCHEMA)[columns], columns)
+
+
+# Method to count the data rows of a CSV file (without parsing it)  -  an upper bound: blank lines (e.g. trailing
+# ones) are counted, but skipped by the parser
+def count_rows(path):
+    if os.path.getsize(path) == 0:
+        return 0
+    with open(path, "rb") as f:
+        lines = sum(block.count(b"\n") for block in iter(lambda: f.read(1 << 20), b""))
+        f.seek(-1, os.SEEK_END)
+        if f.read(1) != b"\n":
+            lines += 1  # last line has no trailing newline
+    return lines - 1  # header
+
+
+# Method to copy the first 'n_rows' values of a column into a new .npy file, chunk by chunk
+def _write_head(path, array, n_rows, chunksize):
+    head = np.lib.format.open_memmap(path, mode="w+", dtype=array.dtype, shape=(n_rows,))
+    for start in range(0, n_rows, chunksize):
+        head[start:start + chunksize] = array[start:min(start + chunksize, n_rows)]
+    head.flush()
+
+
+# Method to convert a CSV dataset into a columnar binary format, chunk by chunk (constant memory)
+#   (returns the number of rows converted)
+def convert(path, output, format="npy", chunksize=DEFAULT_CHUNKSIZE):
+    if format == "npy":
+        n_rows = count_rows(path)
+        os.makedirs(output, exist_ok=True)
+        arrays = {c: np.lib.format.open_memmap(os.path.join(output, c + ".npy"), mode="w+", dtype=SCHEMA[c],
+                                               shape=(n_rows,)) for c in COLUMNS}
+
+        row = 0
+        for chunk in iter_chunks(path, chunksize):
+            if row + len(chunk) > n_rows:
+                raise ValueError("%s has more rows than lines (%d)  -  quoted line breaks are not supported"
+                                 % (path, n_rows))
+            for c in COLUMNS:
+                arrays[c][row:row + len(chunk)] = chunk[c].to_numpy()
+            row += len(chunk)
+
+        for c in COLUMNS:
+            arrays[c].flush()
+
+        # Fewer rows than lines (blank lines)  -  shrink every column to the rows actually parsed
+        if row < n_rows:
+            for c in COLUMNS:
+                _write_head(os.path.join(output, c + ".npy.tmp"), arrays[c], row, chunksize)
+            # (the memory maps are closed first  -  an open mapped file can't be replaced on Windows)
+            arrays.clear()
+            for c in COLUMNS:
+                os.replace(os.path.join(output, c + ".npy.tmp"), os.path.join(output, c + ".npy"))
+        return row
+
+    if format == "parquet":
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        writer = None
+        row = 0
+        try:
+            for chunk in iter_chunks(path, chunksize):
+                table = pa.Table.from_pandas(chunk, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(output, table.schema)
+                writer.write_table(table)
+                row += len(chunk)
+        finally:
+            if writer is not None:
+                writer.close()
+        return row
+
+    raise ValueError("Unknown format: %r" % format)
+
+
+def main(argv=None):
+    # Command-line options
+    parser = argparse.ArgumentParser(description="Compact dataset loading & conversion")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    convert_cmd = commands.add_parser("convert", help="convert a CSV dataset to a columnar binary format")
+    convert_cmd.add_argument("input", help="CSV dataset (encoded 'heart.csv' schema)")
+    convert_cmd.add_argument("output", help="output directory (npy) or file (parquet)")
+    convert_cmd.add_argument("--format", choices=["npy", "parquet"], default="npy")
+    convert_cmd.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE)
+
+    info_cmd = commands.add_parser("info", help="load a dataset & report its load time & memory usage")
+    info_cmd.add_argument("input", help="CSV/Parquet file or .npy directory")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "convert":
+        start = time.perf_counter()
+        rows = convert(args.input, args.output, args.format, args.chunksize)
+        print("CONVERTED: %d rows in %.2f s" % (rows, time.perf_counter() - start))
+    else:
+        start = time.perf_counter()
+        df = read_dataset(args.input)
+        elapsed = time.perf_counter() - start
+        print("LOADED: %d rows in %.3f s  [%.2f MB with the compact schema  -  %.2f MB with int64/float64]"
+              % (len(df), elapsed, df.memory_usage(index=False).sum() / 1e6, len(df) * len(COLUMNS) * 8 / 1e6))
+
+
+if __name__ == "__main__":
+    main()
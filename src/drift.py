@@ -0,0 +1,346 @@
+# Import libraries
+import argparse
+import json
+import threading
+from collections import deque
+from itertools import chain
+import numpy as np
+from src.encoding import GUI_LABELS
+from src.model_store import FEATURE_COLUMNS
+
+
+################################################
+
+# INPUT DRIFT MONITOR
+#   Streaming statistics of every feature vector predicted, compared against the training data  -  so a shift in the
+#   patients seen (e.g. a new clinic, a miscalibrated device, a changed intake form) shows up before the model's
+#   accuracy quietly degrades. Memory is constant, however many predictions are made:
+#     * mean & variance         - Welford's algorithm (batches merged with Chan's parallel update)
+#     * numeric features        - a fixed-bin histogram (bin edges = the training deciles, so every bin holds ~10% of
+#                                 the training data, + the open-ended bins below & above)
+#     * categorical features    - the frequency of every category (one bin per category)
+#   Drift is scored per feature from the bin counts alone (O(bins)), against the training data's:
+#     * PSI (population stability index)   - < 0.1 no drift, 0.1 - 0.25 moderate, > 0.25 significant
+#     * KL divergence (observed || training)
+#     * mean shift, in training standard deviations
+#
+#   Single predictions only APPEND their feature vectors to a small buffer, folded in every 'row_buffer_size' rows
+#   (every bin of every feature found by ONE binary search over all the edges  -  ~0.15 ms per fold). Small batches
+#   (e.g. the server's micro-batches) are buffered up to 'buffer_size' rows, & larger batches folded in directly, in
+#   cache-sized chunks  -  every bin counted with ONE comparison per edge over a contiguous column. Buffers are also
+#   folded in when a report is asked for. The training statistics are computed once, when the model is trained, &
+#   stored with it (see 'reference_statistics')  -  a stored model's monitor never reads the training data.
+#
+# USAGE:
+#   python -m src.drift patients.csv          (drift of a patient file, 'heart_ORIGINAL.csv' schema, against training)
+
+DEFAULT_BINS = 10
+DEFAULT_BUFFER_SIZE = 1024
+DEFAULT_ROW_BUFFER_SIZE = 128
+
+# Rows folded into the statistics at once (transposed, so every feature's column is contiguous & stays in cache)
+FOLD_ROWS = 1 << 13
+# Below this many rows, bins are found by one binary search over every edge (fewer calls than one compare per edge)
+SEARCH_MAX_ROWS = 256
+
+# PSI levels (the usual rule of thumb)
+PSI_MODERATE = 0.1
+PSI_SIGNIFICANT = 0.25
+
+# Smallest proportion of a bin (an empty bin would make PSI & KL infinite)
+EPSILON = 1e-4
+
+
+################################################
+
+
+# Method to score the drift between two histograms (bin counts)  -  returns the PSI & the KL divergence (p || q)
+def divergence(observed, expected):
+    p = np.maximum(observed / max(observed.sum(), 1), EPSILON)
+    q = np.maximum(expected / max(expected.sum(), 1), EPSILON)
+    log_ratio = np.log(p / q)
+    return float(((p - q) * log_ratio).sum()), float((p * log_ratio).sum())
+
+
+# Method to get the drift level of a PSI
+def drift_level(psi):
+    if psi >= PSI_SIGNIFICANT:
+        return "significant"
+    if psi >= PSI_MODERATE:
+        return "moderate"
+    return "none"
+
+
+# Method to compute the training statistics drift is scored against, as flat arrays (so they can be stored with the
+# model  -  see 'ModelStore.save'): every feature's bin edges & training bin counts one after the other, the number of
+# edges of every feature, & the training mean & standard deviation of every feature
+def reference_statistics(X, features=FEATURE_COLUMNS, bins=DEFAULT_BINS):
+    X = np.asarray(X, dtype=np.float64)
+
+    edges = []
+    for f, name in enumerate(features):
+        if name in GUI_LABELS:
+            # One bin per category (edges halfway between the codes)
+            edges.append(np.array(sorted(GUI_LABELS[name])[:-1]) + 0.5)
+        else:
+            edges.append(np.unique(np.quantile(X[:, f], np.linspace(0, 1, bins + 1)[1:-1])))
+
+    # Bin i holds  edges[i-1] < x <= edges[i]
+    expected = [np.bincount(np.searchsorted(feature_edges, X[:, f], side="left"), minlength=len(feature_edges) + 1)
+                for f, feature_edges in enumerate(edges)]
+    return {
+        "edges": np.concatenate(edges),
+        "edge_counts": np.array([len(feature_edges) for feature_edges in edges]),
+        "expected": np.concatenate(expected),
+        "train_mean": X.mean(axis=0),
+        "train_std": X.std(axis=0),
+    }
+
+
+class DriftMonitor:
+    def __init__(self, reference, features=FEATURE_COLUMNS, bins=DEFAULT_BINS, buffer_size=DEFAULT_BUFFER_SIZE,
+                 row_buffer_size=DEFAULT_ROW_BUFFER_SIZE):
+        # Training feature matrix  -  or a function returning it, called by 'prepare' (so creating the monitor never
+        # reads the dataset)
+        self.reference = reference
+        self.features = list(features)
+        self.bins = bins
+        self.buffer_size = buffer_size
+        self.row_buffer_size = row_buffer_size
+
+        # Feature vectors of single predictions & small batches not folded into the statistics yet
+        self.buffer = []
+        self.batches = deque()
+        self.batched_rows = 0
+        self.lock = threading.Lock()
+
+        # Per feature  -  the bin edges (& as lists, for the fold loop) & labels, & the training statistics (set by
+        # '_build')
+        self.edges = None
+        self._edges = None
+        # Every feature's edges in one sorted array (feature f's values clipped to its edges & shifted by f * width),
+        # for the binary search of small folds
+        self.search_edges = None
+        self.search_low = None
+        self.search_high = None
+        self.search_shift = None
+        self.bin_labels = None
+        self.expected = None
+        self.train_mean = None
+        self.train_std = None
+
+        # Streaming statistics of the observed feature vectors
+        self.count = 0
+        self.mean = np.zeros(len(self.features))
+        self.m2 = np.zeros(len(self.features))
+        # Bin counts of every feature, one after the other (& per feature  -  views of it)
+        self.all_counts = None
+        self.counts = None
+
+    """ Method to set up the bins & the training statistics now  -  call it while the model loads, so no prediction
+        ever waits for them  -  'statistics' are the ones stored with the model (see 'reference_statistics'), if any
+        (otherwise they are computed from the training data) """
+    def prepare(self, statistics=None):
+        with self.lock:
+            if self.edges is None:
+                self._build(statistics)
+        return self
+
+    # Method to set up the bins & the training statistics (called once, under the lock)
+    def _build(self, statistics=None):
+        if statistics is None:
+            X = self.reference() if callable(self.reference) else self.reference
+            statistics = reference_statistics(X, self.features, self.bins)
+
+        sizes = np.asarray(statistics["edge_counts"])
+        self.edges = np.split(np.asarray(statistics["edges"], dtype=np.float64), np.cumsum(sizes)[:-1])
+        self.expected = np.split(np.asarray(statistics["expected"]), np.cumsum(sizes + 1)[:-1])
+        self.train_mean = np.asarray(statistics["train_mean"], dtype=np.float64)
+        self.train_std = np.asarray(statistics["train_std"], dtype=np.float64)
+        self._edges = [edges.tolist() for edges in self.edges]
+
+        # Categories are labelled by name, numeric bins by their range
+        self.bin_labels = []
+        for name, edges in zip(self.features, self.edges):
+            if name in GUI_LABELS:
+                self.bin_labels.append([GUI_LABELS[name][code] for code in sorted(GUI_LABELS[name])])
+            else:
+                self.bin_labels.append(["<= %g" % edges[0]] +
+                                       ["%g - %g" % (low, high) for low, high in zip(edges[:-1], edges[1:])] +
+                                       ["> %g" % edges[-1]])
+
+        sizes = [len(edges) + 1 for edges in self.edges]
+        self.all_counts = np.zeros(sum(sizes), dtype=np.int64)
+        self.counts = np.split(self.all_counts, np.cumsum(sizes)[:-1])
+
+        # Clipping to just outside the first & last edges keeps every value in its bin
+        self.search_low = np.array([edges[0] - 1 for edges in self.edges])
+        self.search_high = np.array([edges[-1] + 1 for edges in self.edges])
+        width = (self.search_high - self.search_low).max() + 1
+        self.search_shift = np.arange(len(self.features)) * width - self.search_low
+        self.search_edges = np.concatenate([edges + self.search_shift[f] for f, edges in enumerate(self.edges)])
+
+    # Method to fold a feature matrix into the statistics (under the lock)
+    def _update(self, X):
+        if self.edges is None:
+            self._build()
+
+        for start in range(0, len(X), FOLD_ROWS):
+            chunk = np.ascontiguousarray(X[start:start + FOLD_ROWS].T)
+            n = chunk.shape[1]
+
+            # Chan's parallel update of Welford's running mean & sum of squared deviations
+            chunk_mean = chunk.mean(axis=1)
+            deviations = chunk - chunk_mean[:, np.newaxis]
+            chunk_m2 = np.einsum("ij,ij->i", deviations, deviations)
+            delta = chunk_mean - self.mean
+            total = self.count + n
+            self.mean += delta * (n / total)
+            self.m2 += chunk_m2 + delta ** 2 * (self.count * n / total)
+            self.count = total
+
+            if n < SEARCH_MAX_ROWS:
+                self._count_small(X[start:start + n])
+                continue
+
+            # Bin counts from the number of values <= every edge (cumulative)
+            for counts, edges, column in zip(self.counts, self._edges, chunk):
+                below = 0
+                for i, edge in enumerate(edges):
+                    at_or_below = int(np.count_nonzero(column <= edge))
+                    counts[i] += at_or_below - below
+                    below = at_or_below
+                counts[-1] += n - below
+
+    # Method to count the bins of a few rows  -  the index of a value among ALL the edges is the index of its bin
+    #   among all the bins, less the number of features before it (each feature has one bin more than edges)
+    def _count_small(self, X):
+        keys = np.clip(X, self.search_low, self.search_high)
+        keys += self.search_shift
+        bins = np.searchsorted(self.search_edges, keys, side="left")
+        bins += np.arange(len(self.features))
+        self.all_counts += np.bincount(bins.ravel(), minlength=len(self.all_counts))
+
+    """ Method to record a single feature vector  -  O(1): buffered, & folded in with the next full buffer """
+    def observe_one(self, features):
+        # Copied  -  the caller may reuse its list before the buffer is folded in
+        self.buffer.append(tuple(features))
+        if len(self.buffer) >= self.row_buffer_size:
+            self.flush()
+
+    """ Method to record a batch of feature vectors (2D array-like)  -  small batches are buffered """
+    def observe(self, X):
+        X = np.asarray(X, dtype=np.float64)
+        if len(X) >= self.buffer_size:
+            with self.lock:
+                self._update(X)
+        elif len(X):
+            # Copied  -  the caller may reuse its array before the buffer is folded in
+            self.batches.append(X.copy())
+            self.batched_rows += len(X)
+            if self.batched_rows >= self.buffer_size:
+                self.flush()
+
+    """ Method to fold the buffered feature vectors into the statistics """
+    def flush(self):
+        with self.lock:
+            # Only the vectors buffered so far  -  vectors appended meanwhile stay for the next flush
+            self.batched_rows = 0
+            parts = [self.batches.popleft() for _ in range(len(self.batches))]
+            if self.buffer:
+                # (taking & deleting a slice are each atomic  -  appends only ever add to the end)
+                n_rows = len(self.buffer)
+                rows = self.buffer[:n_rows]
+                del self.buffer[:n_rows]
+                # (one flat pass over the values  -  faster than converting a list of rows)
+                parts.append(np.fromiter(chain.from_iterable(rows), dtype=np.float64,
+                                         count=n_rows * len(self.features)).reshape(n_rows, -1))
+            if parts:
+                self._update(np.concatenate(parts) if len(parts) > 1 else parts[0])
+
+    """ Method to drop every observation (e.g. after retraining on the data seen so far) """
+    def reset(self):
+        with self.lock:
+            self.buffer.clear()
+            self.batches.clear()
+            self.batched_rows = 0
+            self.count = 0
+            self.mean[:] = 0.0
+            self.m2[:] = 0.0
+            if self.all_counts is not None:
+                self.all_counts[:] = 0
+
+    """ Method to report the drift of every feature (a JSON-serializable dict)
+        -  'histograms' adds the observed & training proportion of every bin """
+    def report(self, histograms=False):
+        self.flush()
+        with self.lock:
+            if self.edges is None:
+                self._build()
+
+            features = {}
+            for f, name in enumerate(self.features):
+                psi, kl = divergence(self.counts[f], self.expected[f])
+                std = float(np.sqrt(self.m2[f] / self.count)) if self.count else 0.0
+                entry = {
+                    "mean": float(self.mean[f]) if self.count else None,
+                    "std": std if self.count else None,
+                    "train_mean": float(self.train_mean[f]),
+                    "train_std": float(self.train_std[f]),
+                    # In training standard deviations
+                    "mean_shift": (float((self.mean[f] - self.train_mean[f]) / self.train_std[f])
+                                   if self.count and self.train_std[f] else None),
+                    "psi": psi if self.count else None,
+                    "kl": kl if self.count else None,
+                    "drift": drift_level(psi) if self.count else None,
+                }
+                if histograms:
+                    entry["bins"] = self.bin_labels[f]
+                    entry["observed"] = (self.counts[f] / max(self.count, 1)).tolist()
+                    entry["expected"] = (self.expected[f] / self.expected[f].sum()).tolist()
+                features[name] = entry
+
+            return {
+                "observed": self.count,
+                "drifted": [name for name, entry in features.items() if entry["drift"] not in (None, "none")],
+                "features": features,
+            }
+
+
+# Method to format a drift report (see 'DriftMonitor.report') as a text table
+def format_report(report):
+    lines = ["OBSERVED: %d feature vectors" % report["observed"],
+             "%-16s %10s %10s %10s %8s %8s  %s" % ("FEATURE", "MEAN", "TRAIN", "SHIFT(sd)", "PSI", "KL", "DRIFT")]
+    for name, entry in report["features"].items():
+        if entry["mean"] is None:
+            lines.append("%-16s %10s %10.2f %10s %8s %8s  %s" % (name, "-", entry["train_mean"], "-", "-", "-", "-"))
+            continue
+        lines.append("%-16s %10.2f %10.2f %10s %8.3f %8.3f  %s"
+                     % (name, entry["mean"], entry["train_mean"],
+                        "-" if entry["mean_shift"] is None else "%+.2f" % entry["mean_shift"],
+                        entry["psi"], entry["kl"], entry["drift"]))
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    # Command-line options
+    parser = argparse.ArgumentParser(description="Input drift of a patient file against the training data")
+    parser.add_argument("input", help="CSV patient file ('heart_ORIGINAL.csv' schema)")
+    parser.add_argument("--json", action="store_true", help="print the full report (with histograms) as JSON")
+    args = parser.parse_args(argv)
+
+    from src.encoding import read_raw
+    from src.predictor import HeartDiseasePredictor
+
+    predictor = HeartDiseasePredictor()
+    monitor = DriftMonitor(predictor.dataset[FEATURE_COLUMNS].to_numpy(dtype=np.float64))
+    for chunk in read_raw(args.input, 50000):
+        X, valid = predictor.encode_frame(chunk)
+        monitor.observe(X[valid])
+
+    report = monitor.report(histograms=args.json)
+    print(json.dumps(report, indent=2) if args.json else format_report(report))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,231 @@
+# Import libraries
+#   (numpy & pandas are imported by the vectorized methods themselves  -  the encoding TABLES are also used by the
+#    GUI, which must not pay for loading them at startup)
+import argparse
+import math
+import numbers
+import time
+from src.model_store import FEATURE_COLUMNS, LABEL_COLUMN
+
+
+################################################
+
+# ENCODING PIPELINE
+#   The ONE place the categorical features are defined  -  the raw category codes (as found in 'heart_ORIGINAL.csv'),
+#   the GUI option labels (as shown in the input form) & the encoded data values (as the classifier is trained on)
+#   are all derived from the same table, so training & serving can never diverge.
+#
+#   'heart.csv' is 'heart_ORIGINAL.csv' run through this pipeline, with the (invalid) rows where 'Cholesterol' is 0
+#   removed  -  it can be regenerated with:
+#       python -m src.encoding src/resources/heart_ORIGINAL.csv -o src/resources/heart.csv
+
+# CATEGORY TABLE  -  feature -> (encoded value, raw category code, GUI label), in the order shown in the GUI
+#   (a raw code of None means the raw data is already encoded)
+CATEGORIES = {
+    'Sex': [
+        (0, 'M', 'Male'),
+        (1, 'F', 'Female'),
+    ],
+    'ChestPainType': [
+        (0, 'TA', 'Typical Angina'),
+        (1, 'ATA', 'Atypical Angina'),
+        (2, 'NAP', 'Non-Anginal Pain'),
+        (3, 'ASY', 'Asymptomatic'),
+    ],
+    'FastingBS': [
+        (1, None, 'Yes'),
+        (0, None, 'No'),
+    ],
+    'RestingECG': [
+        (0, 'Normal', 'Normal'),
+        (1, 'ST', 'ST-T Wave Abnormality'),
+        (2, 'LVH', 'Probable Left Ventricular Hypertrophy'),
+    ],
+    'ExerciseAngina': [
+        (1, 'Y', 'Yes'),
+        (0, 'N', 'No'),
+    ],
+    'ST_Slope': [
+        (1, 'Up', 'Up-sloping'),
+        (0, 'Flat', 'Flat'),
+        (2, 'Down', 'Down-sloping'),
+    ],
+}
+
+# Numeric (non-categorical) features  -  feature name to the type its (GUI) text value is converted to
+NUMERIC_TYPES = {
+    'Age':         int,
+    'RestingBP':   int,
+    'Cholesterol': int,
+    'MaxHR':       int,
+    'Oldpeak':     float,
+}
+
+# Invalid data values  -  rows with any of these are filtered out (when filtering is enabled)
+DEFAULT_INVALID_VALUES = {
+    'Cholesterol': [0],
+}
+
+#######################
+# DERIVED TABLES      #
+#######################
+
+# Raw category code -> encoded value
+ORIGINAL_ENCODINGS = {
+    feature: {raw: code for code, raw, _ in rows}
+    for feature, rows in CATEGORIES.items() if rows[0][1] is not None
+}
+
+# GUI label -> encoded value
+GUI_ENCODINGS = {feature: {label: code for code, _, label in rows} for feature, rows in CATEGORIES.items()}
+
+# GUI labels (in the order shown in the GUI)
+GUI_OPTIONS = {feature: [label for _, _, label in rows] for feature, rows in CATEGORIES.items()}
+
+# Encoded value -> GUI label
+GUI_LABELS = {feature: {code: label for code, _, label in rows} for feature, rows in CATEGORIES.items()}
+
+
+################################################
+
+
+# Method to encode the text values of the input form (feature name -> text value) into a feature list
+def encode_form(values):
+    features = []
+    for column in FEATURE_COLUMNS:
+        if column in GUI_ENCODINGS:
+            features.append(GUI_ENCODINGS[column][values[column]])
+        else:
+            features.append(NUMERIC_TYPES[column](values[column]))
+
+    return features
+
+
+# Method to encode a single record (feature name -> value) into a feature list
+#   (categorical values may be given either as raw category codes, e.g. 'M' or 'ATA', or as their encoded values)
+def encode_record(record):
+    features = []
+    for column in FEATURE_COLUMNS:
+        value = record[column]
+        if isinstance(value, str) and column in ORIGINAL_ENCODINGS:
+            features.append(ORIGINAL_ENCODINGS[column][value])
+        else:
+            features.append(float(value))
+
+    return features
+
+
+# Method to check an encoded feature vector  -  raises a ValueError if it isn't one
+#   (one finite number per feature; 'stored' also requires the values the dataset can hold  -  a known category,
+#    & a whole number within its column's type for the integer features, see 'src.data_loader.SCHEMA')
+def check_features(features, stored=False):
+    if len(features) != len(FEATURE_COLUMNS):
+        raise ValueError("expected %d features, got %d" % (len(FEATURE_COLUMNS), len(features)))
+
+    for column, value in zip(FEATURE_COLUMNS, features):
+        if isinstance(value, bool) or not isinstance(value, numbers.Real) or not math.isfinite(value):
+            raise ValueError("%s: %r is not a finite number" % (column, value))
+        if not stored:
+            continue
+
+        if column in GUI_LABELS:
+            if value not in GUI_LABELS[column]:
+                raise ValueError("%s: %r is not one of %s" % (column, value, sorted(GUI_LABELS[column])))
+        elif NUMERIC_TYPES[column] is int:
+            import numpy as np
+            from src.data_loader import SCHEMA
+
+            bounds = np.iinfo(SCHEMA[column])
+            if value != int(value) or not bounds.min <= value <= bounds.max:
+                raise ValueError("%s: %r is not a whole number in [%d, %d]" % (column, value, bounds.min, bounds.max))
+
+
+# Method to read a raw CSV dataset ('heart_ORIGINAL.csv' schema), optionally in chunks
+#   (the categorical columns are parsed straight into pandas categoricals, so encoding them only has to map the
+#    handful of distinct categories, not every row)
+def read_raw(path, chunksize=None):
+    import pandas as pd
+
+    return pd.read_csv(path, dtype={column: "category" for column in ORIGINAL_ENCODINGS}, chunksize=chunksize)
+
+
+# Method to encode a single categorical column (vectorized)  -  returns the codes, with -1 for unknown categories
+def encode_column(values, mapping):
+    import numpy as np
+    import pandas as pd
+
+    # Categorical codes index the categories  -  one lookup table turns them into encoded values (-1 stays -1)
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        categories = values.cat.categories
+        codes = values.cat.codes.to_numpy()
+    else:
+        categories = list(mapping)
+        codes = pd.Categorical(values, categories=categories).codes
+    lookup = np.array([mapping.get(c, -1) for c in categories] + [-1], dtype=np.int8)
+
+    return lookup[codes]
+
+
+# Method to encode a DataFrame in the 'heart_ORIGINAL.csv' schema into a feature matrix
+#   (returns the feature matrix & a boolean mask of valid rows  -  rows with unknown categories, missing values or,
+#    if 'invalid_values' is given (feature -> values), any of those values are NOT valid)
+def encode_frame(df, invalid_values=None):
+    import numpy as np
+    import pandas as pd
+
+    X = np.empty((len(df), len(FEATURE_COLUMNS)), dtype=np.float64)
+    valid = np.ones(len(df), dtype=bool)
+
+    for i, column in enumerate(FEATURE_COLUMNS):
+        if column in ORIGINAL_ENCODINGS:
+            codes = encode_column(df[column], ORIGINAL_ENCODINGS[column])
+            valid &= codes >= 0
+            X[:, i] = codes
+        else:
+            values = df[column]
+            if not pd.api.types.is_numeric_dtype(values.dtype):
+                values = pd.to_numeric(values, errors="coerce")
+            X[:, i] = values.to_numpy(dtype=np.float64, na_value=np.nan)
+            valid &= ~np.isnan(X[:, i])
+
+    for column, values in (invalid_values or {}).items():
+        valid &= ~np.isin(X[:, FEATURE_COLUMNS.index(column)], values)
+
+    return X, valid
+
+
+# Method to turn a raw dataset ('heart_ORIGINAL.csv' schema) into an encoded training dataset ('heart.csv' schema)
+#   (rows which aren't valid  -  see 'encode_frame'  -  are dropped)
+def prepare_dataset(df, invalid_values=DEFAULT_INVALID_VALUES):
+    import pandas as pd
+
+    X, valid = encode_frame(df, invalid_values)
+    encoded = pd.DataFrame(X[valid], columns=FEATURE_COLUMNS)
+    for column in FEATURE_COLUMNS:
+        if NUMERIC_TYPES.get(column, int) is int:
+            encoded[column] = encoded[column].astype("int64")
+    encoded[LABEL_COLUMN] = df[LABEL_COLUMN].to_numpy()[valid]
+
+    return encoded
+
+
+def main(argv=None):
+    # Command-line options
+    parser = argparse.ArgumentParser(description="Encode a raw ('heart_ORIGINAL.csv' schema) dataset for training")
+    parser.add_argument("input", help="raw dataset (CSV)")
+    parser.add_argument("-o", "--output", required=True, help="encoded dataset (CSV)")
+    parser.add_argument("--keep-invalid", action="store_true",
+                        help="keep the rows with invalid data values (e.g. 'Cholesterol' of 0)")
+    args = parser.parse_args(argv)
+
+    df = read_raw(args.input)
+    start = time.perf_counter()
+    encoded = prepare_dataset(df, {} if args.keep_invalid else DEFAULT_INVALID_VALUES)
+    elapsed = time.perf_counter() - start
+
+    encoded.to_csv(args.output, index=False, float_format="%g")
+    print("ENCODED: %d rows (%d removed) in %.3f s" % (len(encoded), len(df) - len(encoded), elapsed))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+# Import libraries
+#   (sklearn is only imported to TRAIN  -  see 'make_estimator'  -  & numpy only by the compiled engines, so the
+#    command-line options below are cheap to import, e.g. by the GUI before its model is loaded)
+import importlib
+import json
+
+
+################################################
+
+# ESTIMATORS
+#   The classifiers the predictor can be trained with  -  a single decision tree, or a tree ensemble  -  all compiled
+#   into flat node arrays, so every one of them is served through the same 'predict' / 'predict_proba' surface
+#   (see 'CompiledTree' & 'CompiledForest').
+
+# Estimator name -> (sklearn module, class, default parameters)
+ESTIMATORS = {
+    'decision_tree':     ('sklearn.tree', 'DecisionTreeClassifier', {}),
+    'bagging':           ('sklearn.ensemble', 'BaggingClassifier', {'n_estimators': 50, 'random_state': 0}),
+    'random_forest':     ('sklearn.ensemble', 'RandomForestClassifier', {'n_estimators': 100, 'random_state': 0}),
+    'extra_trees':       ('sklearn.ensemble', 'ExtraTreesClassifier', {'n_estimators': 100, 'random_state': 0}),
+    'gradient_boosting': ('sklearn.ensemble', 'GradientBoostingClassifier',
+                          {'n_estimators': 100, 'max_depth': 3, 'random_state': 0}),
+}
+
+DEFAULT_ESTIMATOR = 'decision_tree'
+
+
+################################################
+
+
+# Method to get an estimator's parameters  -  its defaults, overridden by 'params'
+def estimator_params(name, params=None):
+    return dict(ESTIMATORS[name][2], **(params or {}))
+
+
+# Method to describe an estimator & its parameters as a string (part of the model fingerprint)
+def estimator_spec(name, params=None):
+    return "%s%s" % (name, json.dumps(estimator_params(name, params), sort_keys=True))
+
+
+# Method to create an (unfitted) sklearn estimator
+def make_estimator(name=DEFAULT_ESTIMATOR, params=None):
+    module, class_name, _ = ESTIMATORS[name]
+    return getattr(importlib.import_module(module), class_name)(**estimator_params(name, params))
+
+
+# Method to add the estimator options (--estimator & --params) to a command-line parser
+def add_estimator_arguments(parser):
+    parser.add_argument("--estimator", choices=sorted(ESTIMATORS), default=DEFAULT_ESTIMATOR,
+                        help="classifier to train (default: %(default)s)")
+    parser.add_argument("--params", type=json.loads, default=None, metavar="JSON",
+                        help="estimator parameters overriding its defaults, e.g. '{\"n_estimators\": 200}'")
+
+
+# Method to compile a fitted sklearn estimator into its inference engine
+def compile_model(model):
+    from src.compiled_forest import CompiledForest
+    from src.compiled_tree import CompiledTree
+
+    if hasattr(model, "tree_"):
+        return CompiledTree.from_sklearn(model)
+    return CompiledForest.from_sklearn(model)
+
+
+# Method to rebuild an inference engine from its node arrays (see 'to_arrays')
+def engine_from_arrays(arrays):
+    from src.compiled_forest import CompiledForest
+    from src.compiled_tree import CompiledTree
+
+    if "roots" in arrays:
+        return CompiledForest.from_arrays(arrays)
+    return CompiledTree.from_arrays(arrays)
@@ -0,0 +1,141 @@
+# Import libraries
+import numpy as np
+from src.compiled_tree import CompiledTree
+from src.encoding import GUI_LABELS
+from src.model_store import FEATURE_COLUMNS
+
+
+################################################
+
+# DECISION-PATH INDEX
+#   Explanations of the compiled tree's predictions, precomputed ONCE per model: every leaf stores the conditions on
+#   its decision path (which features & thresholds led there) & its class probabilities. Explaining a prediction is
+#   then just the O(depth) traversal to its leaf + a lookup  -  no 'decision_path' call per request.
+#   Tree ensembles have no single decision path  -  their explanations only hold the prediction & its probabilities.
+
+
+################################################
+
+
+# Method to format a threshold (sklearn's thresholds are midpoints, e.g. 54.5  -  no trailing zeros)
+def format_threshold(value):
+    return "%g" % value
+
+
+# Method to describe the bounds (lower < x <= upper) a decision path puts on a single feature
+def describe_bounds(feature, lower, upper):
+    # Categorical features: list the categories within the bounds (by their form labels)
+    if feature in GUI_LABELS:
+        labels = [label for code, label in GUI_LABELS[feature].items() if lower < code <= upper]
+        return "%s: %s" % (feature, ", ".join(labels))
+
+    if lower == -np.inf:
+        return "%s <= %s" % (feature, format_threshold(upper))
+    if upper == np.inf:
+        return "%s > %s" % (feature, format_threshold(lower))
+    return "%s < %s <= %s" % (format_threshold(lower), feature, format_threshold(upper))
+
+
+class DecisionPathIndex:
+    def __init__(self, engine, features=FEATURE_COLUMNS):
+        # The compiled tree explained (predictions are traversed by it)
+        self.engine = engine
+        self.features = list(features)
+
+        # Leaf node -> explanation (a JSON-serializable dict, shared by every prediction reaching that leaf)
+        self.leaves = {}
+        # Per-node lookup arrays for batch mode (only the entries of leaves are meaningful)
+        self.confidence = np.zeros(engine.node_count)
+        self.summary = np.empty(engine.node_count, dtype=object)
+
+        self._build()
+
+    def _build(self):
+        engine = self.engine
+        classes = engine.classes.tolist()
+
+        # Depth-first walk, carrying the conditions of the path taken so far  -  (feature index, '<=' or '>', threshold)
+        stack = [(0, [])]
+        while stack:
+            node, path = stack.pop()
+            if not engine.is_leaf[node]:
+                feature, threshold = int(engine.feature[node]), float(engine.threshold[node])
+                stack.append((int(engine.right[node]), path + [(feature, ">", threshold)]))
+                stack.append((int(engine.left[node]), path + [(feature, "<=", threshold)]))
+                continue
+
+            # Merge the conditions on each feature into bounds (features in the order they were first tested)
+            bounds = {}
+            for feature, operator, threshold in path:
+                lower, upper = bounds.get(feature, (-np.inf, np.inf))
+                bounds[feature] = (lower, min(upper, threshold)) if operator == "<=" else (max(lower, threshold), upper)
+            conditions = [describe_bounds(self.features[f], lower, upper) for f, (lower, upper) in bounds.items()]
+
+            probability = engine.value[node]
+            self.leaves[node] = {
+                "leaf": node,
+                "prediction": classes[int(probability.argmax())],
+                # Probability of the predicted class
+                "confidence": float(probability.max()),
+                "probability": dict(zip(classes, probability.tolist())),
+                "path": [{"feature": self.features[f], "operator": operator, "threshold": threshold}
+                         for f, operator, threshold in path],
+                "conditions": conditions,
+            }
+            self.confidence[node] = probability.max()
+            self.summary[node] = "; ".join(conditions)
+
+    """ Method to explain the prediction of a single feature vector  -  returns its leaf's explanation (see '_build') """
+    def explain_one(self, features):
+        return self.leaves[self.engine.apply_one(features)]
+
+    """ Method to explain the predictions of a batch of feature vectors  -  returns one explanation per row """
+    def explain(self, X):
+        leaves = self.leaves
+        return [leaves[leaf] for leaf in self.engine.apply(X).tolist()]
+
+    """ Method to summarize the predictions of a batch of feature vectors (vectorized)
+        -  returns the predictions, their confidence & their conditions (as text) """
+    def summarize(self, X):
+        leaves = self.engine.apply(X)
+        return self.engine.node_class[leaves], self.confidence[leaves], self.summary[leaves]
+
+
+class ProbabilityIndex:
+    def __init__(self, engine):
+        # The compiled ensemble explained (see 'CompiledForest')
+        self.engine = engine
+        self.classes = engine.classes.tolist()
+
+    # Method to build the explanation of a prediction (same keys as a decision path's  -  with no conditions)
+    def _explanation(self, prediction, probability):
+        return {
+            "prediction": prediction,
+            "confidence": float(probability.max()),
+            "probability": dict(zip(self.classes, probability.tolist())),
+            "path": [],
+            "conditions": [],
+        }
+
+    """ Method to explain the prediction of a single feature vector """
+    def explain_one(self, features):
+        return self._explanation(*self.engine.predict_with_proba_one(features))
+
+    """ Method to explain the predictions of a batch of feature vectors  -  returns one explanation per row """
+    def explain(self, X):
+        predictions, probabilities = self.engine.predict_with_proba(X)
+        return [self._explanation(prediction, probability)
+                for prediction, probability in zip(predictions.tolist(), probabilities)]
+
+    """ Method to summarize the predictions of a batch of feature vectors (vectorized)
+        -  returns the predictions, their confidence & (empty) conditions """
+    def summarize(self, X):
+        predictions, probabilities = self.engine.predict_with_proba(X)
+        return predictions, probabilities.max(axis=1), np.full(len(predictions), "", dtype=object)
+
+
+# Method to build the explanation index of an inference engine  -  decision paths for a single tree
+def make_explainer(engine):
+    if isinstance(engine, CompiledTree):
+        return DecisionPathIndex(engine)
+    return ProbabilityIndex(engine)
@@ -0,0 +1,96 @@
+# Import libraries
+#   (no Tkinter  -  the schema also drives non-GUI entry, e.g. tables of patients)
+from src.encoding import GUI_ENCODINGS, GUI_OPTIONS, NUMERIC_TYPES
+from src.model_store import FEATURE_COLUMNS
+
+
+################################################
+
+# INPUT FORM SCHEMA
+#   Every field of the patient input form  -  its label, widget, valid range or options, & layout  -  defined ONCE.
+#   The form (Page2) is generated from it, & every submitted form is checked by ONE generic validation pass, against
+#   lookup tables built here at import time.
+
+# Placeholder of an option field with no option selected yet
+PLACEHOLDER = "Select..."
+
+
+################################################
+
+
+class FormField:
+    def __init__(self, name, label, heading, widget, layout, options=None, low=None, high=None, increment=1,
+                 default="0", missing=None):
+        # Feature name, form label & (short) table heading
+        self.name = name
+        self.label = label
+        self.heading = heading
+
+        # 'spinbox' (numeric, from 'low' to 'high') or 'option' (one of 'options')
+        self.widget = widget
+        self.options = options
+        self.low = low
+        self.high = high
+        self.increment = increment
+
+        # Initial value, & the value meaning "not entered" (None if every value in range is valid)
+        self.default = PLACEHOLDER if widget == "option" else default
+        self.missing = missing
+
+        # Placement  -  (row frame, grid row, grid column) of the label (the input goes in the next column)
+        self.layout = layout
+
+        # Text value -> encoded value  -  option label lookup table, or the numeric type conversion
+        self.encodings = GUI_ENCODINGS.get(name)
+        self.encode = self.encodings.__getitem__ if widget == "option" else NUMERIC_TYPES[name]
+
+    """ Method to check a text value of this field  -  returns whether it is complete & valid """
+    def is_valid(self, text):
+        if self.widget == "option":
+            return text in self.encodings
+        try:
+            value = self.encode(text)
+        except ValueError:
+            return False
+        return self.low <= value <= self.high and value != self.missing
+
+
+# The input form  -  in the order its fields are shown
+FORM_FIELDS = [
+    FormField('Age', "Age:", "Age", "spinbox", (0, 0, 0), low=0, high=99, missing=0),
+    FormField('Sex', "Gender:", "Sex", "option", (0, 0, 2), options=GUI_OPTIONS['Sex']),
+    FormField('ChestPainType', "Is the patient experiencing chest pain?", "Chest pain", "option", (1, 0, 0),
+              options=GUI_OPTIONS['ChestPainType']),
+    FormField('FastingBS', "Is the patient fasting?", "Fasting", "option", (2, 0, 0),
+              options=GUI_OPTIONS['FastingBS']),
+    FormField('RestingBP', "Resting BP (mm Hg):", "BP", "spinbox", (3, 0, 0), low=0, high=999, missing=0),
+    FormField('Cholesterol', "Cholesterol (mm/dl):", "Chol.", "spinbox", (3, 1, 0), low=0, high=999, missing=0),
+    FormField('RestingECG', "Resting ECG results:", "ECG", "option", (4, 0, 0), options=GUI_OPTIONS['RestingECG']),
+    FormField('MaxHR', "Maximum heart-rate achieved:", "Max HR", "spinbox", (5, 0, 0), low=0, high=999, missing=0),
+    FormField('ExerciseAngina', "Does the patient have exercise-induced angina?", "Angina", "option", (6, 0, 0),
+              options=GUI_OPTIONS['ExerciseAngina']),
+    # Initializes to 0.0, which is VALID
+    FormField('Oldpeak', "Oldpeak:", "Oldpeak", "spinbox", (7, 0, 0), low=-10, high=10, increment=0.5, default="0.0"),
+    FormField('ST_Slope', "ST Slope:", "ST slope", "option", (8, 0, 0), options=GUI_OPTIONS['ST_Slope']),
+]
+
+# Feature name -> field
+FIELDS = {field.name: field for field in FORM_FIELDS}
+
+# Number of row frames of the form
+FORM_ROWS = max(field.layout[0] for field in FORM_FIELDS) + 1
+
+assert sorted(FIELDS) == sorted(FEATURE_COLUMNS), "the form must have exactly one field per feature"
+
+
+################################################
+
+
+# Method to check the text values of a form (feature name -> text value)  -  returns the names of the invalid fields
+def validate_form(values):
+    return [field.name for field in FORM_FIELDS if not field.is_valid(values[field.name])]
+
+
+# Method to get the default text values of a form (feature name -> text value)
+def default_values():
+    return {field.name: field.default for field in FORM_FIELDS}
@@ -0,0 +1,322 @@
+# Import libraries
+import argparse
+import time
+from array import array
+from bisect import bisect_left
+import numpy as np
+from src.form_schema import FORM_FIELDS
+from src.model_store import FEATURE_COLUMNS
+
+
+################################################
+
+# PRECOMPUTED LOOKUP TABLE
+#   Every input of the form is bounded, & for each feature the tree only cares about which of its threshold
+#   intervals ("buckets") a value falls in. After training, each feature is collapsed into the buckets its form
+#   domain can reach, & the leaf of every reachable bucket combination is precomputed  -  a prediction is then a
+#   'bisect' per feature plus table indexing, with no tree traversal. Two layouts:
+#     * 'dense'    - ONE array over every bucket combination (mixed-radix index)  -  used while it has at most
+#                    'max_cells' cells
+#     * 'layered'  - one small transition table per feature: (state, bucket) -> next state, where a state is the set
+#                    of leaves still possible once the previous features are known (identical states are shared).
+#                    Exact & compact for trees whose dense table would be far too large (e.g. unpruned trees)
+#   Tables are filled from the leaves' boxes (the bucket range each leaf's decision path allows, per feature).
+#   Values outside the form's domain fall back to the tree traversal.
+#
+#   The table costs one lookup per feature, the tree one comparison per level  -  which is cheaper depends on the
+#   tree (& interpreter): the CLI reports both latencies, so the table is only adopted where it actually wins.
+#
+# USAGE:
+#   python -m src.lookup_table                    (builds the table of the trained model & reports size/build time)
+#   python -m src.lookup_table --max-cells 0      (force the layered layout)
+
+# Largest dense table built (cells)  -  above it the layered layout is used
+DEFAULT_MAX_CELLS = 1 << 24
+
+# Most states any level of a layered table may have
+MAX_LAYER_STATES = 1 << 20
+
+
+################################################
+
+
+# Raised when the lookup table of a tree would be too large to build
+class TableTooLarge(ValueError):
+    pass
+
+
+# Method to get the values a form field can take (encoded)  -  integer ranges are enumerated, floats are a range
+def field_domain(field):
+    if field.widget == "option":
+        return sorted(set(field.encodings.values())), False
+    if field.encode is int:
+        return list(range(field.low, field.high + 1)), False
+    return [field.low, field.high], True
+
+
+class LookupTable:
+    def __init__(self, engine, max_cells=DEFAULT_MAX_CELLS, fields=FORM_FIELDS):
+        if not hasattr(engine, "node_class"):
+            raise ValueError("A lookup table can only be built over a single decision tree")
+
+        start = time.perf_counter()
+        self.engine = engine
+        fields = {field.name: field for field in fields}
+
+        # Per feature  -  its sorted split thresholds (for UNROUNDED inputs, see 'CompiledTree'), for every bucket, its
+        # position among the buckets the form can reach (-1 = unreachable), & for discrete features, every value's
+        # position (a dict  -  integer-valued floats find their int key too; other values fall back to the tree)
+        self.thresholds = []
+        self.positions = []
+        self.value_positions = []
+        self.dims = []
+        split = ~engine.is_leaf
+        for f, name in enumerate(FEATURE_COLUMNS):
+            thresholds = np.unique(engine.split_threshold[split & (engine.feature == f)]).tolist()
+            values, continuous = field_domain(fields[name])
+            if continuous:
+                reachable = range(bisect_left(thresholds, values[0]), bisect_left(thresholds, values[-1]) + 1)
+            else:
+                reachable = sorted({bisect_left(thresholds, v) for v in values})
+
+            positions = [-1] * (len(thresholds) + 1)
+            for position, bucket in enumerate(reachable):
+                positions[bucket] = position
+            self.thresholds.append(thresholds)
+            self.positions.append(positions)
+            self.value_positions.append(None if continuous else
+                                        {v: positions[bisect_left(thresholds, v)] for v in values})
+            self.dims.append(len(reachable))
+
+        # Box of every leaf  -  the (inclusive) range of reachable bucket positions it covers, per feature
+        self.boxes = self._leaf_boxes()
+
+        self.cells = int(np.prod(self.dims, dtype=object))
+        if self.cells <= max_cells:
+            self.layout = "dense"
+            self._build_dense()
+        else:
+            self.layout = "layered"
+            self._build_layered()
+
+        self.build_time = time.perf_counter() - start
+
+    def _leaf_boxes(self):
+        engine = self.engine
+        boxes = {}
+
+        # Depth-first walk  -  carrying each feature's bucket range (inclusive) allowed by the path taken so far
+        stack = [(0, tuple((0, len(t)) for t in self.thresholds))]
+        while stack:
+            node, buckets = stack.pop()
+            if engine.is_leaf[node]:
+                # Bucket range -> range of reachable positions (empty ranges mean the form can't reach this leaf)
+                box = []
+                for (low, high), positions in zip(buckets, self.positions):
+                    reachable = [p for p in positions[low:high + 1] if p >= 0]
+                    if not reachable:
+                        break
+                    box.append((reachable[0], reachable[-1]))
+                else:
+                    boxes[node] = box
+                continue
+
+            f = int(engine.feature[node])
+            i = self.thresholds[f].index(float(engine.split_threshold[node]))
+            low, high = buckets[f]
+            # Left: x <= threshold i  <=>  bucket <= i
+            stack.append((int(engine.right[node]), buckets[:f] + ((max(low, i + 1), high),) + buckets[f + 1:]))
+            stack.append((int(engine.left[node]), buckets[:f] + ((low, min(high, i)),) + buckets[f + 1:]))
+        return boxes
+
+    def _build_dense(self):
+        leaf_type = np.uint16 if self.engine.node_count < 0xFFFF else np.uint32
+        unset = np.iinfo(leaf_type).max
+
+        table = np.full(self.dims, unset, dtype=leaf_type)
+        for leaf, box in self.boxes.items():
+            table[tuple(slice(low, high + 1) for low, high in box)] = leaf
+        assert not (table == unset).any(), "the leaves must cover every bucket combination"
+
+        # Mixed-radix strides (C order)  -  each feature's positions are pre-multiplied by its stride, so the index is
+        # just their sum (features with a single reachable bucket always add 0, & are skipped)
+        strides = [stride // table.itemsize for stride in table.strides]
+        self.keys = [self._key(f, strides[f]) for f in range(len(FEATURE_COLUMNS)) if self.dims[f] > 1]
+        self.table = array("H" if leaf_type == np.uint16 else "I", table.tobytes())
+        self.nbytes = table.nbytes
+
+    # Method to get the lookup of a feature's (scaled) bucket positions  -  (feature, value -> offset dict or None,
+    # thresholds, bucket -> offset list)  (offset -1 = unreachable; the dict is only set for discrete features)
+    def _key(self, f, scale):
+        values = self.value_positions[f]
+        if values is not None:
+            values = {v: p * scale if p >= 0 else -1 for v, p in values.items()}
+        return f, values, self.thresholds[f], [p * scale if p >= 0 else -1 for p in self.positions[f]]
+
+    def _build_layered(self):
+        # Features in the order the tree first tests them (most decisive first  -  keeps the state counts small);
+        # features with a single reachable bucket don't need a level at all
+        depth = {}
+        stack = [(0, 0)]
+        while stack:
+            node, level = stack.pop()
+            if not self.engine.is_leaf[node]:
+                f = int(self.engine.feature[node])
+                depth[f] = min(depth.get(f, level), level)
+                stack += [(int(self.engine.left[node]), level + 1), (int(self.engine.right[node]), level + 1)]
+        order = sorted((f for f in depth if self.dims[f] > 1), key=lambda f: (depth[f], f))
+
+        boxes = self.boxes
+        states = [tuple(sorted(boxes))]
+        levels = []
+        for k, f in enumerate(order):
+            last = k == len(order) - 1
+            next_states = {}
+            transitions = []
+            for state in states:
+                for position in range(self.dims[f]):
+                    remaining = tuple(leaf for leaf in state if boxes[leaf][f][0] <= position <= boxes[leaf][f][1])
+                    if last:
+                        assert len(remaining) == 1, "the leaves must cover every bucket combination exactly once"
+                        transitions.append(remaining[0])
+                    else:
+                        transitions.append(next_states.setdefault(remaining, len(next_states)))
+            if len(next_states) > MAX_LAYER_STATES:
+                raise TableTooLarge("Level %d (%s) of the lookup table has %d states"
+                                    % (k, FEATURE_COLUMNS[f], len(next_states)))
+            levels.append((f, transitions))
+            states = list(next_states)
+
+        # Every level's entry points straight at the next level's row (state x its number of buckets)  -  the row of a
+        # state plus a bucket position is then one addition & one index
+        self.levels = []
+        self.nbytes = 0
+        for k, (f, transitions) in enumerate(levels):
+            if k + 1 < len(levels):
+                scale = self.dims[levels[k + 1][0]]
+                transitions = [state * scale for state in transitions]
+            transitions = array("I", transitions)
+            self.levels.append((self._key(f, 1), transitions))
+            self.nbytes += transitions.itemsize * len(transitions)
+
+    """ Method to get the leaf reached by a single feature vector """
+    def apply_one(self, features):
+        if self.layout == "dense":
+            index = 0
+            for f, values, thresholds, positions in self.keys:
+                position = values.get(features[f], -1) if values is not None else \
+                    positions[bisect_left(thresholds, features[f])]
+                if position < 0:
+                    return self.engine.apply_one(features)
+                index += position
+            return self.table[index]
+
+        row = 0
+        for (f, values, thresholds, positions), transitions in self.levels:
+            position = values.get(features[f], -1) if values is not None else \
+                positions[bisect_left(thresholds, features[f])]
+            if position < 0:
+                return self.engine.apply_one(features)
+            row = transitions[row + position]
+        return row
+
+    """ Method to get the leaves reached by a batch of feature vectors (vectorized)  -  rows with a value outside the
+        table are traversed by the tree """
+    def apply(self, X):
+        X = np.asarray(X, dtype=np.float64)
+        if self.layout == "dense":
+            steps = [(key, None) for key in self.keys]
+        else:
+            steps = self.levels
+
+        index = np.zeros(len(X), dtype=np.int64)
+        outside = np.zeros(len(X), dtype=bool)
+        for (f, _, thresholds, positions), transitions in steps:
+            # Bucket of every value (searchsorted 'left' = bisect_left)  ->  its (scaled) position
+            position = np.asarray(positions)[np.searchsorted(thresholds, X[:, f], side="left")]
+            outside |= position < 0
+            if transitions is None:
+                index += position
+            else:
+                index = np.asarray(transitions)[np.where(outside, 0, index + position)]
+
+        leaves = (np.frombuffer(self.table, dtype=self.table.typecode)[np.where(outside, 0, index)]
+                  if self.layout == "dense" else index).astype(np.int32)
+        if outside.any():
+            leaves[outside] = self.engine.apply(X[outside])
+        return leaves
+
+    """ Method to predict the label of a single feature vector """
+    def predict_one(self, features):
+        return self.engine._node_class[self.apply_one(features)]
+
+    """ Method to predict the class probabilities of a single feature vector """
+    def predict_proba_one(self, features):
+        return self.engine.value[self.apply_one(features)]
+
+    """ Method to get the table's statistics (as a dict) """
+    def report(self):
+        report = {
+            "layout": self.layout,
+            "dense_cells": self.cells,
+            "bytes": self.nbytes,
+            "build_time_ms": self.build_time * 1000,
+            "buckets": dict(zip(FEATURE_COLUMNS, self.dims)),
+        }
+        if self.layout == "layered":
+            report["states"] = {FEATURE_COLUMNS[key[0]]: len(transitions) // self.dims[key[0]]
+                                for key, transitions in self.levels}
+        return report
+
+
+# Method to draw random feature vectors from the form's domain (every field uniformly over its values)
+def random_form_features(n_rows, rng, fields=FORM_FIELDS):
+    fields = {field.name: field for field in fields}
+    X = np.empty((n_rows, len(FEATURE_COLUMNS)), dtype=np.float64)
+    for i, field in enumerate(fields[name] for name in FEATURE_COLUMNS):
+        values, continuous = field_domain(field)
+        if continuous:
+            steps = int(round((field.high - field.low) / field.increment))
+            X[:, i] = field.low + rng.integers(0, steps + 1, n_rows) * field.increment
+        else:
+            X[:, i] = rng.choice(values, n_rows)
+    return X
+
+
+def main(argv=None):
+    # Command-line options
+    parser = argparse.ArgumentParser(description="Build the precomputed lookup table of the trained model")
+    parser.add_argument("--max-cells", type=int, default=DEFAULT_MAX_CELLS,
+                        help="largest dense table built (cells)  -  above it the layered layout is used")
+    parser.add_argument("--verify-rows", type=int, default=100000,
+                        help="random form inputs whose predictions are checked against the tree")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    from src.predictor import HeartDiseasePredictor
+    predictor = HeartDiseasePredictor().load()
+    engine = predictor.engine
+
+    table = LookupTable(engine, args.max_cells)
+    for key, value in table.report().items():
+        print("%-14s %s" % (key.upper() + ":", value))
+
+    # Predictions must match the tree EXACTLY
+    rows = random_form_features(args.verify_rows, np.random.default_rng(args.seed)).tolist()
+    mismatches = sum(table.apply_one(row) != engine.apply_one(row) for row in rows)
+
+    start = time.perf_counter()
+    for row in rows:
+        engine.apply_one(row)
+    tree_us = (time.perf_counter() - start) / len(rows) * 1e6
+    start = time.perf_counter()
+    for row in rows:
+        table.apply_one(row)
+    table_us = (time.perf_counter() - start) / len(rows) * 1e6
+
+    print("VERIFIED:      %d rows, %d mismatches" % (len(rows), mismatches))
+    print("LATENCY:       tree %.2f us  -  table %.2f us" % (tree_us, table_us))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,15 @@
 # Import libraries
-import io
-import os
-from src import resource_dir
-from math import e
-import numpy as np
-import pandas as pd
-from sklearn import tree  # DT Lib
-from sklearn.model_selection import train_test_split
-from sklearn.metrics import accuracy_score
-import openpyxl
+#   (the ML stack  -  numpy, pandas & sklearn  -  is NOT imported here: the prediction engine is loaded in the
+#    background while the landing page is shown, see 'MainView.load_model')
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from src.assets import rasterize
+from src.form_schema import FORM_FIELDS, FORM_ROWS, default_values, validate_form
+from src.metrics import metrics
+from src.session import DEFAULT_BATCH_SIZE, DEFAULT_IDLE_MS, PatientSession
+from src.startup import timer
 import tkinter as tk
-from tkinter import ttk
-from tkinter import font
-from PIL import Image, ImageTk
-import cairosvg
+from tkinter import font, ttk
 import warnings  # suppress warnings
 warnings.filterwarnings("ignore")
 
@@ -51,6 +47,7 @@ HeartDisease        - DIAGNOSIS OF HEART DISEASE (angiographic disease status)
 REMOVAL COUNT: 172 rows
 
 Where 'Cholesterol' is 0 (invalid data)...
+    (applied by the encoding pipeline  -  see 'DEFAULT_INVALID_VALUES' in 'src/encoding.py')
 
 Lines:
 295-417, 423, 425, 426, 429-432, 436-444, 448, 451-453, 455, 457-461, 463, 465, 466, 
@@ -88,10 +85,8 @@ class Page1(Page):
         """ ========================
              INITIALIZE VARIABLE(S)
             ======================== """
-        # Initialize the image logo (convert SVG to PNG data, then convert to an ImageTk.PhotoImage object)
-        logo_imgdata = cairosvg.svg2png(url=os.path.join(resource_dir, "logo.svg"))
-        logo_im = Image.open(io.BytesIO(logo_imgdata))
-        self.logo_img = ImageTk.PhotoImage(logo_im)
+        # Initialize the image logo (rasterized SVG, from the asset cache)
+        self.logo_img = tk.PhotoImage(file=rasterize("logo.svg"))
 
         """ ====================
              PAGE CONFIGURATION
@@ -110,6 +105,7 @@ class Page1(Page):
 
 
 # Page 2  -  INPUT INFORMATION
+#   (generated from the input form schema  -  one label, input & text variable per field, see 'src/form_schema.py')
 class Page2(Page):
     def __init__(self, *args, **kwargs):
         Page.__init__(self, *args, **kwargs)
@@ -120,211 +116,101 @@ class Page2(Page):
         # Italicized font
         self.italic_font = font.Font(self, family="Cambria", size=12, slant="italic")
 
-        ########################################
-        # INITIALIZE ALL INPUT VALUE VARIABLES #
-        ########################################
-        self.val_age = tk.StringVar(value="0")
-
-        self.val_sex = tk.StringVar(value="Select...")
-        self.val_sex_options = ["Male", "Female"]
-        ##########
-        self.val_pain = tk.StringVar(value="Select...")
-        self.val_pain_options = ["Typical Angina", "Atypical Angina", "Non-Anginal Pain", "Asymptomatic"]
-        ##########
-        self.val_bs = tk.StringVar(value="Select...")
-        self.val_bs_options = ["Yes", "No"]
-        ##########
-        self.val_bp = tk.StringVar(value="0")
-
-        self.val_chol = tk.StringVar(value="0")
-        ##########
-        self.val_ecg = tk.StringVar(value="Select...")
-        self.val_ecg_options = ["Normal", "ST-T Wave Abnormality", "Probable Left Ventricular Hypertrophy"]
-        ##########
-        self.val_hr = tk.StringVar(value="0")
-        ##########
-        self.val_angina = tk.StringVar(value="Select...")
-        self.val_angina_options = ["Yes", "No"]
-        ##########
-        self.val_peak = tk.StringVar(value="0")
-        ##########
-        self.val_slope = tk.StringVar(value="Select...")
-        self.val_slope_options = ["Up-sloping", "Flat", "Down-sloping"]
+        # Input value variables, labels & input fields  -  by feature name
+        self.values = {}
+        self.labels = {}
+        self.inputs = {}
+
+        # Names of the fields currently flagged (in red) as incomplete
+        self.flagged = set()
 
         """ ====================
              PAGE CONFIGURATION
             ==================== """
-
-        ###########################
-        # CREATE FRAMES (per row) #
-        ###########################
-        self.row1 = tk.Frame(self)
-        self.row2 = tk.Frame(self)
-        self.row3 = tk.Frame(self)
-        self.row4 = tk.Frame(self)
-        self.row5 = tk.Frame(self)
-        self.row6 = tk.Frame(self)
-        self.row7 = tk.Frame(self)
-        self.row8 = tk.Frame(self)
-        self.row9 = tk.Frame(self)
-
-        #################
-        # CREATE LABELS #
-        #################
-        self.label_age = tk.Label(self.row1, text="Age:", font=self.small_font)
-        self.label_sex = tk.Label(self.row1, text="Gender:", font=self.small_font)
-        self.label_pain = tk.Label(self.row2, text="Is the patient experiencing chest pain?", font=self.small_font)
-        self.label_bs = tk.Label(self.row3, text="Is the patient fasting?", font=self.small_font)
-        self.label_bp = tk.Label(self.row4, text="Resting BP (mm Hg):", font=self.small_font)
-        self.label_chol = tk.Label(self.row4, text="Cholesterol (mm/dl):", font=self.small_font)
-        self.label_ecg = tk.Label(self.row5, text="Resting ECG results:", font=self.small_font)
-        self.label_hr = tk.Label(self.row6, text="Maximum heart-rate achieved:", font=self.small_font)
-        self.label_angina = tk.Label(self.row7, text="Does the patient have exercise-induced angina?", font=self.small_font)
-        self.label_peak = tk.Label(self.row8, text="Oldpeak:", font=self.small_font)
-        self.label_slope = tk.Label(self.row9, text="ST Slope:", font=self.small_font)
-
-        #######################
-        # CREATE INPUT FIELDS #
-        #######################
-        self.input_age = tk.Spinbox(self.row1, from_=0, to=99, textvariable=self.val_age, wrap=False, width=3)
-        self.input_sex = tk.OptionMenu(self.row1, self.val_sex, *self.val_sex_options)
-        self.input_pain = tk.OptionMenu(self.row2, self.val_pain, *self.val_pain_options)
-        self.input_bs = tk.OptionMenu(self.row3, self.val_bs, *self.val_bs_options)
-        self.input_bp = tk.Spinbox(self.row4, from_=0, to=999, textvariable=self.val_bp, wrap=False, width=3)
-        self.input_chol = tk.Spinbox(self.row4, from_=0, to=999, textvariable=self.val_chol, wrap=False, width=3)
-        self.input_ecg = tk.OptionMenu(self.row5, self.val_ecg, *self.val_ecg_options)
-        self.input_hr = tk.Spinbox(self.row6, from_=0, to=999, textvariable=self.val_hr, wrap=False, width=3)
-        self.input_angina = tk.OptionMenu(self.row7, self.val_angina, *self.val_angina_options)
-        self.input_peak = tk.Spinbox(self.row8, from_=-10, to=10, textvariable=self.val_peak, wrap=False, width=3,
-                                     increment=0.5)
-        self.input_slope = tk.OptionMenu(self.row9, self.val_slope, *self.val_slope_options)
-
-        #####################
-        # PLACE ALL CONTENT #
-        #####################
-        self.label_age.grid(row=0, column=0, padx=5, pady=5)
-        self.input_age.grid(row=0, column=1, padx=0, pady=5)
-
-        self.label_sex.grid(row=0, column=2, padx=(20, 5), pady=5)
-        self.input_sex.grid(row=0, column=3, padx=0, pady=5)
-        ##########
-        self.label_pain.grid(row=0, column=0, padx=5, pady=5)
-        self.input_pain.grid(row=0, column=1, padx=0, pady=5)
-        ##########
-        self.label_bs.grid(row=0, column=0, padx=5, pady=5)
-        self.input_bs.grid(row=0, column=1, padx=5, pady=5)
-        ##########
-        self.label_bp.grid(row=0, column=0, padx=5, pady=5)
-        self.input_bp.grid(row=0, column=1, padx=5, pady=5, sticky="w")
-
-        self.label_chol.grid(row=1, column=0, padx=5, pady=5)
-        self.input_chol.grid(row=1, column=1, padx=5, pady=5, sticky="w")
-        ##########
-        self.label_ecg.grid(row=0, column=0, padx=5, pady=5)
-        self.input_ecg.grid(row=0, column=1, padx=5, pady=5)
-        ##########
-        self.label_hr.grid(row=0, column=0, padx=5, pady=5)
-        self.input_hr.grid(row=0, column=1, padx=5, pady=5)
-        ##########
-        self.label_angina.grid(row=0, column=0, padx=5, pady=5)
-        self.input_angina.grid(row=0, column=1, padx=5, pady=5)
-        ##########
-        self.label_peak.grid(row=0, column=0, padx=5, pady=5)
-        self.input_peak.grid(row=0, column=1, padx=5, pady=5)
-        ##########
-        self.label_slope.grid(row=0, column=0, padx=5, pady=5)
-        self.input_slope.grid(row=0, column=1, padx=5, pady=5)
-
-        ##########################
-        # PLACE ALL (ROW) FRAMES #
-        ##########################
-        self.row1.pack(side="top", anchor="w")
-        self.row2.pack(side="top", anchor="w")
-        self.row3.pack(side="top", anchor="w")
-        self.row4.pack(side="top", anchor="w")
-        self.row5.pack(side="top", anchor="w")
-        self.row6.pack(side="top", anchor="w")
-        self.row7.pack(side="top", anchor="w")
-        self.row8.pack(side="top", anchor="w")
-        self.row9.pack(side="top", anchor="w")
-
-        # SUBMIT BUTTON
-        self.submit_btn = tk.Button(self, text="Submit", font=self.medium_font)
-        self.submit_btn.pack(side="bottom", anchor="center", pady=20)
+        # CREATE FRAMES (per row)
+        self.rows = [tk.Frame(self) for _ in range(FORM_ROWS)]
+
+        # CREATE & PLACE THE LABEL & INPUT FIELD OF EVERY FIELD
+        for field in FORM_FIELDS:
+            frame, row, column = field.layout
+            frame = self.rows[frame]
+
+            value = self.values[field.name] = tk.StringVar(value=field.default)
+            label = self.labels[field.name] = tk.Label(frame, text=field.label, font=self.small_font)
+            if field.widget == "option":
+                widget = tk.OptionMenu(frame, value, *field.options)
+            else:
+                widget = tk.Spinbox(frame, from_=field.low, to=field.high, increment=field.increment,
+                                    textvariable=value, wrap=False, width=3)
+            self.inputs[field.name] = widget
+
+            label.grid(row=row, column=column, padx=(20, 5) if column else 5, pady=5)
+            widget.grid(row=row, column=column + 1, padx=5, pady=5, sticky="w")
+
+            # BIND INPUT EVENT TO CHANGE LABEL COLOR BACK FROM RED (if applicable)
+            #   (<FocusIn> event detects when a particular widget is focused on - to detect its selection)
+            widget.bind("<FocusIn>", lambda event, name=field.name: self.unflag(name))
+
+        # PLACE ALL (ROW) FRAMES
+        for frame in self.rows:
+            frame.pack(side="top", anchor="w")
+
+        # SUBMIT BUTTON  &  SESSION QUEUE BUTTONS (queue the patient for batch scoring  -  view the queue)
+        self.button_row = tk.Frame(self)
+        self.submit_btn = tk.Button(self.button_row, text="Submit", font=self.medium_font)
+        self.queue_btn = tk.Button(self.button_row, text="Add to queue", font=self.medium_font)
+        self.session_btn = tk.Button(self.button_row, text="Queue (0)", font=self.medium_font)
+        self.submit_btn.grid(row=0, column=0, padx=5)
+        self.queue_btn.grid(row=0, column=1, padx=5)
+        self.session_btn.grid(row=0, column=2, padx=5)
+        self.button_row.pack(side="bottom", anchor="center", pady=20)
+
+        # BUSY INDICATOR (shown while a prediction is running)  &  CANCEL BUTTON
+        self.busy_row = tk.Frame(self)
+        self.busy_label = tk.Label(self.busy_row, text="Predicting...", font=self.italic_font)
+        self.cancel_btn = tk.Button(self.busy_row, text="Cancel", font=self.small_font)
+        self.busy_label.grid(row=0, column=0, padx=5)
+        self.cancel_btn.grid(row=0, column=1, padx=5)
 
         # REMOVE FOCUS FROM WIDGET BY CLICKING OFF
         self.bind_all("<1>", lambda event: event.widget.focus_set())
 
-        # BIND INPUT EVENTS TO CHANGE LABEL COLOR BACK FROM RED (if applicable)
-        #   (<FocusIn> event detects when a particular widget is focused on - to detect their selection)
-        self.input_age.bind("<FocusIn>", self.config_age)
-        self.input_sex.bind("<FocusIn>", self.config_sex)
-        self.input_pain.bind("<FocusIn>", self.config_pain)
-        self.input_bs.bind("<FocusIn>", self.config_bs)
-        self.input_bp.bind("<FocusIn>", self.config_bp)
-        self.input_chol.bind("<FocusIn>", self.config_chol)
-        self.input_ecg.bind("<FocusIn>", self.config_ecg)
-        self.input_hr.bind("<FocusIn>", self.config_hr)
-        self.input_angina.bind("<FocusIn>", self.config_angina)
-        self.input_peak.bind("<FocusIn>", self.config_peak)
-        self.input_slope.bind("<FocusIn>", self.config_slope)
+    """ Method to get the text value of every input field (feature name -> text value) """
+    def get_values(self):
+        return {name: value.get() for name, value in self.values.items()}
+
+    """ Method to flag (in red) exactly the given fields as incomplete  -  only the labels which change are updated """
+    def flag(self, names):
+        names = set(names)
+        for name in self.flagged - names:
+            self.labels[name].config(fg="black")
+        for name in names - self.flagged:
+            self.labels[name].config(fg="red")
+        self.flagged = names
+
+    """ Method to remove the incomplete flag of a single field """
+    def unflag(self, name):
+        if name in self.flagged:
+            self.flagged.discard(name)
+            self.labels[name].config(fg="black")
+
+    """ Method to show (or hide) the busy indicator  -  the "Submit" Button is disabled while busy """
+    def set_busy(self, busy):
+        if busy:
+            self.submit_btn.config(state="disabled")
+            self.busy_row.pack(side="bottom", anchor="center")
+        else:
+            self.submit_btn.config(state="normal")
+            self.busy_row.pack_forget()
+
+    """ Method to show the number of patients in the session queue """
+    def set_queue_size(self, size):
+        self.session_btn.config(text="Queue (%d)" % size)
 
     def reset(self):
-        self.val_age.set("0")
-        self.val_sex.set("Select...")
-        self.val_pain.set("Select...")
-        self.val_bs.set("Select...")
-        self.val_bp.set("0")
-        self.val_chol.set("0")
-        self.val_ecg.set("Select...")
-        self.val_hr.set("0")
-        self.val_angina.set("Select...")
-        self.val_peak.set("0.0")
-        self.val_slope.set("Select...")
-
-    def config_age(self, event):
-        if self.label_age["fg"] == "red":
-            self.label_age.config(fg="black")
-
-    def config_sex(self, event):
-        if self.label_sex["fg"] == "red":
-            self.label_sex.config(fg="black")
-
-    def config_pain(self, event):
-        if self.label_pain["fg"] == "red":
-            self.label_pain.config(fg="black")
-
-    def config_bs(self, event):
-        if self.label_bs["fg"] == "red":
-            self.label_bs.config(fg="black")
-
-    def config_bp(self, event):
-        if self.label_bp["fg"] == "red":
-            self.label_bp.config(fg="black")
-
-    def config_chol(self, event):
-        if self.label_chol["fg"] == "red":
-            self.label_chol.config(fg="black")
-
-    def config_ecg(self, event):
-        if self.label_ecg["fg"] == "red":
-            self.label_ecg.config(fg="black")
-
-    def config_hr(self, event):
-        if self.label_hr["fg"] == "red":
-            self.label_hr.config(fg="black")
-
-    def config_angina(self, event):
-        if self.label_angina["fg"] == "red":
-            self.label_angina.config(fg="black")
-
-    def config_peak(self, event):
-        if self.label_peak["fg"] == "red":
-            self.label_peak.config(fg="black")
-
-    def config_slope(self, event):
-        if self.label_slope["fg"] == "red":
-            self.label_slope.config(fg="black")
+        for name, value in default_values().items():
+            self.values[name].set(value)
+        self.flag([])
 
 
 # Page 3  -  OUTPUT RESULT
@@ -337,15 +223,11 @@ class Page3(Page):
             ======================== """
         self.prediction_result = 5
 
-        # Initialize 'thumbs up' image (convert SVG to PNG data, then convert to an ImageTk.PhotoImage object)
-        thumbs_up_imgdata = cairosvg.svg2png(url=os.path.join(resource_dir, "thumbs-up.svg"))
-        thumbs_up_im = Image.open(io.BytesIO(thumbs_up_imgdata))
-        self.thumbs_up_img = ImageTk.PhotoImage(thumbs_up_im)
+        # Initialize 'thumbs up' image (rasterized SVG, from the asset cache)
+        self.thumbs_up_img = tk.PhotoImage(file=rasterize("thumbs-up.svg"))
 
-        # Initialize 'warning' image (convert SVG to PNG data, then convert to an ImageTk.PhotoImage object)
-        warning_imgdata = cairosvg.svg2png(url=os.path.join(resource_dir, "warning.svg"))
-        warning_im = Image.open(io.BytesIO(warning_imgdata))
-        self.warning_img = ImageTk.PhotoImage(warning_im)
+        # Initialize 'warning' image (rasterized SVG, from the asset cache)
+        self.warning_img = tk.PhotoImage(file=rasterize("warning.svg"))
 
         """ ====================
              PAGE CONFIGURATION
@@ -354,31 +236,37 @@ class Page3(Page):
         self.label1 = tk.Label(self, text="Results", font=self.title_font)
         self.img = tk.Label(self, image=self.warning_img)
         self.label2 = tk.Label(self, text="a", font=self.header_font)
+        # Confidence (probability of the predicted outcome) & the decision path which led to it
+        self.label_confidence = tk.Label(self, text="", font=self.medium_font)
+        self.label_path = tk.Label(self, text="", font=self.small_font, justify="left")
 
         # Place all widgets
         self.label1.pack(pady=50)
         self.img.pack(pady=10)
         # self.label2.pack(side="bottom", pady=50)
         self.label2.pack(pady=20)
+        self.label_confidence.pack()
+        self.label_path.pack(pady=10)
 
         # ADD 'RESTART' BUTTON
         self.restart_btn = tk.Button(self, text="\u21BA", font=self.medium_font, height=1)
         self.restart_btn.pack(side="bottom", anchor="e", padx=3, pady=3)
 
-    def update_prediction(self, prediction):
-        # Update the prediction variable
-        self.prediction_result = prediction
+    # Method to show a prediction  -  'explanation' is the predictor's explanation of it (see 'explain_one')
+    def update_prediction(self, explanation):
+        # Update the prediction variable (a plain int  -  never an array)
+        self.prediction_result = int(explanation["prediction"])
 
-        # If the prediction is NO - [GOOD RESULT - likely no heart disease]
-        if self.prediction_result == 1:
+        # If the prediction is NO (HeartDisease = 0) - [GOOD RESULT - likely no heart disease]
+        if self.prediction_result == 0:
             # Set the 'thumbs up' image
             self.img.config(image=self.thumbs_up_img)
 
             # Update the result text
             self.label2.config(text="You're CLEAR!")
 
-        # If the prediction is YES - [BAD RESULT - possible heart disease]
-        elif self.prediction_result == 0:
+        # If the prediction is YES (HeartDisease = 1) - [BAD RESULT - possible heart disease]
+        elif self.prediction_result == 1:
             # Set the 'warning' image
             self.img.config(image=self.warning_img)
 
@@ -389,48 +277,160 @@ class Page3(Page):
         else:
             print("ERROR: BROKEN PREDICTION")
             self.master.destroy()
+            return
+
+        # Update the confidence & decision path text
+        self.label_confidence.config(text="Confidence: %.0f%%" % (explanation["confidence"] * 100))
+        # (tree ensembles have no single decision path to show)
+        conditions = explanation["conditions"]
+        self.label_path.config(text="Based on:\n" + "\n".join(conditions) if conditions else "")
 
     def reset(self):
         self.prediction_result = 5
+        self.label_confidence.config(text="")
+        self.label_path.config(text="")
+
+
+# Virtualized table  -  a Treeview holding only the rows which are VISIBLE (one item per visible row, refilled as it
+# scrolls), so it stays responsive however many rows there are. Rows are read on demand from 'get_row(index)'.
+class VirtualTable(tk.Frame):
+    def __init__(self, master, columns, widths, height=12, **kwargs):
+        tk.Frame.__init__(self, master, **kwargs)
+
+        """ ========================
+             INITIALIZE VARIABLE(S)
+            ======================== """
+        # Number of rows, the function getting the values of a row, & the index of the first visible row
+        self.count = 0
+        self.get_row = None
+        self.offset = 0
+        self.height = height
+
+        """ ====================
+             TABLE CONFIGURATION
+            ==================== """
+        self.tree = ttk.Treeview(self, columns=list(range(len(columns))), show="headings", height=height,
+                                 selectmode="none")
+        for column, (heading, width) in enumerate(zip(columns, widths)):
+            self.tree.heading(column, text=heading)
+            self.tree.column(column, width=width, minwidth=width, stretch=False, anchor="center")
+        self.scrollbar = ttk.Scrollbar(self, orient="vertical", command=self.on_scroll)
+
+        self.tree.pack(side="left", fill="both", expand=True)
+        self.scrollbar.pack(side="right", fill="y")
+
+        # The Treeview never has more items than it shows  -  scrolling moves the window over the rows instead
+        for widget in (self.tree, self.scrollbar):
+            widget.bind("<MouseWheel>", lambda event: self.scroll(-1 if event.delta > 0 else 1, "units"))
+            widget.bind("<Button-4>", lambda event: self.scroll(-1, "units"))
+            widget.bind("<Button-5>", lambda event: self.scroll(1, "units"))
+
+    """ Method to set the rows  -  their number & the function getting the values of a row (by index) """
+    def set_rows(self, count, get_row):
+        self.count = count
+        self.get_row = get_row
+        self.refresh()
+
+    """ Method to scroll to the last row """
+    def scroll_to_end(self):
+        self.offset = max(0, self.count - self.height)
+        self.refresh()
+
+    """ Method to scroll by a number of 'units' (rows) or 'pages' """
+    def scroll(self, number, what):
+        step = self.height if what.startswith("page") else 1
+        self.offset = min(max(0, self.offset + int(number) * step), max(0, self.count - self.height))
+        self.refresh()
+        return "break"
+
+    # Method called by the scrollbar ('moveto' a fraction, or 'scroll' by units or pages)
+    def on_scroll(self, action, number, what=None):
+        if action == "moveto":
+            self.offset = min(max(0, int(float(number) * self.count)), max(0, self.count - self.height))
+            self.refresh()
+        else:
+            self.scroll(number, what)
+
+    """ Method to redraw the visible rows  -  only the items of the visible window are created or updated """
+    def refresh(self):
+        visible = min(self.height, self.count - self.offset)
+        items = self.tree.get_children()
+
+        # As many items as visible rows
+        for item in items[visible:]:
+            self.tree.delete(item)
+        for index in range(visible):
+            values = self.get_row(self.offset + index)
+            if index < len(items):
+                self.tree.item(items[index], values=values)
+            else:
+                self.tree.insert("", "end", values=values)
+
+        if self.count:
+            self.scrollbar.set(self.offset / self.count, (self.offset + visible) / self.count)
+        else:
+            self.scrollbar.set(0, 1)
+
+
+# Page 4  -  SESSION QUEUE
+#   (the patients queued during the session & their predictions  -  scored in batches, see 'src/session.py')
+class Page4(Page):
+    def __init__(self, *args, **kwargs):
+        Page.__init__(self, *args, **kwargs)
+
+        """ ====================
+             PAGE CONFIGURATION
+            ==================== """
+        # Create all widgets
+        self.label1 = tk.Label(self, text="Session", font=self.title_font)
+        self.table = VirtualTable(self, ["#"] + [field.heading for field in FORM_FIELDS] + ["Result", "Conf."],
+                                  [40] + [46] * len(FORM_FIELDS) + [64, 48], height=14)
+        self.label_status = tk.Label(self, text="", font=self.small_font)
+
+        self.button_row = tk.Frame(self)
+        self.back_btn = tk.Button(self.button_row, text="Back", font=self.medium_font)
+        self.score_btn = tk.Button(self.button_row, text="Score now", font=self.medium_font)
+        self.clear_btn = tk.Button(self.button_row, text="Clear", font=self.medium_font)
+        self.back_btn.grid(row=0, column=0, padx=5)
+        self.score_btn.grid(row=0, column=1, padx=5)
+        self.clear_btn.grid(row=0, column=2, padx=5)
+
+        # Place all widgets
+        self.label1.pack(pady=10)
+        self.table.pack(padx=10)
+        self.label_status.pack(pady=5)
+        self.button_row.pack(side="bottom", anchor="center", pady=10)
+
+    """ Method to show the session  -  its rows (read on demand) & how many are scored """
+    def update_session(self, session, scoring=False):
+        self.table.set_rows(len(session), session.row)
+        self.label_status.config(text="%d patient(s)  -  %d scored, %d at risk%s"
+                                      % (len(session), session.scored, session.at_risk,
+                                         "  -  scoring..." if scoring else ""))
 
 
 # Controls the main window container  -  contains, controls, & views Page(s)
 class MainView(tk.Frame):
-    def __init__(self, *args, **kwargs):
+    def __init__(self, *args, retrain=False, estimator=None, params=None, monitor_drift=False, **kwargs):
         tk.Frame.__init__(self, *args, **kwargs)
 
         """ ========================
              INITIALIZE VARIABLE(S)
             ======================== """
-        # Set the file path for the imported dataset
-        self.csv_data_file = os.path.join(resource_dir, "heart.csv")
-
-        # Read the Excel file into a Pandas DataFrame
-        self.df = pd.read_csv(self.csv_data_file)
-
-        # Feature selection from data columns (features - X)
-        self.X_features = self.df[[
-            'Age',              # int64
-            'Sex',              # int64   [ORIG. object]
-            'ChestPainType',    # int64   [ORIG. object]
-            'RestingBP',        # int64
-            'Cholesterol',      # int64
-            'FastingBS',        # int64
-            'RestingECG',       # int64   [ORIG. object]
-            'MaxHR',            # int64
-            'ExerciseAngina',   # int64   [ORIG. object]
-            'Oldpeak',          # float64
-            'ST_Slope',         # int64   [ORIG. object]
-        ]]
-
-        # Target selection from data columns (label - y)
-        self.y_label = self.df[['HeartDisease']]
-
-        # Initialize the Classifier
-        self.clf = tree.DecisionTreeClassifier()
-
-        # !!! TRAIN the Classifier !!!
-        self.clf = self.clf.fit(self.X_features, self.y_label)
+        # Prediction engine (owns the dataset & the classifier)  -  None until it has been loaded in the background
+        self.predictor = None
+        self.model_error = None
+
+        # Worker thread running the predictions (keeps the Tk event loop responsive during inference)
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="Predictor")
+        # The prediction currently running (a Future)  -  None when idle
+        self.pending_prediction = None
+
+        # Patients queued during the session, the batch currently being scored (a Future, None when idle) & the
+        # scheduled scoring of the entries queued last (an 'after' id  -  scores them once no more are added)
+        self.session = PatientSession(DEFAULT_BATCH_SIZE)
+        self.pending_batch = None
+        self.idle_batch = None
 
         """ ======================
              WINDOW CONFIGURATION
@@ -444,6 +444,7 @@ class MainView(tk.Frame):
         self.p1 = Page1(self)
         self.p2 = Page2(self)
         self.p3 = Page3(self)
+        self.p4 = Page4(self)
 
         # Create container to hold all content  -  contains Page(s)
         container = tk.Frame(self)
@@ -453,6 +454,7 @@ class MainView(tk.Frame):
         self.p1.place(in_=container, x=0, y=0, relwidth=1, relheight=1)
         self.p2.place(in_=container, x=0, y=0, relwidth=1, relheight=1)
         self.p3.place(in_=container, x=0, y=0, relwidth=1, relheight=1)
+        self.p4.place(in_=container, x=0, y=0, relwidth=1, relheight=1)
 
         ########################
         # Button Configuration #
@@ -464,147 +466,241 @@ class MainView(tk.Frame):
         self.p2.submit_btn.config(command=self.submit_data)
         # "Restart" Button on Page 3  -  resets everything & navigates back to Page1
         self.p3.restart_btn.config(command=self.reset)
+        # "Cancel" Button on Page 2  -  cancels the running prediction (stays on Page2)
+        self.p2.cancel_btn.config(command=self.cancel_prediction)
+        # "Add to queue" Button on Page 2  -  queues the patient for batch scoring & clears the form for the next one
+        self.p2.queue_btn.config(command=self.queue_data)
+        # "Queue" Button on Page 2  -  navigates to Page4 (the session queue)
+        self.p2.session_btn.config(command=self.show_session)
+        # "Back", "Score now" & "Clear" Buttons on Page 4
+        self.p4.back_btn.config(command=self.p2.show)
+        self.p4.score_btn.config(command=self.score_session)
+        self.p4.clear_btn.config(command=self.clear_session)
+
+        # Stop the worker thread when the window is closed
+        self.bind("<Destroy>", self.on_destroy)
+
+        # Gate the "Start", "Submit" & "Add to queue" Buttons until the model is ready
+        self.p1.start_btn.config(state="disabled", text="Loading...")
+        self.p2.submit_btn.config(state="disabled")
+        self.p2.queue_btn.config(state="disabled")
 
         ########################################
 
         # Display the first Page!
         self.p1.show()
 
+        # Load the prediction engine in the background (while the landing page is shown), & wait for it to finish
+        threading.Thread(target=self.load_model, args=(retrain, estimator, params, monitor_drift),
+                         name="ModelLoader", daemon=True).start()
+        self.after(50, self.check_model)
+
+    # Method to load the prediction engine  -  runs on a BACKGROUND thread (must NOT touch any widget)
+    def load_model(self, retrain=False, estimator=None, params=None, monitor_drift=False):
+        try:
+            with timer.phase("ml imports"):
+                from src.estimators import DEFAULT_ESTIMATOR
+                from src.predictor import HeartDiseasePredictor
+
+            with timer.phase("model load"):
+                predictor = HeartDiseasePredictor(estimator=estimator or DEFAULT_ESTIMATOR, params=params,
+                                                  monitor_drift=monitor_drift)
+                predictor.load(retrain=retrain)
+        except Exception as error:
+            self.model_error = error
+            return
+
+        # Export the prediction cache's hits, misses & evictions with the pipeline metrics
+        if predictor.cache is not None:
+            metrics.add_source("prediction_cache", predictor.cache.stats)
+
+        self.predictor = predictor
+
+    # Method to check (on the Tk event thread) whether the background model load has finished
+    def check_model(self):
+        if self.model_error is not None:
+            print("ERROR: MODEL COULD NOT BE LOADED -", self.model_error)
+            self.p1.start_btn.config(text="Model unavailable")
+        elif self.predictor is None:
+            self.after(50, self.check_model)
+        else:
+            print("MODEL: %s in %.1f ms" % ("loaded from cache" if self.predictor.model_cached else "trained",
+                                            self.predictor.model_load_time * 1000))
+            self.p1.start_btn.config(state="normal", text="Start")
+            self.p2.submit_btn.config(state="normal")
+            self.p2.queue_btn.config(state="normal")
+
+            timer.mark("model ready")
+            self.event_generate("<<ModelReady>>")
+
     def submit_data(self):
-        # Flag for checking if anything isn't filled out
-        complete = True
-
-        # Return all text back to default black (in case it is red from previously incomplete input fields)
-        self.p2.label_age.config(fg="black")
-        self.p2.label_sex.config(fg="black")
-        self.p2.label_pain.config(fg="black")
-        self.p2.label_bs.config(fg="black")
-        self.p2.label_bp.config(fg="black")
-        self.p2.label_chol.config(fg="black")
-        self.p2.label_ecg.config(fg="black")
-        self.p2.label_hr.config(fg="black")
-        self.p2.label_angina.config(fg="black")
-        # self.p2.label_peak.config(fg="black")  # Initializes to 0.0, which is VALID
-        self.p2.label_slope.config(fg="black")
-
-        # Check each input field for incomplete entries
-        # (set 'complete' flag to False & the label text to red to indicate which field is incomplete)
-        if self.p2.val_age.get() == "0":
-            complete = False
-            self.p2.label_age.config(fg="red")
-        if self.p2.val_sex.get() == "Select...":
-            complete = False
-            self.p2.label_sex.config(fg="red")
-        if self.p2.val_pain.get() == "Select...":
-            complete = False
-            self.p2.label_pain.config(fg="red")
-        if self.p2.val_bs.get() == "Select...":
-            complete = False
-            self.p2.label_bs.config(fg="red")
-        if self.p2.val_bp.get() == "0":
-            complete = False
-            self.p2.label_bp.config(fg="red")
-        if self.p2.val_chol.get() == "0":
-            complete = False
-            self.p2.label_chol.config(fg="red")
-        if self.p2.val_ecg.get() == "Select...":
-            complete = False
-            self.p2.label_ecg.config(fg="red")
-        if self.p2.val_hr.get() == "0":
-            complete = False
-            self.p2.label_hr.config(fg="red")
-        if self.p2.val_angina.get() == "Select...":
-            complete = False
-            self.p2.label_angina.config(fg="red")
-        # if self.p2.val_peak.get() == "":
-        #     return
-        if self.p2.val_slope.get() == "Select...":
-            complete = False
-            self.p2.label_slope.config(fg="red")
+        # Check every input field (in one pass)  -  & flag the incomplete ones (in red)
+        with metrics.timer("validate"):
+            values = self.p2.get_values()
+            invalid = validate_form(values)
+            self.p2.flag(invalid)
+        complete = not invalid
 
         # If nothing was flagged as incomplete:
-        if complete:
-            # !!! Run the PREDICTION with the given test data !!!
-            result = self.predict()
+        if not complete:
+            metrics.count("incomplete_submissions")
+        else:
+            # !!! Convert all text variables of submitted data to ACTUAL data to be used as FEATURES !!!
+            test_features = self.convert_values(values)
+
+            # !!! Run the PREDICTION with the given test data (on the worker thread) !!!
+            self.p2.set_busy(True)
+            self.pending_prediction = self.executor.submit(self.predict, test_features)
+            self.after(20, self.check_prediction, self.pending_prediction)
+
+    # Method to check (on the Tk event thread) whether a prediction has finished  -  then shows its result
+    def check_prediction(self, future):
+        # Ignore predictions which were cancelled (or replaced by a newer one)
+        if future is not self.pending_prediction:
+            return
+        if not future.done():
+            self.after(20, self.check_prediction, future)
+            return
+
+        self.pending_prediction = None
+        self.p2.set_busy(False)
+
+        try:
+            result = future.result()
+        except Exception as error:
+            metrics.count("prediction_errors")
+            print("ERROR: PREDICTION FAILED -", error)
+            return
+
+        with metrics.timer("ui_update"):
             # !!! Update the prediction result in Page 3 !!!
             self.p3.update_prediction(result)
             # Navigate to Page 3!
             self.p3.show()
 
-    # Method to convert the text variable of all data values into their corresponding ACTUAL data value (features)
-    def convert_values(self):
-        # 'Age' feature
-        age = int(self.p2.val_age.get())
-
-        # 'Sex' feature
-        gender = {
-            'Male': 0,
-            'Female': 1
-        }[self.p2.val_sex.get()]
-
-        # 'ChestPainType' feature
-        pain = {
-            'Typical Angina': 0,
-            'Atypical Angina': 1,
-            'Non-Anginal Pain': 2,
-            'Asymptomatic': 3
-        }[self.p2.val_pain.get()]
-
-        # 'RestingBP' feature
-        blood_pressure = int(self.p2.val_bp.get())
-
-        # 'Cholesterol' feature
-        cholesterol = int(self.p2.val_chol.get())
-
-        # 'FastingBS' feature
-        fasting = {
-            'Yes': 1,
-            'No': 0
-        }[self.p2.val_bs.get()]
-
-        # 'RestingECG' feature
-        ecg = {
-            'Normal': 0,
-            'ST-T Wave Abnormality': 1,
-            'Probable Left Ventricular Hypertrophy': 2
-        }[self.p2.val_ecg.get()]
-
-        # 'MaxHR' feature
-        heartrate = int(self.p2.val_hr.get())
-
-        # 'ExerciseAngina' feature
-        angina = {
-            'Yes': 1,
-            'No': 0
-        }[self.p2.val_angina.get()]
-
-        # 'Oldpeak' feature
-        old_peak = float(self.p2.val_peak.get())
-
-        # 'ST_Slope' feature
-        st_slope = {
-            'Flat': 0,
-            'Up-sloping': 1,
-            'Down-sloping': 2
-        }[self.p2.val_slope.get()]
-
-        # Return a list of all feature data
-        return [age, gender, pain, blood_pressure, cholesterol, fasting, ecg, heartrate, angina, old_peak, st_slope]
-
-    # Method to run the prediction of the classifier
-    def predict(self):
-        # !!! Convert all text variables of submitted data to ACTUAL data to be used as FEATURES !!!
-        test_features = self.convert_values()
-        print(test_features)  # Output resulting features list to the console
-
-        # Run the prediction through the trained classifier
-        prediction_result = self.clf.predict([test_features])
-        print("PREDICTION:", prediction_result)  # Output the prediction result
+    # Method to cancel the running prediction (its result is discarded, even if it is already being computed)
+    def cancel_prediction(self):
+        if self.pending_prediction is not None:
+            self.pending_prediction.cancel()
+            self.pending_prediction = None
+            metrics.count("cancelled_predictions")
+        self.p2.set_busy(False)
+
+    # Method to convert the text values of the input fields into their corresponding ACTUAL data values (features)
+    def convert_values(self, values):
+        with metrics.timer("encode"):
+            return self.predictor.encode_form(values)
+
+    # Method to run the prediction of the classifier  -  runs on the WORKER thread (must NOT touch any widget)
+    def predict(self, test_features):
+        # Run the prediction through the trained classifier (with its probability & decision path)
+        with metrics.timer("inference"):
+            explanation = self.predictor.explain_one(test_features)
+        metrics.count("predictions")
 
         # Return the prediction result
-        return prediction_result
+        return explanation
+
+    ###########################
+    # SESSION (BATCH) SCORING #
+    ###########################
+
+    # Method to queue the patient of the form  -  scored with the next batch, when enough patients are queued (or
+    # once no more are added for a moment)
+    def queue_data(self):
+        values = self.p2.get_values()
+        invalid = validate_form(values)
+        self.p2.flag(invalid)
+        if invalid:
+            metrics.count("incomplete_submissions")
+            return
+
+        self.session.add(values, self.convert_values(values))
+        self.p2.reset()
+        self.p2.set_queue_size(len(self.session))
+
+        if self.session.unsubmitted() >= self.session.batch_size:
+            self.score_session()
+        else:
+            if self.idle_batch is not None:
+                self.after_cancel(self.idle_batch)
+            self.idle_batch = self.after(DEFAULT_IDLE_MS, self.score_session)
+
+    # Method to show the session queue (Page4)  -  scrolled to the patients queued last
+    def show_session(self):
+        self.p4.update_session(self.session, scoring=self.pending_batch is not None)
+        self.p4.table.scroll_to_end()
+        self.p4.show()
+        self.score_session()
+
+    # Method to score every queued patient not scored yet, in ONE batch (on the worker thread)
+    #   (a single batch runs at a time  -  patients queued meanwhile are scored by the next one)
+    def score_session(self):
+        if self.idle_batch is not None:
+            self.after_cancel(self.idle_batch)
+            self.idle_batch = None
+        if self.pending_batch is not None or self.predictor is None:
+            return
+
+        batch = self.session.next_batch()
+        if batch is None:
+            return
+        start, generation, features = batch
+        self.pending_batch = self.executor.submit(self.predict_batch, features)
+        self.after(20, self.check_batch, self.pending_batch, start, generation)
+        self.p4.update_session(self.session, scoring=True)
+
+    # Method to check (on the Tk event thread) whether a batch has finished  -  then shows its results
+    def check_batch(self, future, start, generation):
+        if not future.done():
+            self.after(20, self.check_batch, future, start, generation)
+            return
+        self.pending_batch = None
+
+        try:
+            predictions, confidence = future.result()
+        except Exception as error:
+            metrics.count("prediction_errors")
+            print("ERROR: BATCH PREDICTION FAILED -", error)
+            self.session.requeue(start, generation)
+            self.p4.update_session(self.session)
+            return
+
+        with metrics.timer("ui_update"):
+            self.session.set_results(start, generation, predictions, confidence)
+            self.p4.update_session(self.session)
+
+        # Patients queued while the batch was running
+        if self.session.unsubmitted() >= self.session.batch_size:
+            self.score_session()
+        elif self.session.unsubmitted() and self.idle_batch is None:
+            self.idle_batch = self.after(DEFAULT_IDLE_MS, self.score_session)
+
+    # Method to drop every queued patient (results of a batch still running are discarded)
+    def clear_session(self):
+        if self.idle_batch is not None:
+            self.after_cancel(self.idle_batch)
+            self.idle_batch = None
+        self.session.clear()
+        self.p2.set_queue_size(0)
+        self.p4.update_session(self.session, scoring=self.pending_batch is not None)
+
+    # Method to run the prediction of a batch of patients (vectorized)  -  runs on the WORKER thread
+    #   (returns the predictions & their confidence)
+    def predict_batch(self, features):
+        import numpy as np
+
+        with metrics.timer("batch_inference"):
+            predictions, confidence, _ = self.predictor.summarize(np.asarray(features, dtype=np.float64))
+        metrics.count("batch_predictions", len(features))
+        return predictions, confidence
+
+    def on_destroy(self, event):
+        if event.widget is self:
+            self.executor.shutdown(wait=False, cancel_futures=True)
 
     def reset(self):
+        self.cancel_prediction()
         self.p2.reset()
         self.p3.reset()
 
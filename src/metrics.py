@@ -0,0 +1,265 @@
+# Import libraries
+import json
+import os
+import sys
+import threading
+import time
+from bisect import bisect_left
+
+
+################################################
+
+# PIPELINE METRICS
+#   Per-stage timers, counters & latency histograms of the prediction pipeline (validation, encoding, inference,
+#   UI update)  -  & the statistics of other components (e.g. the prediction cache, see 'add_source'), exported
+#   offline as Prometheus text or JSON. Disabled by default  -  then every hook is a no-op
+#   (a flag check, & one shared do-nothing context manager), cheap enough to leave in the hot path.
+#
+#   Optional profiling mode: cProfile & tracemalloc of every thread (e.g. the model loader & the prediction worker,
+#   not just the Tk event thread), written to 'profile.prof' (open with 'python -m pstats' or snakeviz) &
+#   'tracemalloc.txt'.
+
+# Upper bounds of the latency histogram buckets (seconds)  -  1 us to 10 s
+HISTOGRAM_BUCKETS = [m * 10.0 ** e for e in range(-6, 1) for m in (1, 2.5, 5)] + [10.0]
+
+# Prefix of every exported metric name
+METRIC_PREFIX = "heart_"
+
+
+################################################
+
+
+# Latency histogram (fixed buckets, as in Prometheus)
+class Histogram:
+    def __init__(self, buckets=HISTOGRAM_BUCKETS):
+        self.buckets = buckets
+        # One count per bucket, & one for the values above the last bucket
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    """ Method to estimate a quantile (the upper bound of the bucket it falls in) """
+    def quantile(self, q):
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        total = 0
+        for bound, count in zip(self.buckets + [float("inf")], self.counts):
+            total += count
+            if total >= rank:
+                return bound
+        return float("inf")
+
+
+# Context manager timing a stage into its histogram
+class StageTimer:
+    __slots__ = ("metrics", "stage", "start")
+
+    def __init__(self, metrics, stage):
+        self.metrics = metrics
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.metrics.observe(self.stage, time.perf_counter() - self.start)
+
+
+# Context manager doing nothing (shared by every hook while metrics are disabled)
+class NoOpTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+
+NOOP_TIMER = NoOpTimer()
+
+
+class Metrics:
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.lock = threading.Lock()
+
+        # Stage name -> latency histogram  &  counter name -> count
+        self.histograms = {}
+        self.counters = {}
+        # Source name -> function returning its statistics (a dict of numbers), read when the metrics are exported
+        self.sources = {}
+
+        # cProfile profiler while profiling (see 'start_profiling')  -  & the profilers of the threads started since
+        self.profiler = None
+        self.thread_profilers = []
+
+    ##################
+    # HOOKS (hot path) #
+    ##################
+
+    """ Method to time a stage  -  'with metrics.timer("inference"): ...' """
+    def timer(self, stage):
+        if not self.enabled:
+            return NOOP_TIMER
+        return StageTimer(self, stage)
+
+    """ Method to record the duration of a stage (in seconds) """
+    def observe(self, stage, seconds):
+        if not self.enabled:
+            return
+        with self.lock:
+            histogram = self.histograms.get(stage)
+            if histogram is None:
+                histogram = self.histograms[stage] = Histogram()
+            histogram.observe(seconds)
+
+    """ Method to increment a counter """
+    def count(self, name, n=1):
+        if not self.enabled:
+            return
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    """ Method to export the statistics of a component with the metrics  -  'stats' returns them as a dict of numbers
+        (e.g. 'PredictionCache.stats') """
+    def add_source(self, name, stats):
+        with self.lock:
+            self.sources[name] = stats
+
+    """ Method to drop every recorded metric """
+    def reset(self):
+        with self.lock:
+            self.histograms.clear()
+            self.counters.clear()
+
+    #############
+    # EXPORTERS #
+    #############
+
+    """ Method to get the metrics as a JSON-serializable dict """
+    def to_dict(self):
+        with self.lock:
+            return {
+                "counters": dict(self.counters),
+                "sources": {name: stats() for name, stats in self.sources.items()},
+                "stages": {
+                    stage: {
+                        "count": h.count,
+                        "sum_s": h.sum,
+                        "mean_s": h.sum / h.count if h.count else 0.0,
+                        "p50_s": h.quantile(0.5),
+                        "p99_s": h.quantile(0.99),
+                        "buckets": {"%g" % bound: count for bound, count in zip(h.buckets, h.counts) if count},
+                    } for stage, h in self.histograms.items()
+                },
+            }
+
+    """ Method to get the metrics in the Prometheus text exposition format """
+    def to_prometheus(self):
+        lines = []
+        with self.lock:
+            for name, value in sorted(self.counters.items()):
+                metric = METRIC_PREFIX + name + "_total"
+                lines += ["# TYPE %s counter" % metric, "%s %d" % (metric, value)]
+
+            metric = METRIC_PREFIX + "stage_seconds"
+            if self.histograms:
+                lines.append("# TYPE %s histogram" % metric)
+            for stage, h in sorted(self.histograms.items()):
+                cumulative = 0
+                for bound, count in zip(h.buckets, h.counts):
+                    cumulative += count
+                    lines.append('%s_bucket{stage="%s",le="%g"} %d' % (metric, stage, bound, cumulative))
+                lines.append('%s_bucket{stage="%s",le="+Inf"} %d' % (metric, stage, h.count))
+                lines.append('%s_sum{stage="%s"} %r' % (metric, stage, h.sum))
+                lines.append('%s_count{stage="%s"} %d' % (metric, stage, h.count))
+
+            # Source statistics are exported as gauges (their current values)
+            for name, stats in sorted(self.sources.items()):
+                for key, value in sorted(stats().items()):
+                    if isinstance(value, (int, float)):
+                        metric = "%s%s_%s" % (METRIC_PREFIX, name, key)
+                        lines += ["# TYPE %s gauge" % metric, "%s %r" % (metric, value)]
+        return "\n".join(lines) + "\n"
+
+    """ Method to write the metrics to a file  -  Prometheus text, or JSON if the file name ends with '.json' """
+    def write(self, path):
+        with open(path, "w") as f:
+            if path.endswith(".json"):
+                json.dump(self.to_dict(), f, indent=2)
+            else:
+                f.write(self.to_prometheus())
+
+    #############
+    # PROFILING #
+    #############
+
+    """ Method to start profiling (cProfile & tracemalloc)  -  the calling thread & every thread started from now on """
+    def start_profiling(self):
+        import cProfile
+        import tracemalloc
+
+        tracemalloc.start()
+        self.thread_profilers = []
+        self.profiler = cProfile.Profile()
+        self.profiler.enable()
+
+        # Before Python 3.12, a profiler only sees the thread which enabled it  -  every new thread enables its own
+        # (merged by 'stop_profiling'). From 3.12, the profiler sees every thread.
+        if sys.version_info < (3, 12):
+            threading.setprofile(self._profile_thread)
+
+    # Method to start profiling a new thread  -  called (once) by its first event, & replaced by the thread's profiler
+    def _profile_thread(self, frame, event, arg):
+        import cProfile
+
+        profiler = cProfile.Profile()
+        with self.lock:
+            self.thread_profilers.append(profiler)
+        profiler.enable()
+
+    """ Method to stop profiling & write the results into 'directory'  -  returns the paths of the files written """
+    def stop_profiling(self, directory, top=25):
+        import pstats
+        import tracemalloc
+
+        threading.setprofile(None)
+        self.profiler.disable()
+        snapshot = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        # Merge the profiles of every thread (threads which never ran any Python code have none)
+        stats = pstats.Stats(self.profiler)
+        with self.lock:
+            thread_profilers, self.thread_profilers = self.thread_profilers, []
+        for profiler in thread_profilers:
+            try:
+                stats.add(profiler)
+            except TypeError:
+                pass
+
+        os.makedirs(directory, exist_ok=True)
+        profile_file = os.path.join(directory, "profile.prof")
+        stats.dump_stats(profile_file)
+        self.profiler = None
+
+        memory_file = os.path.join(directory, "tracemalloc.txt")
+        with open(memory_file, "w") as f:
+            f.write("current: %.1f KiB  peak: %.1f KiB\n\n" % (current / 1024, peak / 1024))
+            for stat in snapshot.statistics("lineno")[:top]:
+                f.write("%s\n" % stat)
+
+        return profile_file, memory_file
+
+
+# The application's pipeline metrics (disabled until 'metrics.enabled' is set)
+metrics = Metrics()
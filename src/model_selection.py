@@ -0,0 +1,207 @@
+# Import libraries
+import argparse
+import itertools
+import json
+import os
+import time
+import numpy as np
+from joblib import Parallel, delayed
+from sklearn.metrics import accuracy_score
+from sklearn.model_selection import StratifiedKFold, train_test_split
+from src.estimators import ESTIMATORS, compile_model, engine_from_arrays, make_estimator
+from src.model_store import FEATURE_COLUMNS, LABEL_COLUMN
+from src.predictor import DEFAULT_DATA_FILE, HeartDiseasePredictor
+
+
+################################################
+
+# MODEL SELECTION
+#   k-fold cross-validation over a grid of tree depths, min-samples & pruning ('ccp_alpha'), plus alternative
+#   estimators (random forest, gradient boosting  -  any estimator of 'ESTIMATORS')  -  every candidate is evaluated
+#   in parallel (one process per core). Each candidate is reported with its accuracy (cross-validated, hold-out &
+#   training) AND its cost (fit time, batch & single-row inference time, model size), so the model picked is both
+#   accurate & fast to serve. Inference is timed AFTER the search, on a single thread, with the compiled engine the
+#   application actually serves (not sklearn's 'predict', nor while the other workers compete for the cores).
+#
+# USAGE:
+#   python -m src.model_selection --folds 5 --jobs -1 -o selection.json
+
+# Parameter grid of the estimators searched by default (every combination is a candidate  -  overriding the
+# estimator's defaults; estimators with no grid are evaluated with their defaults)
+PARAM_GRID = {
+    'decision_tree': {
+        'max_depth':        [None, 3, 5, 8, 12],
+        'min_samples_leaf': [1, 5, 10, 20],
+        'ccp_alpha':        [0.0, 0.002, 0.005, 0.01],
+    },
+    'random_forest': {
+        'n_estimators':     [50, 200],
+        'max_depth':        [None, 8],
+        'min_samples_leaf': [1, 5],
+    },
+    'gradient_boosting': {
+        'n_estimators':     [100, 300],
+        'max_depth':        [2, 3],
+        'learning_rate':    [0.05, 0.1],
+    },
+}
+
+# Share of the dataset held out to measure hold-out accuracy & inference time
+HOLDOUT_SIZE = 0.2
+
+# Single-row inference  -  rows timed, & timed passes over them (the median is reported)
+SINGLE_ROWS = 50
+SINGLE_PASSES = 20
+
+
+################################################
+
+
+# Method to list every candidate  -  (estimator name, parameters) pairs
+def candidates(estimators=None):
+    for name in estimators or PARAM_GRID:
+        grid = PARAM_GRID.get(name, {})
+        for values in itertools.product(*grid.values()):
+            yield name, dict(zip(grid, values))
+
+
+# Method to count the decision nodes of a fitted estimator (a measure of its size)
+def node_count(model):
+    if hasattr(model, "tree_"):
+        return int(model.tree_.node_count)
+    return int(sum(tree.tree_.node_count for tree in np.ravel(model.estimators_)))
+
+
+# Method to evaluate the accuracy of a single candidate  -  runs in a worker process
+#   (returns its results & the node arrays of its compiled hold-out model  -  timed later, see 'serving_cost')
+def evaluate(name, params, X, y, folds, seed):
+    def make():
+        kwargs = dict(params, random_state=seed)
+        if name == 'random_forest':
+            kwargs['n_jobs'] = 1  # the candidates are already spread across the cores
+        return make_estimator(name, kwargs)
+
+    # k-fold cross-validation
+    cv_scores = []
+    fit_times = []
+    for train, test in StratifiedKFold(folds, shuffle=True, random_state=seed).split(X, y):
+        start = time.perf_counter()
+        model = make().fit(X[train], y[train])
+        fit_times.append(time.perf_counter() - start)
+        cv_scores.append(accuracy_score(y[test], model.predict(X[test])))
+
+    # Hold-out split  -  training & hold-out accuracy (of the compiled model, as served)
+    X_train, X_test, y_train, y_test = holdout_split(X, y, seed)
+    model = make().fit(X_train, y_train)
+    engine = compile_model(model)
+
+    result = {
+        "estimator": name,
+        "params": params,
+        "cv_accuracy": float(np.mean(cv_scores)),
+        "cv_accuracy_std": float(np.std(cv_scores)),
+        "holdout_accuracy": float(accuracy_score(y_test, engine.predict(X_test))),
+        "train_accuracy": float(accuracy_score(y_train, engine.predict(X_train))),
+        "fit_time_ms": float(np.mean(fit_times)) * 1000,
+        "nodes": node_count(model),
+    }
+    return result, engine.to_arrays()
+
+
+# Method to split the dataset into the training & hold-out sets (the same split in every process)
+def holdout_split(X, y, seed):
+    return train_test_split(X, y, test_size=HOLDOUT_SIZE, stratify=y, random_state=seed)
+
+
+# Method to time the inference of a compiled model on the hold-out set  -  batch (per row) & single-row (median),
+# in microseconds (call it from a single thread, with no other work running)
+def serving_cost(engine, X_test):
+    batch_times = []
+    for _ in range(5):
+        start = time.perf_counter()
+        engine.predict(X_test)
+        batch_times.append(time.perf_counter() - start)
+
+    # Feature lists  -  as the application passes them
+    rows = X_test[:SINGLE_ROWS].tolist()
+    single_times = []
+    for _ in range(SINGLE_PASSES):
+        for row in rows:
+            start = time.perf_counter()
+            engine.predict_one(row)
+            single_times.append(time.perf_counter() - start)
+
+    return min(batch_times) / len(X_test) * 1e6, float(np.median(single_times)) * 1e6
+
+
+# Method to mark the candidates on the accuracy / inference cost Pareto front
+#   (no other candidate is both more accurate AND cheaper to serve)
+def mark_pareto_front(results):
+    for result in results:
+        result["pareto"] = not any(
+            other["cv_accuracy"] >= result["cv_accuracy"] and other["single_row_us"] <= result["single_row_us"]
+            and (other["cv_accuracy"] > result["cv_accuracy"] or other["single_row_us"] < result["single_row_us"])
+            for other in results
+        )
+    return results
+
+
+# Method to run the model selection  -  returns the results of every candidate (most accurate first)
+def select(data_file=DEFAULT_DATA_FILE, folds=5, n_jobs=-1, seed=0, estimators=None):
+    df = HeartDiseasePredictor(data_file).dataset
+    X = df[FEATURE_COLUMNS].to_numpy(dtype=np.float64)
+    y = df[LABEL_COLUMN].to_numpy()
+
+    evaluated = Parallel(n_jobs=n_jobs)(
+        delayed(evaluate)(name, params, X, y, folds, seed) for name, params in candidates(estimators)
+    )
+
+    # Serving cost  -  timed here, one model at a time, once every worker is done
+    X_test = holdout_split(X, y, seed)[1]
+    results = []
+    for result, arrays in evaluated:
+        result["batch_us_per_row"], result["single_row_us"] = serving_cost(engine_from_arrays(arrays), X_test)
+        results.append(result)
+    return sorted(mark_pareto_front(results), key=lambda r: r["cv_accuracy"], reverse=True)
+
+
+# Method to format the results as a text table
+def report(results, limit=None):
+    lines = ["%-18s %-52s %8s %8s %8s %9s %10s %7s %s" % ("ESTIMATOR", "PARAMS", "CV ACC", "HOLDOUT", "TRAIN",
+                                                         "FIT(ms)", "1-ROW(us)", "NODES", "PARETO")]
+    for r in results[:limit]:
+        params = ", ".join("%s=%s" % item for item in r["params"].items())
+        lines.append("%-18s %-52s %8.3f %8.3f %8.3f %9.1f %10.1f %7d %s" % (
+            r["estimator"], params[:52], r["cv_accuracy"], r["holdout_accuracy"], r["train_accuracy"],
+            r["fit_time_ms"], r["single_row_us"], r["nodes"], "*" if r["pareto"] else ""))
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    # Command-line options
+    parser = argparse.ArgumentParser(description="Cross-validated, parallel model selection")
+    parser.add_argument("--data", default=DEFAULT_DATA_FILE, help="training dataset (encoded 'heart.csv' schema)")
+    parser.add_argument("--folds", type=int, default=5, help="number of cross-validation folds")
+    parser.add_argument("--jobs", type=int, default=-1, help="parallel worker processes (-1 = all cores)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--estimators", nargs="+", choices=sorted(ESTIMATORS),
+                        help="estimators to evaluate (default: %s)" % ", ".join(PARAM_GRID))
+    parser.add_argument("--top", type=int, default=20, help="number of candidates shown")
+    parser.add_argument("-o", "--output", help="write all results (JSON) to this file")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    results = select(args.data, args.folds, args.jobs, args.seed, args.estimators)
+    elapsed = time.perf_counter() - start
+
+    print(report(results, args.top))
+    print("\n%d candidates evaluated in %.1f s on %d core(s)  (* = accuracy / inference cost Pareto front)"
+          % (len(results), elapsed, os.cpu_count() if args.jobs < 0 else args.jobs))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+# Import libraries
+import hashlib
+import os
+import pickle
+from src import cache_dir
+
+
+################################################
+
+# Features (X) & label (y) the classifier is trained on  -  ORDER MATTERS (it is the order of every feature vector)
+FEATURE_COLUMNS = [
+    'Age',              # int64
+    'Sex',              # int64   [ORIG. object]
+    'ChestPainType',    # int64   [ORIG. object]
+    'RestingBP',        # int64
+    'Cholesterol',      # int64
+    'FastingBS',        # int64
+    'RestingECG',       # int64   [ORIG. object]
+    'MaxHR',            # int64
+    'ExerciseAngina',   # int64   [ORIG. object]
+    'Oldpeak',          # float64
+    'ST_Slope',         # int64   [ORIG. object]
+]
+LABEL_COLUMN = 'HeartDisease'
+
+# Bump whenever the artifact layout (or the way the model is trained) changes  -  invalidates every stored model
+ARTIFACT_VERSION = 4
+
+# Prefix of the metadata arrays stored along with the compiled model (see 'ModelStore.save')
+METADATA_PREFIX = "meta_"
+
+
+################################################
+
+
+# Stores the trained classifier on disk, keyed by a fingerprint of the dataset it was trained on
+class ModelStore:
+    def __init__(self, directory=None):
+        # Directory holding the model artifact(s)
+        self.directory = directory or os.path.join(cache_dir, "models")
+        self.artifact_file = os.path.join(self.directory, "model.pkl")
+        # Compiled tree or ensemble (flat node arrays)  -  scoring from it doesn't need sklearn at all
+        self.engine_file = os.path.join(self.directory, "model.npz")
+
+    """ Method to compute the fingerprint of a dataset (hash of its contents + the selected features)
+        -  'model' describes the estimator trained on it (see 'estimator_spec'), & 'records' are the labelled
+           records trained on along with it (the contents of a record store  -  see 'RecordStore.snapshot') """
+    @staticmethod
+    def fingerprint(data_file, features=FEATURE_COLUMNS, label=LABEL_COLUMN, model="", records=b""):
+        digest = hashlib.sha256()
+        digest.update(("v%d|%s|%s|%s|" % (ARTIFACT_VERSION, ",".join(features), label, model)).encode("utf-8"))
+
+        # A dataset is either a single file (CSV/Parquet) or a directory of column files (.npy)
+        if os.path.isdir(data_file):
+            files = [os.path.join(data_file, name) for name in sorted(os.listdir(data_file))]
+        else:
+            files = [data_file]
+
+        # Hash the file(s) in blocks (avoids reading large datasets into memory at once)
+        for path in files:
+            digest.update(os.path.basename(path).encode("utf-8"))
+            with open(path, "rb") as f:
+                for block in iter(lambda: f.read(1 << 20), b""):
+                    digest.update(block)
+
+        # (no records  -  the same fingerprint as the dataset alone)
+        if records:
+            digest.update(b"|records|")
+            digest.update(records)
+
+        return digest.hexdigest()
+
+    """ Method to load the stored model  -  returns None if there is none (or it was trained on different data) """
+    def load(self, fingerprint):
+        try:
+            with open(self.artifact_file, "rb") as f:
+                artifact = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError):
+            # Missing, truncated or incompatible artifact  -  treat it as a cache miss
+            return None
+
+        if not isinstance(artifact, dict) or artifact.get("fingerprint") != fingerprint:
+            return None
+
+        return artifact["model"]
+
+    """ Method to load the stored compiled model & its metadata (name -> array, see 'save')
+        -  returns (None, None) if there is none (or it was trained on other data) """
+    def load_engine(self, fingerprint):
+        # Imported here, so loading the pickled model alone doesn't depend on it
+        import numpy as np
+        from src.estimators import engine_from_arrays
+
+        try:
+            with np.load(self.engine_file, allow_pickle=False) as arrays:
+                if str(arrays["fingerprint"]) != fingerprint:
+                    return None, None
+                metadata = {name[len(METADATA_PREFIX):]: arrays[name] for name in arrays.files
+                            if name.startswith(METADATA_PREFIX)}
+                return engine_from_arrays(arrays), metadata
+        except (OSError, KeyError, ValueError):
+            return None, None
+
+    """ Method to store a trained model (& its compiled engine) along with the fingerprint of its training data
+        -  'metadata' (name -> array) is stored with the compiled engine, & loaded back with it """
+    def save(self, model, fingerprint, engine=None, metadata=None):
+        os.makedirs(self.directory, exist_ok=True)
+
+        # Write to a temporary file first, then swap it in (a crash mid-write never leaves a corrupt artifact behind)
+        tmp_file = self.artifact_file + ".tmp"
+        with open(tmp_file, "wb") as f:
+            pickle.dump({"fingerprint": fingerprint, "model": model}, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_file, self.artifact_file)
+
+        if engine is not None:
+            import numpy as np
+
+            tmp_file = self.engine_file + ".tmp"
+            with open(tmp_file, "wb") as f:
+                np.savez(f, fingerprint=fingerprint, **engine.to_arrays(),
+                         **{METADATA_PREFIX + name: value for name, value in (metadata or {}).items()})
+            os.replace(tmp_file, self.engine_file)
@@ -0,0 +1,182 @@
+# Import libraries
+import csv
+import io
+import os
+import threading
+import time
+from src import cache_dir
+from src.encoding import check_features
+from src.model_store import FEATURE_COLUMNS, LABEL_COLUMN
+
+
+################################################
+
+# ONLINE RETRAINING
+#   New labelled patient records are appended to a record store (an append-only CSV file). Once enough new records
+#   have accumulated, a new model is trained on the dataset + every stored record in the BACKGROUND, then published
+#   to the running predictor atomically  -  predictions are never blocked, & keep using the previous model until the
+#   new one is ready. The stored records are part of the model's fingerprint (see 'HeartDiseasePredictor.load'), so
+#   the retrained model is saved to the model store & served again after a restart.
+
+DEFAULT_RECORDS_FILE = os.path.join(cache_dir, "records.csv")
+DEFAULT_MIN_NEW_RECORDS = 50
+
+# Values a record's label may take (0 = no heart disease, 1 = heart disease)
+LABELS = (0, 1)
+
+RECORD_COLUMNS = FEATURE_COLUMNS + [LABEL_COLUMN]
+
+
+################################################
+
+
+# Method to check a labelled record  -  raises a ValueError if its features aren't values the dataset can hold, or its
+# label isn't 0 or 1 (a record with any other label would train a model predicting classes the application can't show)
+def check_record(features, label):
+    check_features(features, stored=True)
+    if isinstance(label, bool) or label not in LABELS:
+        raise ValueError("%s: %r is not one of %s" % (LABEL_COLUMN, label, list(LABELS)))
+
+
+# Append-only store of labelled records (encoded features + label), in the 'heart.csv' schema
+class RecordStore:
+    def __init__(self, path=DEFAULT_RECORDS_FILE):
+        self.path = path
+        self.lock = threading.Lock()
+
+    """ Method to append labelled records  -  'X' (encoded feature vectors) & 'y' (their labels)
+        -  raises a ValueError (& stores none of them) if any record is invalid (see 'check_record') """
+    def append(self, X, y):
+        rows = []
+        for features, label in zip(X, y):
+            check_record(features, label)
+            # Integer features are written as integers (only 'Oldpeak' is fractional  -  the others were checked to be
+            # whole numbers)
+            row = [value if column == 'Oldpeak' else int(value) for column, value in zip(FEATURE_COLUMNS, features)]
+            rows.append(row + [int(label)])
+
+        with self.lock:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            new_file = not os.path.exists(self.path) or os.path.getsize(self.path) == 0
+            with open(self.path, "a", newline="") as f:
+                writer = csv.writer(f)
+                if new_file:
+                    writer.writerow(RECORD_COLUMNS)
+                writer.writerows(rows)
+        return len(rows)
+
+    """ Method to get the contents of the store (bytes  -  empty if there are no records), as of now """
+    def snapshot(self):
+        with self.lock:
+            try:
+                with open(self.path, "rb") as f:
+                    return f.read()
+            except FileNotFoundError:
+                return b""
+
+    """ Method to read the records of a snapshot (a DataFrame with the compact schema  -  empty if there are none) """
+    @staticmethod
+    def parse(snapshot):
+        from src.data_loader import SCHEMA, WIDE_SCHEMA, to_schema
+        import pandas as pd
+
+        if not snapshot:
+            return pd.DataFrame({c: pd.Series(dtype=SCHEMA[c]) for c in RECORD_COLUMNS})
+        return to_schema(pd.read_csv(io.BytesIO(snapshot), usecols=RECORD_COLUMNS, dtype=WIDE_SCHEMA)[RECORD_COLUMNS])
+
+    """ Method to count the records of a snapshot (without parsing it) """
+    @staticmethod
+    def count(snapshot):
+        # One line per record (every line ends with a line break), after the header
+        return max(0, snapshot.count(b"\n") - 1)
+
+    """ Method to read every stored record (a DataFrame with the compact schema  -  empty if there are none) """
+    def read(self):
+        return self.parse(self.snapshot())
+
+
+# Retrains the predictor's model in the background as new labelled records arrive
+class OnlineTrainer:
+    def __init__(self, predictor, store=None, min_new_records=DEFAULT_MIN_NEW_RECORDS):
+        self.predictor = predictor
+        # The predictor's own record store, by default  -  the records its model is trained on
+        self.store = store or predictor.records or RecordStore()
+        self.min_new_records = min_new_records
+
+        self.lock = threading.Lock()
+        # Records added since the last retrain started  -  initially, the stored records the model wasn't trained on
+        self.pending = max(0, RecordStore.count(self.store.snapshot()) - predictor.trained_records)
+        # Whether a retrain is running (set & cleared under the lock  -  see 'retrain' & '_retrain'), & its thread
+        self.running = False
+        self.thread = None
+
+        # Statistics of the last retrain
+        self.last_retrain_seconds = None
+        self.last_retrain_rows = None
+        self.last_error = None
+
+        if self.pending >= self.min_new_records:
+            self.retrain()
+
+    """ Method to add labelled records  -  starts a background retrain once enough new records have accumulated """
+    def add(self, X, y):
+        added = self.store.append(X, y)
+
+        with self.lock:
+            self.pending += added
+            start = self.pending >= self.min_new_records
+        if start:
+            self.retrain()
+        return added
+
+    """ Method to start a background retrain now (unless one is already running)  -  returns the thread running it """
+    def retrain(self):
+        with self.lock:
+            if not self.running:
+                self.running = True
+                self.pending = 0
+                self.thread = threading.Thread(target=self._retrain, name="OnlineTrainer", daemon=True)
+                self.thread.start()
+            return self.thread
+
+    """ Method to wait for the running retrain (if any) to finish """
+    def wait(self, timeout=None):
+        thread = self.thread
+        if thread is not None:
+            thread.join(timeout)
+
+    def _retrain(self):
+        while True:
+            start = time.perf_counter()
+            try:
+                # Trained on the records stored so far  -  & saved to the model store (served after a restart)
+                self.predictor.fit(self.store.snapshot(), save=True)
+            except Exception as error:
+                self.last_error = error
+                with self.lock:
+                    self.running = False
+                return
+
+            self.last_retrain_seconds = time.perf_counter() - start
+            self.last_retrain_rows = self.predictor.training_rows
+            self.last_error = None
+
+            # Retrain again if enough records arrived while retraining  -  decided under the lock, so records added
+            # from here on either see 'running' cleared (& start a retrain) or are picked up by this loop
+            with self.lock:
+                if self.pending < self.min_new_records:
+                    self.running = False
+                    return
+                self.pending = 0
+
+    """ Method to get the trainer's status (as a JSON-serializable dict) """
+    def status(self):
+        with self.lock:
+            return {
+                "model_version": self.predictor.model_version,
+                "pending_records": self.pending,
+                "retraining": self.running,
+                "last_retrain_seconds": self.last_retrain_seconds,
+                "last_retrain_rows": self.last_retrain_rows,
+                "last_error": None if self.last_error is None else str(self.last_error),
+            }
@@ -0,0 +1,213 @@
+# Import libraries
+import argparse
+import os
+import sys
+import time
+from multiprocessing import get_context, shared_memory
+import numpy as np
+from src.estimators import add_estimator_arguments, engine_from_arrays
+from src.model_store import FEATURE_COLUMNS
+from src.predictor import DEFAULT_DATA_FILE, HeartDiseasePredictor
+
+
+################################################
+
+# PARALLEL BATCH SCORING
+#   Scores large feature matrices on every core. The model's node arrays, the input features & the output predictions
+#   all live in shared memory (or memory-mapped files)  -  workers attach to them once, then each task is just a row
+#   range: the input is sliced & the results are written in place, so no rows are ever pickled between processes.
+#
+#   Inputs can be:
+#     * an array             - copied ONCE into shared memory (build it in a 'SharedArray' to skip even that copy)
+#     * a .npy file          - a (rows x features) matrix, memory-mapped by every worker
+#     * a .npy directory     - the columns written by 'python -m src.data_loader convert', memory-mapped by every worker
+#
+# USAGE:
+#   python -m src.parallel_scoring registry_npy/ -o predictions.npy --jobs 8
+#   python -m src.parallel_scoring --synthetic 1000000 --scaling      (throughput with 1, 2, 4, ... workers)
+
+# Rows per task  -  small enough to balance the load across workers, large enough to amortize each task's overhead
+DEFAULT_TASK_ROWS = 1 << 17
+
+
+################################################
+
+
+# A numpy array backed by a (named) shared memory block  -  picklable as its 'spec', to attach to it in other processes
+class SharedArray:
+    def __init__(self, shm, shape, dtype, owner):
+        self.shm = shm
+        self.owner = owner
+        self.array = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+
+    """ Method to create a new shared array (uninitialized), or a shared copy of 'data' """
+    @classmethod
+    def create(cls, shape=None, dtype=None, data=None):
+        if data is not None:
+            data = np.asarray(data)
+            shape, dtype = data.shape, data.dtype
+        dtype = np.dtype(dtype)
+
+        size = max(int(np.prod(shape)) * dtype.itemsize, 1)  # zero-size blocks aren't allowed
+        shared = cls(shared_memory.SharedMemory(create=True, size=size), shape, dtype, owner=True)
+        if data is not None:
+            shared.array[...] = data
+        return shared
+
+    """ Method to attach to a shared array created by another process (see 'spec') """
+    @classmethod
+    def attach(cls, spec):
+        name, shape, dtype = spec
+        return cls(shared_memory.SharedMemory(name=name), shape, dtype, owner=False)
+
+    @property
+    def spec(self):
+        return self.shm.name, self.array.shape, self.array.dtype.str
+
+    """ Method to release the shared memory (& free it, in the process which created it) """
+    def close(self):
+        self.array = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+################################################
+# WORKER PROCESSES
+
+# State of a worker process (set once, by 'init_worker')
+_worker = {}
+
+
+# Method to open an input (see 'input_spec') in a worker  -  returns a function slicing a row range out of it
+def open_input(spec):
+    kind, source = spec
+    if kind == "shared":
+        shared = SharedArray.attach(source)
+        _worker.setdefault("attached", []).append(shared)
+        return lambda start, stop: shared.array[start:stop]
+    if kind == "npy":
+        X = np.load(source, mmap_mode="r")
+        return lambda start, stop: X[start:stop]
+    if kind == "columns":
+        from src.data_loader import load_columns
+        columns = load_columns(source, FEATURE_COLUMNS)
+        return lambda start, stop: np.column_stack([columns[c][start:stop] for c in FEATURE_COLUMNS])
+    raise ValueError("Unknown input kind: %r" % kind)
+
+
+def init_worker(model_specs, input_spec, output_spec):
+    # Rebuild the compiled tree (or ensemble) from the shared node arrays
+    model = {name: SharedArray.attach(spec) for name, spec in model_specs.items()}
+    _worker["engine"] = engine_from_arrays({name: shared.array for name, shared in model.items()})
+    _worker["input"] = open_input(input_spec)
+    _worker["output"] = SharedArray.attach(output_spec)
+    _worker.setdefault("attached", []).extend([*model.values(), _worker["output"]])
+
+
+# Method to score a row range  -  runs in a worker process (results are written straight into the shared output)
+def score_range(start, stop, method):
+    X = _worker["input"](start, stop)
+    output = _worker["output"].array
+    output[start:stop] = getattr(_worker["engine"], method)(X)
+    return stop - start
+
+
+################################################
+
+
+# Method to describe an input for the workers  -  returns (spec, number of rows, shared array to free afterwards)
+def input_spec(X):
+    if isinstance(X, SharedArray):
+        return ("shared", X.spec), len(X.array), None
+    if isinstance(X, (str, os.PathLike)):
+        if os.path.isdir(X):
+            from src.data_loader import load_columns
+            return ("columns", os.fspath(X)), len(load_columns(X, FEATURE_COLUMNS[:1])[FEATURE_COLUMNS[0]]), None
+        return ("npy", os.fspath(X)), len(np.load(X, mmap_mode="r")), None
+
+    shared = SharedArray.create(data=np.ascontiguousarray(X, dtype=np.float64))
+    return ("shared", shared.spec), len(shared.array), shared
+
+
+# Method to score an input on a pool of worker processes  -  returns the predictions (or class probabilities)
+#   'X' is an array, a SharedArray, a .npy file or a .npy column directory (see above)
+#   'method' is 'predict' or 'predict_proba'
+def score(engine, X, n_jobs=None, method="predict", task_rows=DEFAULT_TASK_ROWS):
+    n_jobs = n_jobs or os.cpu_count()
+    spec, n_rows, owned_input = input_spec(X)
+
+    if method == "predict":
+        shape, dtype = (n_rows,), engine.classes.dtype
+    elif method == "predict_proba":
+        shape, dtype = (n_rows, len(engine.classes)), np.float64
+    else:
+        raise ValueError("Unknown method: %r" % method)
+
+    model = {name: SharedArray.create(data=array) for name, array in engine.to_arrays().items()}
+    output = SharedArray.create(shape, dtype)
+    try:
+        ranges = [(start, min(start + task_rows, n_rows), method) for start in range(0, n_rows, task_rows)]
+        with get_context().Pool(n_jobs, init_worker,
+                                ({name: shared.spec for name, shared in model.items()}, spec, output.spec)) as pool:
+            pool.starmap(score_range, ranges)
+        return output.array.copy()
+    finally:
+        for shared in [*model.values(), output] + ([owned_input] if owned_input else []):
+            shared.close()
+
+
+def main(argv=None):
+    # Command-line options
+    parser = argparse.ArgumentParser(description="Multi-process batch scoring over shared memory")
+    parser.add_argument("input", nargs="?", help=".npy feature matrix or .npy column directory (see src.data_loader)")
+    parser.add_argument("-o", "--output", help="write the predictions to this .npy file")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count(), help="worker processes")
+    parser.add_argument("--proba", action="store_true", help="output the class probabilities")
+    parser.add_argument("--task-rows", type=int, default=DEFAULT_TASK_ROWS, help="rows scored per task")
+    parser.add_argument("--data", default=DEFAULT_DATA_FILE, help="training dataset (encoded 'heart.csv' schema)")
+    parser.add_argument("--synthetic", type=int, metavar="ROWS", help="score ROWS synthetic rows instead of 'input'")
+    parser.add_argument("--scaling", action="store_true", help="report the throughput with 1, 2, 4, ... workers")
+    add_estimator_arguments(parser)
+    args = parser.parse_args(argv)
+
+    if args.input is None and args.synthetic is None:
+        parser.error("an input or --synthetic is required")
+
+    predictor = HeartDiseasePredictor(args.data, estimator=args.estimator, params=args.params).load()
+    method = "predict_proba" if args.proba else "predict"
+
+    if args.synthetic is not None:
+        from src.bench import synthetic_features
+        shared = SharedArray.create((args.synthetic, len(FEATURE_COLUMNS)), np.float64)
+        shared.array[...] = synthetic_features(predictor.dataset, args.synthetic, np.random.default_rng(0))
+        X = shared
+    else:
+        shared = None
+        X = args.input
+
+    try:
+        jobs = [1 << i for i in range(args.jobs.bit_length()) if 1 << i < args.jobs] + [args.jobs] \
+            if args.scaling else [args.jobs]
+        for n_jobs in jobs:
+            start = time.perf_counter()
+            result = score(predictor.engine, X, n_jobs, method, args.task_rows)
+            elapsed = time.perf_counter() - start
+            print("SCORED: %d rows on %d worker(s) in %.2f s  [%.0f rows/s]"
+                  % (len(result), n_jobs, elapsed, len(result) / elapsed), file=sys.stderr)
+    finally:
+        if shared is not None:
+            shared.close()
+
+    if args.output:
+        np.save(args.output, result)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+# Import libraries
+import threading
+from collections import OrderedDict
+
+
+################################################
+
+# PREDICTION CACHE
+#   Bounded LRU cache of predictions, keyed by the encoded feature vector. Every entry belongs to a model version (any
+#   object identifying the model, e.g. the model itself)  -  when a different model version asks for a prediction,
+#   the whole cache is dropped (the model was retrained). The predictor caches whole explanations (label,
+#   probabilities & decision path), so single predictions & explanations share one cache  -  cached values are shared
+#   between callers & must not be modified.
+
+DEFAULT_MAXSIZE = 4096
+
+
+################################################
+
+
+class PredictionCache:
+    def __init__(self, maxsize=DEFAULT_MAXSIZE):
+        self.maxsize = maxsize
+        self.lock = threading.Lock()
+
+        # Feature tuple -> prediction (least recently used first) & the model version they were computed with
+        self.entries = OrderedDict()
+        self.version = None
+
+        # Counters
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    """ Method to get the cached prediction of a feature vector  -  computes (& caches) it on a miss """
+    def get(self, version, features, compute):
+        key = tuple(features)
+
+        with self.lock:
+            if version != self.version:
+                # The model changed  -  none of the cached predictions are valid anymore
+                if self.entries:
+                    self.invalidations += 1
+                self.entries.clear()
+                self.version = version
+
+            try:
+                result = self.entries[key]
+            except KeyError:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self.entries.move_to_end(key)
+                return result
+
+        # Computed outside the lock (concurrent misses of the same key just compute it twice)
+        result = compute(features)
+
+        with self.lock:
+            if version == self.version:
+                self.entries[key] = result
+                self.entries.move_to_end(key)
+                if len(self.entries) > self.maxsize:
+                    self.entries.popitem(last=False)
+                    self.evictions += 1
+
+        return result
+
+    """ Method to drop every cached prediction """
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    """ Method to get the cache statistics (as a dict) """
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self.entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
@@ -0,0 +1,255 @@
+# Import libraries
+import os
+import time
+import numpy as np
+from src import resource_dir
+from src import encoding
+from src.drift import DriftMonitor, reference_statistics
+from src.estimators import DEFAULT_ESTIMATOR, compile_model, estimator_spec, make_estimator
+from src.explain import make_explainer
+from src.model_store import FEATURE_COLUMNS, LABEL_COLUMN, ModelStore
+from src.online import DEFAULT_RECORDS_FILE, RECORD_COLUMNS, RecordStore
+from src.prediction_cache import DEFAULT_MAXSIZE, PredictionCache
+
+
+################################################
+
+# PREDICTION ENGINE
+#   Owns the dataset, the feature encoding & the trained classifier  -  has no dependency on Tkinter, PIL or cairosvg,
+#   so it can be used from the GUI, the command line, worker processes & services alike.
+#   Predictions are made by the compiled tree or ensemble (flat node arrays, numpy only)  -  sklearn is only loaded
+#   to TRAIN. The classifier trained is pluggable  -  a decision tree or a tree ensemble (see 'ESTIMATORS').
+
+DEFAULT_DATA_FILE = os.path.join(resource_dir, "heart.csv")
+
+
+################################################
+
+
+class HeartDiseasePredictor:
+    def __init__(self, data_file=DEFAULT_DATA_FILE, store=None, cache_size=DEFAULT_MAXSIZE,
+                 estimator=DEFAULT_ESTIMATOR, params=None, monitor_drift=False, records_file=DEFAULT_RECORDS_FILE):
+        """ ========================
+             INITIALIZE VARIABLE(S)
+            ======================== """
+        # Set the file path for the (encoded) training dataset
+        self.data_file = data_file
+
+        # Labelled records (see 'OnlineTrainer') trained on along with the dataset  -  None trains on the dataset only
+        self.records = RecordStore(records_file) if records_file else None
+        # Number of stored records, & of rows in all, the current model was trained on
+        self.trained_records = 0
+        self.training_rows = 0
+
+        # Classifier trained (a name from 'ESTIMATORS') & its parameters (overriding its defaults)
+        self.estimator = estimator
+        self.params = dict(params or {})
+
+        # Model store (trained classifiers are stored on disk & reused while the dataset doesn't change)
+        self.store = store or ModelStore()
+
+        # The compiled tree (or ensemble) used for all predictions (None until 'load' or 'fit' is called)
+        self.engine = None
+        # Explanations of the engine's predictions (precomputed decision paths & probabilities, for a single tree)
+        self.explainer = None
+        # Version of the model  -  incremented every time a (new) model is loaded or trained (see 'publish')
+        self.model_version = 0
+
+        # LRU cache of single-row explanations (repeated patient profiles  -  serves 'predict_one' & 'explain_one')
+        #  -  None disables it
+        self.cache = PredictionCache(cache_size) if cache_size else None
+
+        # Drift monitor of every feature vector predicted, against the training dataset's statistics (stored with the
+        # model  -  see 'publish')  -  None disables it (opt-in: it adds to the cost of every prediction)
+        self.monitor = DriftMonitor(self._training_features) if monitor_drift else None
+
+        # Whether the model was loaded from the model store, & how long loading (or training) took (in seconds)
+        self.model_cached = False
+        self.model_load_time = 0.0
+
+        # The sklearn classifier & the dataset DataFrame  -  only loaded when they are needed (see 'clf' & 'dataset')
+        self._clf = None
+        self._df = None
+        self._fingerprint = None
+
+    """ Property to get the training dataset as a Pandas DataFrame (read on first use, with the compact schema) """
+    @property
+    def dataset(self):
+        if self._df is None:
+            from src.data_loader import read_dataset
+            self._df = read_dataset(self.data_file)
+        return self._df
+
+    # Method to get the training feature matrix (the drift monitor's reference)
+    def _training_features(self):
+        return self.dataset[FEATURE_COLUMNS].to_numpy(dtype=np.float64)
+
+    """ Property to get the trained sklearn classifier (loaded from the model store on first use) """
+    @property
+    def clf(self):
+        if self._clf is None and self._fingerprint is not None:
+            self._clf = self.store.load(self._fingerprint)
+        return self._clf
+
+    """ Property to get the class labels """
+    @property
+    def classes_(self):
+        return self.engine.classes
+
+    """ Method to TRAIN a new classifier on the given data  -  returns the classifier & its compiled engine
+        (does NOT change the model in use  -  see 'publish') """
+    def train(self, X_features, y_label):
+        # Initialize & TRAIN the Classifier, then compile it
+        clf = make_estimator(self.estimator, self.params)
+        clf.fit(np.asarray(X_features, dtype=np.float64), np.asarray(y_label))
+        return clf, compile_model(clf)
+
+    """ Method to make a (newly trained) model the one used for all predictions  -  'drift_statistics' are the
+        training statistics stored with it (see 'reference_statistics'), if any """
+    def publish(self, clf, engine, drift_statistics=None):
+        self._clf = clf
+        # Built once per model  -  the index holds its own engine, so explanations never mix two models
+        self.explainer = make_explainer(engine)
+        # The drift statistics of the training data  -  set up here (on the loading or training thread), before any
+        # prediction can need them
+        if self.monitor is not None:
+            self.monitor.prepare(drift_statistics)
+        # Swapping the engine reference is atomic  -  predictions already running finish on the previous model
+        self.engine = engine
+        self.model_version += 1
+
+    # Method to take a snapshot of the stored records (empty if records are disabled)
+    def _records_snapshot(self):
+        return self.records.snapshot() if self.records is not None else b""
+
+    # Method to compute the fingerprint of the model trained on the dataset + a snapshot of the stored records
+    def _model_fingerprint(self, records):
+        return ModelStore.fingerprint(self.data_file, model=estimator_spec(self.estimator, self.params),
+                                      records=records)
+
+    """ Method to TRAIN a new classifier on the dataset + the stored records (& use it)
+        -  'records' is a snapshot of the record store (taken now, by default), & 'save' stores the new model in the
+           model store """
+    def fit(self, records=None, save=False):
+        if records is None:
+            records = self._records_snapshot()
+        stored = RecordStore.parse(records)
+        data = self.dataset[RECORD_COLUMNS]
+        if len(stored):
+            import pandas as pd
+            data = pd.concat([data, stored], ignore_index=True)
+
+        # Feature selection (features - X) & target selection (label - y) from data columns
+        clf, engine = self.train(data[FEATURE_COLUMNS], data[LABEL_COLUMN])
+        drift_statistics = None
+        if save:
+            # Stored with the compiled model (restored by 'load')  -  the drift statistics too, so loading the model
+            # never reads the dataset again
+            drift_statistics = reference_statistics(self._training_features())
+            metadata = {"training_rows": len(data)}
+            metadata.update(("drift_" + name, value) for name, value in drift_statistics.items())
+            self._fingerprint = self._model_fingerprint(records)
+            self.store.save(clf, self._fingerprint, engine, metadata)
+
+        self.trained_records = len(stored)
+        self.training_rows = len(data)
+        self.publish(clf, engine, drift_statistics)
+        return self
+
+    """ Method to load the model from the model store  -  retrains if the dataset, stored records, features or
+        estimator changed """
+    def load(self, retrain=False):
+        start = time.perf_counter()
+
+        records = self._records_snapshot()
+        self._fingerprint = self._model_fingerprint(records)
+        engine, metadata = (None, None) if retrain else self.store.load_engine(self._fingerprint)
+        self.model_cached = engine is not None
+
+        if self.model_cached:
+            # The sklearn classifier itself is only loaded if it is asked for (see 'clf')
+            self.trained_records = RecordStore.count(records)
+            self.training_rows = int(metadata["training_rows"])
+            self.publish(None, engine, {name[len("drift_"):]: value for name, value in metadata.items()
+                                        if name.startswith("drift_")})
+        else:
+            self.fit(records, save=True)
+
+        self.model_load_time = time.perf_counter() - start
+        return self
+
+    """ Method to encode the text values of the input form (feature name -> text value) into a feature list """
+    @staticmethod
+    def encode_form(values):
+        return encoding.encode_form(values)
+
+    """ Method to encode a DataFrame in the 'heart_ORIGINAL.csv' schema (returns the features & a mask of valid rows) """
+    @staticmethod
+    def encode_frame(df, invalid_values=None):
+        return encoding.encode_frame(df, invalid_values)
+
+    """ Method to predict the labels of a batch of feature vectors (2D array-like) """
+    def predict(self, X):
+        self._observe(X)
+        return self.engine.predict(X)
+
+    """ Method to predict the class probabilities of a batch of feature vectors (2D array-like) """
+    def predict_proba(self, X):
+        self._observe(X)
+        return self.engine.predict_proba(X)
+
+    """ Method to predict the labels & the class probabilities of a batch of feature vectors (one traversal)
+        -  the labels are the engine's own (e.g. a boosted model's tie-break), not re-derived from the probabilities """
+    def predict_with_proba(self, X):
+        self._observe(X)
+        return self.engine.predict_with_proba(X)
+
+    """ Method to predict the label of a single feature vector (served from the prediction cache, if enabled) """
+    def predict_one(self, features):
+        self._observe_one(features)
+        if self.cache is None:
+            return self.engine.predict_one(features)
+        return self._explain_cached(features)["prediction"]
+
+    """ Method to predict the class probabilities of a single feature vector """
+    def predict_proba_one(self, features):
+        self._observe_one(features)
+        return self.engine.predict_proba_one(features)
+
+    """ Method to explain the prediction of a single feature vector  -  its label, probabilities & decision path
+        (a tree ensemble's explanations have no decision path) """
+    def explain_one(self, features):
+        self._observe_one(features)
+        if self.cache is None:
+            return self.explainer.explain_one(features)
+        return self._explain_cached(features)
+
+    # Method to get the explanation of a single feature vector from the prediction cache (computed on a miss)
+    #   (cached per model  -  the explainer holds its own engine, & a newly published model starts with an empty cache)
+    def _explain_cached(self, features):
+        explainer = self.explainer
+        return self.cache.get(explainer, features, explainer.explain_one)
+
+    """ Method to explain the predictions of a batch of feature vectors (one explanation per row) """
+    def explain(self, X):
+        self._observe(X)
+        return self.explainer.explain(X)
+
+    """ Method to summarize the predictions of a batch of feature vectors (vectorized)
+        -  returns the predictions, their confidence & their conditions (as text) """
+    def summarize(self, X):
+        self._observe(X)
+        return self.explainer.summarize(X)
+
+    # Methods to record the feature vectors predicted in the drift monitor (if enabled)
+    def _observe_one(self, features):
+        if self.monitor is not None:
+            self.monitor.observe_one(features)
+
+    def _observe(self, X):
+        if self.monitor is not None:
+            self.monitor.observe(X)
+
+    """ Method to report the drift of the feature vectors predicted so far, against the training data """
+    def drift_report(self, histograms=False):
+        return self.monitor.report(histograms) if self.monitor is not None else None
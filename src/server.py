@@ -0,0 +1,351 @@
+# Import libraries
+import argparse
+import json
+import queue
+import threading
+import time
+import urllib.request
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import numpy as np
+from src.encoding import encode_record
+from src.estimators import add_estimator_arguments
+from src.model_store import LABEL_COLUMN
+from src.online import DEFAULT_MIN_NEW_RECORDS, OnlineTrainer, check_record
+from src.predictor import DEFAULT_DATA_FILE, HeartDiseasePredictor
+
+
+################################################
+
+# LOCAL HTTP SCORING SERVICE
+#   Serves the predictor over HTTP on localhost. Concurrent requests are collected into micro-batches, so each batch
+#   is ONE vectorized 'predict_with_proba' call instead of one call per request.
+#
+# ENDPOINTS:
+#   POST /predict   - JSON patient record (or a list of records)  ->  prediction(s) & class probabilities
+#                       (records map every feature name to its value; categories may be raw codes, e.g. "M" or "ATA")
+#   POST /records   - labelled JSON patient record(s) (features + 'HeartDisease')  ->  stored for online retraining
+#   GET  /model     - model version & online retraining status
+#   GET  /drift     - drift of the records scored so far against the training data (add '?histograms=1' for the bins)
+#   GET  /stats     - latency (p50/p99), throughput (over the last 'THROUGHPUT_WINDOW' seconds), errors & batching
+#                       statistics
+#   GET  /health    - liveness check
+#
+# USAGE:
+#   python -m src.server serve --port 8765 --max-batch-size 64 --max-wait-ms 2
+#   python -m src.server loadtest --requests 5000 --concurrency 64
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_MAX_BATCH_SIZE = 64
+DEFAULT_MAX_WAIT = 0.002  # seconds
+
+# Number of most recent request latencies kept for the percentile statistics
+LATENCY_WINDOW = 100000
+# Time (in seconds) over which the throughput is measured  -  requests completed in the last THROUGHPUT_WINDOW seconds
+THROUGHPUT_WINDOW = 10.0
+
+
+################################################
+
+
+# Keeps the latency, throughput & batch size statistics of the service
+class ServiceStats:
+    def __init__(self, window=LATENCY_WINDOW, throughput_window=THROUGHPUT_WINDOW):
+        self.lock = threading.Lock()
+        self.latencies = deque(maxlen=window)
+        # Completion times of the requests of the last 'throughput_window' seconds
+        self.throughput_window = throughput_window
+        self.completions = deque()
+        self.started = time.perf_counter()
+        self.requests = 0
+        self.errors = 0
+        self.batches = 0
+        self.batched_rows = 0
+
+    # Method to drop the completion times older than the throughput window (under the lock)
+    def _expire(self, now):
+        horizon = now - self.throughput_window
+        completions = self.completions
+        while completions and completions[0] < horizon:
+            completions.popleft()
+
+    """ Method to record a single batch (its size) """
+    def record_batch(self, size):
+        with self.lock:
+            self.batches += 1
+            self.batched_rows += size
+
+    """ Method to record a single completed request (its latency, in seconds) """
+    def record_request(self, latency):
+        now = time.perf_counter()
+        with self.lock:
+            self.requests += 1
+            self.latencies.append(latency)
+            self.completions.append(now)
+            self._expire(now)
+
+    """ Method to record a single failed request (answered with an error status) """
+    def record_error(self):
+        with self.lock:
+            self.errors += 1
+
+    """ Method to get a snapshot of the statistics (as a JSON-serializable dict) """
+    def snapshot(self):
+        now = time.perf_counter()
+        with self.lock:
+            elapsed = now - self.started
+            self._expire(now)
+            # (a service younger than the window is measured over its uptime)
+            window = min(self.throughput_window, elapsed)
+            latencies = np.fromiter(self.latencies, dtype=np.float64, count=len(self.latencies))
+            p50, p99 = np.percentile(latencies, [50, 99]) if len(latencies) else (0.0, 0.0)
+
+            return {
+                "requests": self.requests,
+                "errors": self.errors,
+                "batches": self.batches,
+                "mean_batch_size": self.batched_rows / self.batches if self.batches else 0.0,
+                "latency_p50_ms": float(p50) * 1000,
+                "latency_p99_ms": float(p99) * 1000,
+                "throughput_rps": len(self.completions) / window if window else 0.0,
+                "throughput_window_s": window,
+                "uptime_s": elapsed,
+            }
+
+
+# Collects concurrently submitted feature vectors into micro-batches, scored on a single worker thread
+class MicroBatcher:
+    def __init__(self, predictor, max_batch_size=DEFAULT_MAX_BATCH_SIZE, max_wait=DEFAULT_MAX_WAIT, stats=None):
+        self.predictor = predictor
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait
+        self.stats = stats or ServiceStats()
+
+        # Pending (features, future) pairs  -  'None' is the shutdown signal
+        self.queue = queue.Queue()
+        self.thread = threading.Thread(target=self._run, name="MicroBatcher", daemon=True)
+        self.thread.start()
+
+    """ Method to submit a single feature vector  -  returns a Future resolving to (prediction, probabilities) """
+    def submit(self, features):
+        future = Future()
+        self.queue.put((features, future))
+        return future
+
+    """ Method to stop the worker thread (after the pending requests have been scored) """
+    def close(self):
+        self.queue.put(None)
+        self.thread.join()
+
+    def _run(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                return
+
+            # Collect a batch  -  until it is full, or the oldest request has waited 'max_wait' seconds
+            batch = [item]
+            deadline = time.perf_counter() + self.max_wait
+            stop = False
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.perf_counter()
+                try:
+                    item = self.queue.get(timeout=remaining) if remaining > 0 else self.queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+
+            self._score(batch)
+            if stop:
+                return
+
+    def _score(self, batch):
+        self.stats.record_batch(len(batch))
+        try:
+            # !!! ONE vectorized prediction for the whole batch !!!
+            predictions, probabilities = self.predictor.predict_with_proba(
+                np.array([features for features, _ in batch]))
+        except Exception as error:
+            for _, future in batch:
+                future.set_exception(error)
+            return
+
+        for (_, future), prediction, proba in zip(batch, predictions, probabilities):
+            future.set_result((int(prediction), proba.tolist()))
+
+
+# Handles the HTTP requests of the scoring service
+class ScoringRequestHandler(BaseHTTPRequestHandler):
+    # Set by 'make_server'
+    batcher = None
+    trainer = None
+
+    def do_GET(self):
+        if self.path == "/stats":
+            self._send_json(200, self.batcher.stats.snapshot())
+        elif self.path == "/model":
+            self._send_json(200, self.trainer.status())
+        elif self.path in ("/drift", "/drift?histograms=1"):
+            self._send_json(200, self.batcher.predictor.drift_report(histograms=self.path.endswith("=1")))
+        elif self.path == "/health":
+            self._send_json(200, {"status": "ok"})
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def do_POST(self):
+        if self.path == "/records":
+            self._add_records()
+            return
+        if self.path != "/predict":
+            self._send_json(404, {"error": "not found"})
+            return
+
+        start = time.perf_counter()
+        try:
+            payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+            records = payload if isinstance(payload, list) else [payload]
+            futures = [self.batcher.submit(encode_record(record)) for record in records]
+        except (ValueError, KeyError, TypeError) as error:
+            self._send_json(400, {"error": "invalid record: %s" % error})
+            return
+
+        try:
+            results = [{"prediction": prediction, "probability": proba}
+                       for prediction, proba in (future.result() for future in futures)]
+        except Exception as error:
+            # Scoring the batch failed  -  every request of the batch gets an error response
+            self.batcher.stats.record_error()
+            self._send_json(500, {"error": "prediction failed: %s" % error})
+            return
+        self.batcher.stats.record_request(time.perf_counter() - start)
+
+        self._send_json(200, results if isinstance(payload, list) else results[0])
+
+    def _add_records(self):
+        try:
+            payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+            records = payload if isinstance(payload, list) else [payload]
+            X = [encode_record(record) for record in records]
+            y = [record[LABEL_COLUMN] for record in records]
+            for features, label in zip(X, y):
+                check_record(features, label)
+        except (ValueError, KeyError, TypeError) as error:
+            self._send_json(400, {"error": "invalid record: %s" % error})
+            return
+
+        added = self.trainer.add(X, y)
+        self._send_json(200, dict(self.trainer.status(), added=added))
+
+    def _send_json(self, status, body):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    # Silence the per-request access log (it would dominate the cost of a request)
+    def log_message(self, format, *args):
+        pass
+
+
+# Threaded HTTP server with a listen backlog large enough for bursts of concurrent clients
+class ScoringServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+
+# Method to create the scoring server (the fitted model is loaded ONCE, here)
+def make_server(host=DEFAULT_HOST, port=DEFAULT_PORT, predictor=None,
+                max_batch_size=DEFAULT_MAX_BATCH_SIZE, max_wait=DEFAULT_MAX_WAIT,
+                min_new_records=DEFAULT_MIN_NEW_RECORDS):
+    predictor = predictor or HeartDiseasePredictor(monitor_drift=True).load()
+    batcher = MicroBatcher(predictor, max_batch_size, max_wait)
+    trainer = OnlineTrainer(predictor, min_new_records=min_new_records)
+
+    handler = type("BoundScoringRequestHandler", (ScoringRequestHandler,), {"batcher": batcher, "trainer": trainer})
+    return ScoringServer((host, port), handler)
+
+
+# Method to run a local load test against a running server  -  returns the client-side statistics
+def load_test(url, n_requests=2000, concurrency=32, record=None):
+    if record is None:
+        # Default record: the first patient of the dataset
+        record = dict(HeartDiseasePredictor().dataset.iloc[0])
+        record = {column: float(value) for column, value in record.items()}
+    data = json.dumps(record).encode("utf-8")
+
+    def send(_):
+        start = time.perf_counter()
+        request = urllib.request.Request(url.rstrip("/") + "/predict", data=data,
+                                         headers={"Content-Type": "application/json"})
+        with urllib.request.urlopen(request) as response:
+            response.read()
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        latencies = np.fromiter(pool.map(send, range(n_requests)), dtype=np.float64, count=n_requests)
+    elapsed = time.perf_counter() - start
+
+    p50, p99 = np.percentile(latencies, [50, 99])
+    return {
+        "requests": n_requests,
+        "concurrency": concurrency,
+        "latency_p50_ms": float(p50) * 1000,
+        "latency_p99_ms": float(p99) * 1000,
+        "throughput_rps": n_requests / elapsed,
+    }
+
+
+def main(argv=None):
+    # Command-line options
+    parser = argparse.ArgumentParser(description="Local HTTP scoring service for the heart disease predictor")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    serve = commands.add_parser("serve", help="run the scoring service")
+    serve.add_argument("--host", default=DEFAULT_HOST)
+    serve.add_argument("--port", type=int, default=DEFAULT_PORT)
+    serve.add_argument("--max-batch-size", type=int, default=DEFAULT_MAX_BATCH_SIZE,
+                       help="maximum number of records scored per batch (1 disables batching)")
+    serve.add_argument("--max-wait-ms", type=float, default=DEFAULT_MAX_WAIT * 1000,
+                       help="maximum time a request waits for its batch to fill up")
+    serve.add_argument("--data", default=DEFAULT_DATA_FILE, help="training dataset (encoded 'heart.csv' schema)")
+    serve.add_argument("--min-new-records", type=int, default=DEFAULT_MIN_NEW_RECORDS,
+                       help="new labelled records (POST /records) that trigger a background retrain")
+    add_estimator_arguments(serve)
+
+    loadtest = commands.add_parser("loadtest", help="run a local load test against a running service")
+    loadtest.add_argument("--url", default="http://%s:%d" % (DEFAULT_HOST, DEFAULT_PORT))
+    loadtest.add_argument("--requests", type=int, default=2000)
+    loadtest.add_argument("--concurrency", type=int, default=32)
+
+    args = parser.parse_args(argv)
+
+    if args.command == "serve":
+        server = make_server(args.host, args.port, HeartDiseasePredictor(args.data, estimator=args.estimator,
+                                                                   params=args.params, monitor_drift=True).load(),
+                             args.max_batch_size, args.max_wait_ms / 1000, args.min_new_records)
+        print("Serving on http://%s:%d  (max batch size: %d, max wait: %.1f ms)"
+              % (args.host, args.port, args.max_batch_size, args.max_wait_ms))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            print(json.dumps(server.RequestHandlerClass.batcher.stats.snapshot(), indent=2))
+    else:
+        client = load_test(args.url, args.requests, args.concurrency)
+        with urllib.request.urlopen(args.url.rstrip("/") + "/stats") as response:
+            server_stats = json.loads(response.read())
+        print(json.dumps({"client": client, "server": server_stats}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
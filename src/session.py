@@ -0,0 +1,99 @@
+# Import libraries
+#   (no Tkinter & no numpy  -  the session is only data; batches are scored by the predictor, on a worker thread)
+from src.form_schema import FORM_FIELDS
+
+
+################################################
+
+# SCREENING SESSION
+#   The patients entered on one terminal during a session (e.g. a screening day), queued & scored in BATCHES  -  one
+#   vectorized prediction for every patient queued since the last batch, instead of one prediction per patient.
+#   Entries are only ever appended, & batches are taken in order, so a batch is just the range of entries from the
+#   end of the previous one (see 'next_batch' & 'set_results').
+
+# Unscored entries which trigger a batch as soon as they are queued
+DEFAULT_BATCH_SIZE = 32
+# Time (in ms) after the last entry is queued before the unscored entries are scored, even if they don't fill a batch
+DEFAULT_IDLE_MS = 1500
+
+# Text shown for each prediction (the 'HeartDisease' label  -  0 = no heart disease, 1 = heart disease)
+RESULT_TEXT = {0: "Clear", 1: "At risk"}
+PENDING_TEXT = "..."
+
+
+################################################
+
+
+class PatientSession:
+    def __init__(self, batch_size=DEFAULT_BATCH_SIZE):
+        self.batch_size = batch_size
+
+        # Per entry  -  the text values of its form (in form order), its features, & its prediction & confidence
+        # (None until it is scored)
+        self.values = []
+        self.features = []
+        self.predictions = []
+        self.confidence = []
+
+        # Entries before 'submitted' are scored, or in the batch being scored
+        self.submitted = 0
+        # Incremented when the session is cleared  -  results of batches taken before that are dropped
+        self.generation = 0
+
+    def __len__(self):
+        return len(self.values)
+
+    @property
+    def scored(self):
+        return len(self.predictions) - self.predictions.count(None)
+
+    @property
+    def at_risk(self):
+        return self.predictions.count(1)
+
+    """ Method to queue a patient  -  the text values of the form (feature name -> text value) & its features """
+    def add(self, values, features):
+        self.values.append(tuple(values[field.name] for field in FORM_FIELDS))
+        self.features.append(list(features))
+        self.predictions.append(None)
+        self.confidence.append(None)
+
+    """ Method to get the number of queued entries which are not scored (nor being scored) yet """
+    def unsubmitted(self):
+        return len(self.values) - self.submitted
+
+    """ Method to take the next batch  -  every entry not submitted yet
+        (returns the batch's start, generation & features  -  or None if there is nothing to score) """
+    def next_batch(self):
+        start = self.submitted
+        if start == len(self.values):
+            return None
+        self.submitted = len(self.values)
+        return start, self.generation, self.features[start:]
+
+    """ Method to store the results of a batch (see 'next_batch')  -  results of a cleared session are dropped """
+    def set_results(self, start, generation, predictions, confidence):
+        if generation != self.generation:
+            return
+        stop = start + len(predictions)
+        self.predictions[start:stop] = [int(p) for p in predictions]
+        self.confidence[start:stop] = [float(c) for c in confidence]
+
+    """ Method to give a batch back (e.g. when scoring it failed)  -  it is taken again by the next batch """
+    def requeue(self, start, generation):
+        if generation == self.generation:
+            self.submitted = min(self.submitted, start)
+
+    """ Method to get the row of an entry, as shown in the session table (#, form values, result, confidence) """
+    def row(self, index):
+        prediction = self.predictions[index]
+        if prediction is None:
+            return (index + 1,) + self.values[index] + (PENDING_TEXT, "")
+        return (index + 1,) + self.values[index] + (RESULT_TEXT.get(prediction, prediction),
+                                                    "%.0f%%" % (self.confidence[index] * 100))
+
+    """ Method to drop every entry """
+    def clear(self):
+        self.values, self.features, self.predictions, self.confidence = [], [], [], []
+        self.submitted = 0
+        self.generation += 1
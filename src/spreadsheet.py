@@ -0,0 +1,179 @@
+# Import libraries
+#   (openpyxl is only imported when a workbook is actually read or written)
+import argparse
+import os
+import sys
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+from src import resource_dir
+
+
+################################################
+
+# SPREADSHEET PIPELINE
+#   Clinic intake sheets (.xlsx, in the 'heart_ORIGINAL.csv' schema) streamed in & out with openpyxl's streaming
+#   modes  -  rows are read in 'read_only' mode & written in 'write_only' mode, chunk by chunk, so memory stays
+#   constant however large the workbook is. Scoring itself is the batch pipeline's (see 'src.batch').
+#   Throughput is bound by openpyxl's XML parsing & serialization (scoring is < 1% of the time):
+#     * install 'lxml'  -  openpyxl then writes through it, roughly 2x faster (reading always uses the standard
+#       library's parser)
+#     * openpyxl's reader keeps a small (~80 bytes) empty element per row it has parsed, & sheets with no stored
+#       dimensions (e.g. written by openpyxl itself  -  Excel stores them) are pre-scanned once on load, so memory
+#       still grows slowly with the row count  -  the rows themselves are only ever held one chunk at a time
+#
+# USAGE:
+#   python -m src.batch intake.xlsx -o predictions.xlsx                 (score a workbook)
+#   python -m src.spreadsheet generate intake.xlsx --rows 500000        (synthetic intake sheet, for testing)
+#   python -m src.spreadsheet bench --rows 100000 500000                (rows/s & peak memory of the whole pipeline)
+
+SPREADSHEET_EXTENSIONS = (".xlsx", ".xlsm")
+DEFAULT_SHEET_TITLE = "Predictions"
+
+ORIGINAL_DATA_FILE = os.path.join(resource_dir, "heart_ORIGINAL.csv")
+
+
+################################################
+
+
+# Method to check whether a path (or a file object) is a spreadsheet, by its extension
+def is_spreadsheet(path):
+    return isinstance(path, (str, os.PathLike)) and os.path.splitext(path)[1].lower() in SPREADSHEET_EXTENSIONS
+
+
+# Method to get the peak resident memory of this process (in MiB)  -  None where it can't be measured (Windows)
+def peak_memory():
+    try:
+        # Unix only
+        import resource
+    except ImportError:
+        return None
+
+    # 'ru_maxrss' is in KiB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1 << 20) if sys.platform == "darwin" else peak / 1024
+
+
+# Method to stream the rows of a workbook (first sheet) as DataFrame chunks  -  uses openpyxl's read-only mode
+#   (the first row is the header; blank rows, e.g. formatted but empty rows at the end of a sheet, are skipped)
+def iter_workbook_chunks(path, chunksize):
+    import openpyxl
+
+    workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        sheet = workbook.worksheets[0]
+        # The dimensions stored in the file are often wrong (files written by other tools)  -  read every row
+        sheet.reset_dimensions()
+        rows = sheet.iter_rows(values_only=True)
+        header = [str(h) for h in next(rows, ())]
+
+        chunk = []
+        for row in rows:
+            if not any(value is not None for value in row):
+                continue
+            chunk.append(row)
+            if len(chunk) == chunksize:
+                yield pd.DataFrame(chunk, columns=header)
+                chunk = []
+        if chunk:
+            yield pd.DataFrame(chunk, columns=header)
+    finally:
+        workbook.close()
+
+
+# Writes DataFrame chunks into a new workbook  -  uses openpyxl's write-only mode (rows are streamed to disk as they
+# are appended), & only replaces 'path' once the whole workbook is written
+class WorkbookWriter:
+    def __init__(self, path, title=DEFAULT_SHEET_TITLE):
+        import openpyxl
+
+        self.path = os.fspath(path)
+        self.workbook = openpyxl.Workbook(write_only=True)
+        self.sheet = self.workbook.create_sheet(title)
+        self.header = None
+
+    """ Method to append a chunk (the header is written with the first one) """
+    def write(self, chunk):
+        if self.header is None:
+            self.header = [str(column) for column in chunk.columns]
+            self.sheet.append(self.header)
+
+        # Missing values (NaN, NA) are written as empty cells
+        values = chunk.astype(object).where(chunk.notna(), None)
+        append = self.sheet.append
+        for row in values.itertuples(index=False, name=None):
+            append(row)
+
+    """ Method to finish the workbook & move it into place """
+    def close(self):
+        if self.header is None:
+            self.sheet.append([])
+        tmp_file = self.path + ".tmp"
+        self.workbook.save(tmp_file)
+        os.replace(tmp_file, self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc_info):
+        if exc_type is None:
+            self.close()
+
+
+# Method to write a synthetic intake workbook  -  'n_rows' rows sampled (with replacement) from the raw dataset
+def write_intake(path, n_rows, source=ORIGINAL_DATA_FILE, seed=0, chunksize=50000):
+    from src.encoding import read_raw
+
+    df = read_raw(source).astype(object)
+    rng = np.random.default_rng(seed)
+
+    with WorkbookWriter(path, title="Intake") as writer:
+        for start in range(0, n_rows, chunksize):
+            writer.write(df.iloc[rng.integers(0, len(df), min(chunksize, n_rows - start))])
+
+
+def main(argv=None):
+    # Command-line options
+    parser = argparse.ArgumentParser(description="Streaming Excel (.xlsx) intake sheets  -  generate & benchmark")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    generate = commands.add_parser("generate", help="write a synthetic intake workbook")
+    generate.add_argument("output", help="workbook to write (.xlsx)")
+    generate.add_argument("--rows", type=int, default=100000)
+    generate.add_argument("--seed", type=int, default=0)
+
+    bench = commands.add_parser("bench", help="read, score & write synthetic workbooks of each size")
+    bench.add_argument("--rows", type=int, nargs="+", default=[10000, 100000])
+    bench.add_argument("--chunksize", type=int, default=50000, help="rows scored per batch")
+    args = parser.parse_args(argv)
+
+    if args.command == "generate":
+        start = time.perf_counter()
+        write_intake(args.output, args.rows, seed=args.seed)
+        elapsed = time.perf_counter() - start
+        print("GENERATED: %s  (%d rows in %.1f s  [%.0f rows/s])" % (args.output, args.rows, elapsed,
+                                                                    args.rows / elapsed))
+        return
+
+    from src.batch import score_file
+    from src.predictor import HeartDiseasePredictor
+
+    predictor = HeartDiseasePredictor().load()
+    print("%10s %10s %12s %16s" % ("ROWS", "TIME(s)", "ROWS/S", "PEAK RSS(MiB)"))
+    with tempfile.TemporaryDirectory() as directory:
+        intake_file = os.path.join(directory, "intake.xlsx")
+        output_file = os.path.join(directory, "predictions.xlsx")
+        # Sizes in increasing order  -  the peak memory is the process' peak so far, so it only grows if a larger
+        # workbook needs more memory
+        for n_rows in sorted(args.rows):
+            write_intake(intake_file, n_rows)
+            start = time.perf_counter()
+            rows, _ = score_file(predictor, intake_file, output_file, args.chunksize)
+            elapsed = time.perf_counter() - start
+            peak = peak_memory()
+            print("%10d %10.2f %12.0f %16s" % (rows, elapsed, rows / elapsed, "-" if peak is None else "%.1f" % peak))
+
+
+if __name__ == "__main__":
+    main()
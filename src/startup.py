@@ -0,0 +1,78 @@
+# Import libraries
+import json
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+
+################################################
+
+# STARTUP TIMING
+#   Records how long every startup phase takes (on whichever thread it runs) & which modules it imported,
+#   similar to a per-phase 'python -X importtime' breakdown. Phases running concurrently on different threads
+#   may share the modules they import (they are attributed to whichever phase finishes first).
+
+
+################################################
+
+
+class StartupTimer:
+    def __init__(self):
+        # Reference point for all phases  -  the moment this module was first imported
+        self.origin = time.perf_counter()
+        self.lock = threading.Lock()
+
+        # Recorded phases  -  dicts of name, thread, start & end (seconds since 'origin') & imported modules
+        self.phases = []
+
+    """ Context manager to time a startup phase (& record the modules imported during it) """
+    @contextmanager
+    def phase(self, name):
+        before = set(sys.modules)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            modules = sorted(set(sys.modules) - before)
+            self._record(name, start, end, modules)
+
+    """ Method to record an instantaneous startup event (e.g. 'first frame') """
+    def mark(self, name):
+        now = time.perf_counter()
+        self._record(name, now, now, [])
+
+    def _record(self, name, start, end, modules):
+        with self.lock:
+            self.phases.append({
+                "phase": name,
+                "thread": threading.current_thread().name,
+                "start_ms": (start - self.origin) * 1000,
+                "duration_ms": (end - start) * 1000,
+                "modules": modules,
+            })
+
+    """ Method to get the recorded phases as JSON """
+    def report_json(self):
+        with self.lock:
+            return json.dumps(sorted(self.phases, key=lambda p: p["start_ms"]), indent=2)
+
+    """ Method to get the recorded phases as a text table """
+    def report(self):
+        with self.lock:
+            phases = sorted(self.phases, key=lambda p: p["start_ms"])
+
+        lines = ["%-24s %-14s %10s %12s %8s  %s" % ("PHASE", "THREAD", "START(ms)", "DURATION(ms)", "MODULES",
+                                                   "TOP PACKAGES")]
+        for p in phases:
+            packages = Counter(module.split(".")[0] for module in p["modules"])
+            top = ", ".join("%s(%d)" % item for item in packages.most_common(5))
+            lines.append("%-24s %-14s %10.1f %12.1f %8d  %s" % (p["phase"], p["thread"][:14], p["start_ms"],
+                                                               p["duration_ms"], len(p["modules"]), top))
+        return "\n".join(lines)
+
+
+# The application's startup timer
+timer = StartupTimer()